@@ -1,10 +1,7 @@
 """
 Автоматизированный тест всех функций таймера Stay Out
 """
-import json
-import os
-from datetime import datetime, timedelta
-import time
+from stay_out_core import ManualClock, StateStore
 
 def test_all_functions():
     print("Тестирование всех функций таймера Stay Out")
@@ -15,8 +12,10 @@ def test_all_functions():
     sys.path.append('/workspace')
     from console_timer_test import ConsoleStayOutTimer
     
-    # Создаем экземпляр таймера
-    timer = ConsoleStayOutTimer()
+    # Создаем экземпляр таймера на ручных часах (без реального ожидания)
+    clock = ManualClock()
+    store = StateStore(":memory:")
+    timer = ConsoleStayOutTimer(source=clock, store=store)
     timer.load_last_time()
     
     print("\n1. Тест начального состояния:")
@@ -27,10 +26,12 @@ def test_all_functions():
     print("\n2. Тест изменения времени:")
     timer.edit_time("12:30:45")
     print(f"   После изменения: {timer.format_time(timer.game_time)}")
+    assert timer.format_time(timer.game_time) == "12:30:45"
     
     print("\n3. Тест сброса времени:")
     timer.reset_timer()
     print(f"   После сброса: {timer.format_time(timer.game_time)}")
+    assert timer.game_time == 0
     
     print("\n4. Тест изменения скорости:")
     timer.change_game_speed(5000)
@@ -41,34 +42,37 @@ def test_all_functions():
     print(f"   Запущен: {timer.timer_running}")
     
     print("\n6. Тест паузы таймера:")
-    # Дадим немного времени для работы таймера
-    time.sleep(2)
+    # Перематываем 2 секунды реального времени
+    clock.advance(seconds=2)
     timer.pause_timer()
     print(f"   После паузы: {timer.format_time(timer.game_time)}")
     print(f"   Запущен: {timer.timer_running}")
+    assert timer.game_time == 10000
+    assert not timer.timer_running
     
     print("\n7. Тест возобновления таймера:")
     timer.start_timer()  # Возобновляем
     print(f"   Возобновлен: {timer.timer_running}")
     
     print("\n8. Тест остановки таймера:")
-    time.sleep(2)
+    clock.advance(seconds=2)
     timer.stop_timer()
     print(f"   После остановки: {timer.format_time(timer.game_time)}")
     print(f"   Запущен: {timer.timer_running}")
+    assert timer.format_time(timer.game_time) == "00:00:20"
     
     print("\n9. Тест сохранения настроек:")
     # Проверим, что настройки сохранились
-    with open('timer_settings.json', 'r', encoding='utf-8') as f:
-        settings = json.load(f)
+    settings = store.scope("timer").settings
+    assert settings.get('game_speed') == 5000
     print(f"   Сохраненная скорость: {settings.get('game_speed')} мс")
     
     print("\n10. Тест восстановления последнего времени:")
-    # Удалим текущий файл, симулируем перезапуск
-    if os.path.exists('last_time.json'):
-        with open('last_time.json', 'r', encoding='utf-8') as f:
-            saved_data = json.load(f)
-        print(f"   Сохраненное время: {timer.format_time(saved_data['game_time'])}")
+    # Симулируем перезапуск: новый таймер на той же базе
+    restarted = ConsoleStayOutTimer(source=clock, store=store)
+    restarted.load_last_time()
+    print(f"   Сохраненное время: {restarted.format_time(restarted.game_time)}")
+    assert restarted.game_time == timer.game_time and not restarted.timer_running
     
     # Восстановим стандартную скорость
     timer.change_game_speed(6870)
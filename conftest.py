@@ -0,0 +1,15 @@
+"""
+Общие фикстуры тестов
+"""
+import pytest
+
+
+@pytest.fixture(params=["numpy", "lists"])
+def numpy_branch(request):
+    """
+    Модуль numpy или None для подстановки в модуль ядра (monkeypatch.setattr(модуль, "np", ...)):
+    тест проходит обе ветки и сверяет их с одними ожиданиями. Без NumPy ветка numpy пропускается.
+    """
+    if request.param == "numpy":
+        return pytest.importorskip("numpy")
+    return None
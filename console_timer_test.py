@@ -1,33 +1,52 @@
 """
 Консольная версия таймера Stay Out для тестирования функций
 """
-import json
-import os
-from datetime import datetime
+from stay_out_core import ClockJournal, GameClock, StateStore, format_time, parse_time
 
 class ConsoleStayOutTimer:
-    def __init__(self):
+    def __init__(self, source=None, store=None):
+        # source - источник реального времени: "monotonic", "wall" или ManualClock для тестов
+        # store - StateStore (по умолчанию общая база в каталоге данных пользователя)
+        # Консоль ждет ввода, а не тиков: состояние пишется сразу, без фонового потока
+        self.store = store if store is not None else StateStore()
+        self.state = self.store.scope("timer")
+
         # Загрузка настроек
         self.load_settings()
 
-        # Переменные таймера
-        self.start_time = 0
-        self.timer_running = False
-        self.game_time = 0  # В миллисекундах
-        self.real_time_tick = 1000  # 1 секунда реального времени
-        self.game_tick_duration = self.settings.get('game_speed', 6870)  # Скорость игрового времени в мс
+        # Игровые часы (скорость игрового времени в мс на 1 секунду реального времени)
+        self.clock = GameClock(self.settings.get('game_speed', 6870), 1000, source=source)
+
+        # Контрольные точки часов: пишутся только при изменении состояния
+        self.journal = ClockJournal(self.clock, store=self.state)
         
         print("Таймер для Stay Out (Консольная версия)")
         print("Программа создана разработчиком Harper_IDS для сообщества IgromanDS")
         print(f"Текущая скорость игрового времени: {self.game_tick_duration} мс")
         print()
 
+    @property
+    def game_time(self):
+        """Текущее игровое время в миллисекундах"""
+        return self.clock.now_ms()
+
+    @property
+    def timer_running(self):
+        return self.clock.active
+
+    @property
+    def game_tick_duration(self):
+        return self.clock.game_tick_duration
+
+    @property
+    def real_time_tick(self):
+        return self.clock.real_time_tick
+
     def load_settings(self):
-        """Загрузка настроек из файла"""
-        try:
-            with open('timer_settings.json', 'r', encoding='utf-8') as f:
-                self.settings = json.load(f)
-        except FileNotFoundError:
+        """Загрузка настроек из базы"""
+        if self.state.settings:
+            self.settings = dict(self.state.settings)
+        else:
             self.settings = {
                 'game_speed': 6870,  # Стандартная скорость - 6870 мс
                 'background_color': '#f0f0f0',
@@ -37,96 +56,60 @@ class ConsoleStayOutTimer:
             self.save_settings()
     
     def save_settings(self):
-        """Сохранение настроек в файл"""
-        with open('timer_settings.json', 'w', encoding='utf-8') as f:
-            json.dump(self.settings, f, ensure_ascii=False, indent=2)
+        """Сохранение настроек в базу"""
+        self.state.save_settings(self.settings)
 
     def load_last_time(self):
-        """Загрузка последнего сохраненного времени"""
-        try:
-            with open('last_time.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.game_time = data.get('game_time', 0)
-                print(f"Загружено последнее сохраненное время: {self.format_time(self.game_time)}")
-        except FileNotFoundError:
+        """Загрузка последнего сохраненного состояния часов"""
+        # После сбоя идущий таймер продолжается с того времени, которое было бы сейчас
+        if self.journal.restore():
+            print(f"Загружено последнее сохраненное время: {self.format_time(self.game_time)}"
+                  f"{' (идет)' if self.timer_running else ''}")
+        else:
             print("Последнее время не найдено, начинаем с 00:00:00")
 
     def save_last_time(self):
-        """Сохранение текущего времени"""
-        with open('last_time.json', 'w', encoding='utf-8') as f:
-            json.dump({'game_time': self.game_time}, f, ensure_ascii=False, indent=2)
+        """Сохранение текущего состояния часов"""
+        self.journal.record()
         print(f"Время сохранено: {self.format_time(self.game_time)}")
 
     def format_time(self, milliseconds):
         """Форматирование времени в ЧЧ:ММ:СС"""
-        total_seconds = milliseconds // 1000
-        hours = (total_seconds // 3600) % 24
-        minutes = (total_seconds % 3600) // 60
-        seconds = total_seconds % 60
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        return format_time(milliseconds)
 
     def start_timer(self):
         """Запуск таймера"""
-        if not self.timer_running:
-            self.start_time = datetime.now().timestamp() * 1000 - (self.game_time * self.real_time_tick / self.game_tick_duration)
-            self.timer_running = True
+        if self.clock.start():
             print("Таймер запущен")
         else:
             print("Таймер уже запущен")
 
     def pause_timer(self):
         """Пауза таймера"""
-        if self.timer_running:
-            # Вычисляем текущее игровое время на момент паузы
-            current_time = datetime.now().timestamp() * 1000
-            elapsed_real_time = current_time - self.start_time
-            self.game_time = int(elapsed_real_time * self.game_tick_duration / self.real_time_tick)
-            self.timer_running = False
+        if self.clock.pause():
             print(f"Таймер на паузе: {self.format_time(self.game_time)}")
         else:
             print("Таймер не запущен")
 
     def stop_timer(self):
         """Остановка таймера"""
-        if self.timer_running:
-            # Вычисляем текущее игровое время на момент остановки
-            current_time = datetime.now().timestamp() * 1000
-            elapsed_real_time = current_time - self.start_time
-            self.game_time = int(elapsed_real_time * self.game_tick_duration / self.real_time_tick)
-        self.timer_running = False
+        self.clock.stop()
         print(f"Таймер остановлен: {self.format_time(self.game_time)}")
         self.save_last_time()
 
     def reset_timer(self):
         """Сброс таймера"""
-        self.timer_running = False
-        self.game_time = 0
+        self.clock.reset()
         print("Таймер сброшен")
-        # Удаляем сохраненное время при сбросе
-        if os.path.exists('last_time.json'):
-            os.remove('last_time.json')
-            print("Файл последнего времени удален")
+        # Сброс - тоже новое состояние часов
+        self.journal.record()
 
     def edit_time(self, time_str):
         """Редактирование времени"""
         try:
-            time_parts = time_str.split(':')
-            if len(time_parts) != 3:
-                raise ValueError("Неверный формат")
-            
-            hours, minutes, seconds = map(int, time_parts)
-            
-            if not (0 <= hours < 24 and 0 <= minutes < 60 and 0 <= seconds < 60):
-                raise ValueError("Неверные значения времени")
-            
-            self.game_time = hours * 3600000 + minutes * 60000 + seconds * 1000
+            self.clock.set_ms(parse_time(time_str))
             print(f"Время изменено на: {self.format_time(self.game_time)}")
             
-            # Если таймер запущен, пересчитываем start_time
-            if self.timer_running:
-                current_time = datetime.now().timestamp() * 1000
-                self.start_time = current_time - (self.game_time * self.real_time_tick / self.game_tick_duration)
-            
             self.save_last_time()
             
         except ValueError:
@@ -138,18 +121,8 @@ class ConsoleStayOutTimer:
             new_speed = int(new_speed)
             if 100 <= new_speed <= 10000:  # Разумные пределы
                 old_speed = self.game_tick_duration
-                # Пересчитываем game_time с новой скоростью
-                if self.timer_running:
-                    current_time = datetime.now().timestamp() * 1000
-                    elapsed_real_time = current_time - self.start_time
-                    # Сначала получаем реальное прошедшее время в условных "игровых единицах" при старой скорости
-                    old_game_units = elapsed_real_time / self.real_time_tick * old_speed
-                    # Затем пересчитываем game_time с новой скоростью
-                    self.game_time = int(old_game_units)
-                    # И пересчитываем start_time для новой скорости
-                    self.start_time = current_time - (self.game_time * self.real_time_tick / new_speed)
-                
-                self.game_tick_duration = new_speed
+                # Уже прошедшее игровое время сохраняется, новая скорость действует с этого момента
+                self.clock.set_speed(new_speed)
                 self.settings['game_speed'] = new_speed
                 self.save_settings()
                 print(f"Скорость игрового времени изменена с {old_speed} мс на {new_speed} мс")
@@ -226,6 +199,9 @@ def main():
                 timer.stop_timer()
             print("\nДо свидания!")
             break
+        finally:
+            # Контрольная точка пишется, только если команда изменила состояние часов
+            timer.journal.record()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
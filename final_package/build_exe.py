@@ -33,6 +33,8 @@ def build_exe():
         "--windowed",          # Без консоли (для GUI приложений)
         "--name", "StayOutTimer",  # Имя исполняемого файла
         "--clean",             # Очистить кэш перед сборкой
+        # stay_out_core подключается через sys.path только при запуске: PyInstaller нужен путь к нему
+        "--paths", os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
         main_file
     ]
     
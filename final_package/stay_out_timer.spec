@@ -1,10 +1,12 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+import os
+
 block_cipher = None
 
 a = Analysis(
-    ['/workspace/final_package/stay_out_timer_full.py'],
-    pathex=[],
+    [os.path.join(SPECPATH, 'stay_out_timer_full.py')],
+    pathex=[os.path.dirname(SPECPATH)],  # stay_out_core лежит в корне репозитория
     binaries=[],
     datas=[],
     hiddenimports=[],
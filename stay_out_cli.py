@@ -0,0 +1,157 @@
+"""
+Таймер Stay Out из командной строки: разовые запросы игрового времени без интерфейса
+"""
+import argparse
+import sys
+import time
+
+# Только нужные модули ядра: панель часов (NumPy), будильники и уведомления разовому запуску не нужны
+from stay_out_core.clock import DAY_MS, NS_PER_MS, NS_PER_SECOND, GameClock, parse_time
+from stay_out_core.journal import ClockJournal
+from stay_out_core.planner import OccurrencePlanner
+from stay_out_core.store import StateStore
+
+# Ключ скорости в настройках каждой области хранилища (как у stay_out_daemon.py)
+SPEED_KEYS = {"app": "game_tick_duration", "timer": "game_speed"}
+
+# Команды, меняющие часы: передаются запущенному интерфейсу, без него - пишутся в базу
+WRITE_COMMANDS = ("set", "start", "pause", "stop", "reset")
+
+# Запросы: база открывается только для чтения
+QUERY_COMMANDS = ("now", "at", "when")
+
+
+def load_clock(state, scope):
+    """Часы области по якорю из базы: идущие - на текущий момент, как после перезапуска интерфейса"""
+    clock = GameClock(state.settings.get(SPEED_KEYS[scope], 6870), state.settings.get("real_time_tick", 1000))
+    journal = ClockJournal(clock, store=state)
+    journal.restore()
+    return clock, journal
+
+
+def hms(game_ms):
+    """ЧЧ:ММ:СС без таблицы format_time: ее построение (86 400 строк) дороже всего разового запуска"""
+    minutes, seconds = divmod(game_ms % DAY_MS // 1000, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def describe(clock):
+    if clock.running:
+        state = "на паузе" if clock.paused else "идет"
+    else:
+        state = "остановлено"
+    return f"{hms(clock.now_ms())} ({state}, {clock.game_tick_duration} мс)"
+
+
+def _parse_clock_time(text):
+    """ЧЧ:ММ:СС или ЧЧ:ММ в миллисекунды от начала суток"""
+    if text.count(":") == 1:
+        text += ":00"
+    return parse_time(text)
+
+
+def _wall_text(wall_ns):
+    moment = time.localtime(wall_ns // NS_PER_SECOND)
+    if moment[:3] == time.localtime()[:3]:
+        return time.strftime("%H:%M:%S", moment)
+    return time.strftime("%Y-%m-%d %H:%M:%S", moment)
+
+
+def game_at(clock, real_time):
+    """Игровое время в реальный момент ЧЧ:ММ[:СС] сегодняшних местных суток (по текущей скорости)"""
+    midnight = time.mktime(time.localtime()[:3] + (0, 0, 0, 0, 0, -1))
+    wall_ns = int(midnight) * NS_PER_SECOND + _parse_clock_time(real_time) * NS_PER_MS
+    # Источник часов монотонный: настенный момент переносится на него
+    real = wall_ns - (time.time_ns() - clock.real_now())
+    return hms(clock.game_at(real) // NS_PER_MS)
+
+
+def when(clock, game_time):
+    """Ближайший реальный момент, когда игровое время дойдет до ЧЧ:ММ:СС, или None, если время стоит"""
+    reals = OccurrencePlanner(clock).next_occurrences(_parse_clock_time(game_time))
+    if not reals:
+        return None
+    wait_s = max(0, reals[0] - clock.real_now()) // NS_PER_SECOND
+    wall_ns = time.time_ns() + (reals[0] - clock.real_now())
+    return f"{_wall_text(wall_ns)} (через {wait_s // 60} мин {wait_s % 60} с)"
+
+
+def change(state, scope, command, value):
+    """Команда изменения часов: запущенному интерфейсу, если он есть, иначе прямо в базу"""
+    if command == "set":
+        value = hms(_parse_clock_time(value))
+    # Управляющий сокет слушает интерфейс области app; запросы времени его не импортируют
+    if scope == "app":
+        from stay_out_core import control
+        reply = control.send([command] if value is None else [command, value])
+        if reply is not None:
+            # Интерфейс ведет свой журнал: запись в базу мимо него он бы перезаписал
+            if "error" in reply:
+                raise ValueError(reply["error"])
+            return control.describe(reply)
+
+    clock, journal = load_clock(state, scope)
+    if command == "set":
+        clock.set_ms(parse_time(value))
+    else:
+        getattr(clock, command)()
+    journal.record()
+    return describe(clock)
+
+
+def run(args, store):
+    """Ответ на команду одной строкой; None - ответа нет (время стоит)"""
+    if args.command == "skip-import":
+        store.skip_legacy_import()
+        return "Перенос прежних JSON-файлов отключен"
+    state = store.scope(args.scope)
+    if args.command in WRITE_COMMANDS:
+        return change(state, args.scope, args.command, args.time)
+    clock, _ = load_clock(state, args.scope)
+    if args.command == "now":
+        return describe(clock) if args.verbose else hms(clock.now_ms())
+    if args.command == "at":
+        return game_at(clock, args.time)
+    return when(clock, args.time)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Игровое время Stay Out из командной строки")
+    parser.add_argument("--scope", choices=sorted(SPEED_KEYS), default="app",
+                        help="чьи часы: app - расширенная версия, timer - полная и консольная")
+    commands = parser.add_subparsers(dest="command", required=True)
+    now = commands.add_parser("now", help="текущее игровое время")
+    now.add_argument("-v", "--verbose", action="store_true", help="с состоянием часов и скоростью")
+    commands.add_parser("at", help="игровое время в реальный момент сегодня").add_argument("time", help="ЧЧ:ММ[:СС]")
+    commands.add_parser("when", help="когда игровое время дойдет до ЧЧ:ММ:СС").add_argument("time", help="ЧЧ:ММ[:СС]")
+    commands.add_parser("set", help="установить игровое время").add_argument("time", help="ЧЧ:ММ:СС")
+    for name, text in (("start", "запустить часы"), ("pause", "пауза"), ("stop", "остановить"), ("reset", "сбросить")):
+        commands.add_parser(name, help=text).set_defaults(time=None)
+    commands.add_parser("skip-import", help="не переносить в базу JSON-файлы прежних версий")
+    args = parser.parse_args(argv)
+
+    if args.command in QUERY_COMMANDS:
+        # Запрос раз в секунду из строки состояния: только чтение, без блокировки записи и миграций
+        store = StateStore(readonly=True)
+    elif args.command == "skip-import":
+        # Отказ от переноса не должен сначала сам перенести найденные файлы
+        store = StateStore(legacy_dir=[])
+    else:
+        store = StateStore()
+    try:
+        answer = run(args, store)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+    finally:
+        store.close()
+    if answer is None:
+        print("Игровое время не идет", file=sys.stderr)
+        return 1
+    print(answer)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
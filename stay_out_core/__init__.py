@@ -0,0 +1,57 @@
+"""
+Общее ядро таймера Stay Out, используемое всеми интерфейсами
+
+Имена пакета загружают свой модуль при первом обращении: разовому запуску
+(stay_out_cli.py) не нужны ни NumPy панели часов, ни будильники, ни
+уведомления, а их импорт стоил бы больше самого запроса.
+"""
+from importlib import import_module
+
+# Имя -> модуль пакета, где оно определено
+_EXPORTS = {
+    "GAME_WEEKDAYS": "alarms",
+    "Alarm": "alarms",
+    "AlarmEngine": "alarms",
+    "AlarmStore": "alarms",
+    "Recurrence": "alarms",
+    "next_due_ms": "alarms",
+    "ClockBoard": "board",
+    "DAY_MS": "clock",
+    "DEFAULT_GAME_TICK": "clock",
+    "DEFAULT_REAL_TICK": "clock",
+    "NS_PER_MS": "clock",
+    "NS_PER_SECOND": "clock",
+    "GameClock": "clock",
+    "day_strings": "clock",
+    "format_time": "clock",
+    "parse_time": "clock",
+    "Countdown": "countdown",
+    "CountdownTimers": "countdown",
+    "ClockJournal": "journal",
+    "Notifier": "notify",
+    "OccurrencePlanner": "planner",
+    "RenderLayer": "render",
+    "CallQueue": "scheduler",
+    "TickScheduler": "scheduler",
+    "wall_second_source": "scheduler",
+    "CLOCK_SOURCES": "sources",
+    "ManualClock": "sources",
+    "resolve_source": "sources",
+    "StateStore": "store",
+    "TimingWheel": "wheel",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module("." + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,244 @@
+"""
+Импорт и экспорт расписаний будильников (CSV/JSON) потоковым разбором
+"""
+import csv
+import json
+import os
+import re
+
+from .alarms import Recurrence
+from .clock import format_time, parse_time
+
+ALARM_HEADER = ("time", "description", "repeat")
+DEFAULT_DESCRIPTION = "Будильник"
+
+# Заголовки, которые пропускаются в первой строке CSV
+_HEADER_NAMES = {"time", "время", "время будильника"}
+
+_CHUNK = 64 * 1024
+
+# Поиск границ элемента JSON: структурные символы вне строк, конец строки внутри
+_STRUCTURE = re.compile(r'["\[\]{},]')
+_STRING_END = re.compile(r'["\\]')
+
+
+class ScheduleError:
+    """Строка файла, которую не удалось загрузить"""
+    __slots__ = ("line", "text", "message")
+
+    def __init__(self, line, text, message):
+        self.line = line
+        self.text = text
+        self.message = message
+
+    def __str__(self):
+        return f"строка {self.line}: {self.message} ({self.text})"
+
+
+class BadItem:
+    """Элемент JSON-массива, который не разбирается: отдается вместо значения"""
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+
+def _detect_format(path, fmt):
+    return (fmt or os.path.splitext(path)[1].lstrip(".") or "csv").lower()
+
+
+def _delimiter(line):
+    """Разделитель по первой строке: запятая, а также ';' (Excel) и табуляция"""
+    for delimiter in (",", ";", "\t"):
+        if delimiter in line:
+            return delimiter
+    return ","
+
+
+def _iter_csv(f):
+    first = ""
+    for first in f:
+        if first.strip() and not first.lstrip().startswith("#"):
+            break
+    f.seek(0)
+    reader = csv.reader(f, delimiter=_delimiter(first))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _iter_json(f):
+    """
+    Элементы JSON-массива по одному, не читая файл целиком. Построчная
+    позиция не считается: номер элемента (с 1) служит номером строки.
+
+    Границы элемента находятся по скобкам и строкам, а json разбирает
+    только сам элемент: поврежденный отдается как BadItem, и чтение
+    продолжается со следующего. Неисправимы лишь ошибки всего потока -
+    нет "[" в начале, незакрытая строка или скобка, нет "]" в конце: за
+    ними границ элементов не найти, и поднимается ValueError. Буфер
+    обрезается только при дочитывании, а не после каждого элемента.
+    """
+    decoder = json.JSONDecoder()
+    buf = f.read(_CHUNK)
+    eof = not buf
+    pos = len(buf) - len(buf.lstrip())
+    if buf[pos:pos + 1] != "[":
+        raise ValueError("Ожидается JSON-массив будильников")
+    pos += 1
+    number = 0
+    while True:
+        # Пропуск пробелов и запятых между элементами
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(_CHUNK), 0
+            eof = not buf
+        if pos >= len(buf):
+            raise ValueError("Незавершенный JSON-массив")
+        if buf[pos] == "]":
+            return
+
+        # Конец элемента: запятая или "]" вне строк и вложенных скобок
+        scan = pos
+        depth = 0
+        in_string = False
+        while True:
+            match = (_STRING_END if in_string else _STRUCTURE).search(buf, scan)
+            if match is None:
+                if eof:
+                    raise ValueError("Незавершенный JSON-массив")
+                chunk = f.read(_CHUNK)
+                eof = not chunk
+                buf, scan, pos = buf[pos:] + chunk, scan - pos, 0
+                continue
+            char = match.group()
+            scan = match.end()
+            if in_string:
+                if char == "\\":
+                    scan += 1  # Экранированный символ, в том числе кавычка
+                else:
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in "[{":
+                depth += 1
+            elif char in "]}":
+                if depth:
+                    depth -= 1
+                elif char == "]":
+                    end = match.start()
+                    break
+                # Лишняя "}" остается в тексте элемента: он будет поврежденным
+            elif not depth:
+                end = match.start()
+                break
+
+        text = buf[pos:end].strip()
+        number += 1
+        try:
+            item, used = decoder.raw_decode(text)
+            if used != len(text):
+                raise ValueError
+        except ValueError:
+            item = BadItem(text)
+        yield number, item
+        pos = end
+
+
+def _row_fields(fmt, item):
+    """(время, описание, повтор) из строки CSV или элемента JSON"""
+    if fmt == "json":
+        if isinstance(item, dict):
+            return item.get("time"), item.get("description"), item.get("repeat")
+        if isinstance(item, str):
+            return item, None, None
+        if not isinstance(item, list):
+            return None, None, None
+    fields = list(item[:3]) + [None] * (3 - len(item[:3]))
+    return fields[0], fields[1], fields[2]
+
+
+def iter_alarms(path, fmt=None):
+    """
+    Поток (номер строки, time_ms, описание, Recurrence, ошибка) по файлу
+    расписания. Время проверяется так же, как при ручном добавлении (parse_time);
+    ошибочная строка отдается с ScheduleError и не прерывает чтение. В CSV
+    пропускаются пустые строки и комментарии (#).
+    """
+    fmt = _detect_format(path, fmt)
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        items = _iter_json(f) if fmt == "json" else _iter_csv(f)
+        number = 0
+        # Заголовок CSV ищется в первой непустой строке, а не обязательно в первой
+        header_allowed = fmt != "json"
+        while True:
+            try:
+                number, item = next(items)
+            except StopIteration:
+                return
+            except (ValueError, csv.Error) as e:
+                # Синтаксис файла сломан: дальше читать нечего, но загруженное остается
+                yield number + 1, None, None, None, ScheduleError(number + 1, "", str(e))
+                return
+            if isinstance(item, BadItem):
+                yield number, None, None, None, ScheduleError(number, item.text[:80], "Поврежденный элемент JSON")
+                continue
+            if fmt != "json":
+                if not any(field.strip() for field in item):
+                    continue
+                if item[0].lstrip().startswith("#"):
+                    continue  # Строка-комментарий
+            time_str, description, repeat = _row_fields(fmt, item)
+            if not isinstance(time_str, str):
+                yield number, None, None, None, ScheduleError(number, str(item), "Нет времени будильника")
+                continue
+            if header_allowed:
+                header_allowed = False
+                if time_str.strip().lower() in _HEADER_NAMES:
+                    continue
+            try:
+                time_ms = parse_time(time_str)
+                rule = Recurrence.from_spec(str(repeat) if repeat is not None else "", time_ms)
+            except ValueError as e:
+                yield number, None, None, None, ScheduleError(number, time_str, str(e))
+                continue
+            description = str(description).strip() if description is not None else ""
+            yield number, time_ms, description or DEFAULT_DESCRIPTION, rule, None
+
+
+def read_alarms(path, fmt=None):
+    """Все годные строки (time_ms, описание, Recurrence) и список ошибок - для пакетной загрузки"""
+    rows = []
+    errors = []
+    for _, time_ms, description, rule, error in iter_alarms(path, fmt):
+        if error is None:
+            rows.append((time_ms, description, rule))
+        else:
+            errors.append(error)
+    return rows, errors
+
+
+def write_alarms(path, alarms, fmt=None):
+    """Запись будильников (записи с time_ms, description и rule) построчно; возвращает их число"""
+    fmt = _detect_format(path, fmt)
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "json":
+            f.write("[")
+            for alarm in alarms:
+                f.write(",\n " if count else "\n ")
+                item = {"time": format_time(alarm.time_ms), "description": alarm.description}
+                if alarm.rule.repeats:
+                    item["repeat"] = alarm.rule.spec()
+                json.dump(item, f, ensure_ascii=False)
+                count += 1
+            f.write("\n]\n")
+        else:
+            writer = csv.writer(f)
+            writer.writerow(ALARM_HEADER)
+            for alarm in alarms:
+                writer.writerow((format_time(alarm.time_ms), alarm.description, alarm.rule.spec()))
+                count += 1
+    return count
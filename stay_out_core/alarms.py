@@ -0,0 +1,375 @@
+"""
+Будильники на игровом времени: куча сроков с обнаружением пересечения
+"""
+import heapq
+from itertools import count
+
+from .clock import DAY_MS, NS_PER_MS
+
+
+# Дни недели игрового календаря: игровой день 0 - понедельник
+GAME_WEEKDAYS = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+
+
+def next_due_ms(target_ms, from_ms):
+    """Первый абсолютный игровой момент (мс) не раньше from_ms со временем суток target_ms"""
+    return from_ms + (int(target_ms) - from_ms) % DAY_MS
+
+
+class Recurrence:
+    """
+    Правило повторения будильника. Хранится только само правило, а не
+    список наступлений: next_due() дает ближайшее наступление не раньше
+    заданного момента за O(1), поэтому в куче у каждого правила одна запись.
+
+    once     - однократно в time_ms (время суток)
+    daily    - каждый игровой день в time_ms
+    interval - каждые every_ms игровых мс, со сдвигом time_ms от 00:00:00 дня 0
+    weekdays - в time_ms по дням игровой недели из weekdays (0 - понедельник)
+    """
+    __slots__ = ("kind", "time_ms", "every_ms", "weekdays")
+
+    KINDS = ("once", "daily", "interval", "weekdays")
+
+    def __init__(self, kind, time_ms=0, every_ms=0, weekdays=()):
+        if kind not in self.KINDS:
+            raise ValueError(f"Неизвестный повтор: {kind}")
+        self.kind = kind
+        self.time_ms = int(time_ms) % DAY_MS
+        self.every_ms = int(every_ms)
+        self.weekdays = tuple(sorted({int(day) % 7 for day in weekdays}))
+        if kind == "interval" and self.every_ms <= 0:
+            raise ValueError("Интервал повтора должен быть больше нуля")
+        if kind == "weekdays" and not self.weekdays:
+            raise ValueError("Не выбраны дни недели")
+
+    @classmethod
+    def once(cls, time_ms):
+        return cls("once", time_ms)
+
+    @classmethod
+    def daily(cls, time_ms):
+        return cls("daily", time_ms)
+
+    @classmethod
+    def every_minutes(cls, minutes, time_ms=0):
+        return cls("interval", time_ms, int(minutes) * 60000)
+
+    @classmethod
+    def on_weekdays(cls, weekdays, time_ms):
+        return cls("weekdays", time_ms, weekdays=weekdays)
+
+    @property
+    def repeats(self):
+        return self.kind != "once"
+
+    def __eq__(self, other):
+        return (isinstance(other, Recurrence) and self.kind == other.kind and self.time_ms == other.time_ms
+                and self.every_ms == other.every_ms and self.weekdays == other.weekdays)
+
+    def __repr__(self):
+        return f"Recurrence({self.spec() or 'once'!r}, {self.time_ms})"
+
+    def next_due(self, from_ms):
+        """Первое наступление (абсолютные игровые мс) не раньше from_ms"""
+        if self.kind == "interval":
+            return from_ms + (self.time_ms - from_ms) % self.every_ms
+        due = next_due_ms(self.time_ms, from_ms)
+        if self.kind == "weekdays":
+            day = due // DAY_MS
+            # Ближайший выбранный день - не дальше недели вперед
+            due += min((weekday - day) % 7 for weekday in self.weekdays) * DAY_MS
+        return due
+
+    def spec(self):
+        """Краткая запись для файлов расписания: '', 'daily', 'every:30', 'days:0,2,4'"""
+        if self.kind == "daily":
+            return "daily"
+        if self.kind == "interval":
+            minutes, rest = divmod(self.every_ms, 60000)
+            return f"every:{minutes}" if not rest else f"every_ms:{self.every_ms}"
+        if self.kind == "weekdays":
+            return "days:" + ",".join(map(str, self.weekdays))
+        return ""
+
+    @classmethod
+    def from_spec(cls, spec, time_ms):
+        """Обратное к spec(); ValueError при ошибке"""
+        spec = (spec or "").strip().lower()
+        if not spec or spec == "once":
+            return cls.once(time_ms)
+        if spec == "daily":
+            return cls.daily(time_ms)
+        kind, _, value = spec.partition(":")
+        if kind == "every":
+            return cls.every_minutes(int(value), time_ms)
+        if kind == "every_ms":
+            return cls("interval", time_ms, int(value))
+        if kind == "days":
+            return cls.on_weekdays([int(day) for day in value.split(",") if day.strip()], time_ms)
+        raise ValueError(f"Неизвестный повтор: {spec}")
+
+    def describe(self):
+        """Текст для списка будильников"""
+        if self.kind == "daily":
+            return "Каждый день"
+        if self.kind == "interval":
+            minutes, rest = divmod(self.every_ms, 60000)
+            return f"Каждые {minutes} мин" if not rest else f"Каждые {self.every_ms / 60000:g} мин"
+        if self.kind == "weekdays":
+            return ", ".join(GAME_WEEKDAYS[day] for day in self.weekdays)
+        return "Однократно"
+
+
+class AlarmEngine:
+    """
+    Будильники в min-куче по абсолютному игровому времени (мс) срабатывания.
+
+    За тик часы проходят несколько игровых секунд (при 6870 мс - около семи),
+    поэтому сравнение строки текущей секунды с временем будильника его
+    пропускает. poll() вместо этого снимает с вершины кучи все сроки,
+    пересеченные с прошлого вызова, за O(k log n). Срок абсолютный, поэтому
+    будильник на 00:10 при текущем 23:50 стоит на следующие сутки.
+
+    Установка времени и сброс (новая эпоха часов) - это скачок, а не ход
+    времени: будильники ничего не срабатывают, а их сроки пересчитываются
+    от нового игрового времени. Удаление ленивое: запись помечается и
+    выбрасывается, когда доходит до вершины.
+
+    Повторяющийся будильник (Recurrence) тоже занимает одну запись: при
+    срабатывании она ставится обратно со следующим наступлением после
+    текущего игрового времени. Наступления, пересеченные за один тик,
+    сливаются в одно срабатывание.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._heap = []
+        self._entries = {}
+        self._seq = count()
+        self._epoch = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _epoch_key(self):
+        seg_real, seg_game, _, _, epoch = self.clock.timeline()
+        # Индекс эпохи не меняется, если время установлено дважды в один момент
+        return epoch, seg_real[epoch], seg_game[epoch]
+
+    def _sync(self):
+        """Пересчет сроков после установки времени или сброса"""
+        epoch = self._epoch_key()
+        if epoch != self._epoch:
+            self._epoch = epoch
+            self.rearm()
+
+    def rearm(self):
+        """Все сроки заново от текущего игрового времени, O(n)"""
+        now_ms = self.clock.now_ms()
+        self._heap = []
+        for key, entry in self._entries.items():
+            entry = [entry[3].next_due(now_ms), next(self._seq), key, entry[3]]
+            self._entries[key] = entry
+            self._heap.append(entry)
+        heapq.heapify(self._heap)
+
+    def add(self, key, when):
+        """
+        Поставить будильник key (заменяет прежний): when - время суток в мс
+        (однократно) или Recurrence.
+        """
+        self._sync()
+        self.remove(key)
+        rule = when if isinstance(when, Recurrence) else Recurrence.once(when)
+        entry = [rule.next_due(self.clock.now_ms()), next(self._seq), key, rule]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def add_many(self, items):
+        """Пакетная постановка пар (key, when): одна перестройка кучи за O(n)"""
+        self._sync()
+        now_ms = self.clock.now_ms()
+        for key, when in items:
+            self.remove(key)
+            rule = when if isinstance(when, Recurrence) else Recurrence.once(when)
+            entry = [rule.next_due(now_ms), next(self._seq), key, rule]
+            self._entries[key] = entry
+            self._heap.append(entry)
+        heapq.heapify(self._heap)
+
+    def remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[2] = None
+
+    def clear(self):
+        self._entries.clear()
+        self._heap = []
+
+    def due_ms(self, key):
+        """Абсолютный игровой срок (мс) будильника или None"""
+        self._sync()
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def _top(self):
+        heap = self._heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def poll(self):
+        """Ключи будильников, чьи сроки пересечены с прошлого вызова, по порядку сроков"""
+        self._sync()
+        now_ms = self.clock.now_ms()
+        fired = []
+        heap = self._heap
+        while True:
+            top = self._top()
+            if top is None or top[0] > now_ms:
+                break
+            fired.append(top[2])
+            rule = top[3]
+            if rule.repeats:
+                # Следующее наступление после текущего момента, той же записью
+                top[0] = rule.next_due(now_ms + 1)
+                heapq.heapreplace(heap, top)
+            else:
+                heapq.heappop(heap)
+                del self._entries[top[2]]
+        return fired
+
+    def upcoming(self, limit):
+        """Ближайшие сроки по порядку: [(ключ, игровой срок мс)], не больше limit, за O(n log limit)"""
+        self._sync()
+        entries = heapq.nsmallest(limit, (entry for entry in self._heap if entry[2] is not None))
+        return [(entry[2], entry[0]) for entry in entries]
+
+    def next_real(self):
+        """Реальный момент (нс) ближайшего срока; None если время стоит или будильников нет"""
+        self._sync()
+        top = self._top()
+        if top is None:
+            return None
+        return self.clock.real_at(top[0] * NS_PER_MS)
+
+
+class Alarm:
+    """Запись будильника: время суток (мс), описание, правило повтора, сработал ли и сколько раз"""
+    __slots__ = ("id", "time_ms", "description", "rule", "fired", "fire_count")
+
+    def __init__(self, alarm_id, time_ms, description, rule=None, fired=False):
+        self.id = alarm_id
+        self.time_ms = int(time_ms) % DAY_MS
+        self.description = description
+        self.rule = rule if rule is not None else Recurrence.once(self.time_ms)
+        self.fired = fired
+        self.fire_count = 0
+
+
+class AlarmStore:
+    """
+    Будильники по id в порядке добавления. Два будильника на одно время -
+    разные записи, удаление идет по id. Изменения состояния (mark_fired)
+    копятся в наборе измененных id, чтобы список на экране обновлял только
+    эти строки; version растет при добавлении и удалении (нужна перестройка).
+    """
+
+    def __init__(self):
+        self._alarms = {}
+        self._order = None
+        self._next_id = 1
+        self._dirty = set()
+        self.version = 0
+
+    def __len__(self):
+        return len(self._alarms)
+
+    def __iter__(self):
+        return iter(self._alarms.values())
+
+    def __contains__(self, alarm_id):
+        return alarm_id in self._alarms
+
+    def get(self, alarm_id):
+        return self._alarms.get(alarm_id)
+
+    def add(self, time_ms, description, rule=None):
+        return self.extend([(time_ms, description, rule)])[0]
+
+    def extend(self, rows):
+        """Пакетное добавление (time_ms, описание[, правило]); возвращает новые записи"""
+        added = []
+        for row in rows:
+            alarm = Alarm(self._next_id, *row)
+            self._next_id += 1
+            self._alarms[alarm.id] = alarm
+            added.append(alarm)
+        if added:
+            self._order = None
+            self.version += 1
+        return added
+
+    def restore(self, rows):
+        """
+        Сохраненные записи (id, time_ms, описание, правило или его spec(),
+        сработал, сколько раз) с прежними id; возвращает новые записи
+        """
+        added = []
+        for alarm_id, time_ms, description, rule, fired, fire_count in rows:
+            if not isinstance(rule, Recurrence):
+                rule = Recurrence.from_spec(rule, time_ms)
+            alarm = Alarm(alarm_id, time_ms, description, rule, bool(fired))
+            alarm.fire_count = fire_count
+            self._alarms[alarm.id] = alarm
+            self._next_id = max(self._next_id, alarm.id + 1)
+            added.append(alarm)
+        if added:
+            self._order = None
+            self.version += 1
+        return added
+
+    def remove(self, alarm_id):
+        alarm = self._alarms.pop(alarm_id, None)
+        if alarm is not None:
+            self._order = None
+            self._dirty.discard(alarm_id)
+            self.version += 1
+        return alarm
+
+    def clear(self):
+        self._alarms.clear()
+        self._order = None
+        self._dirty.clear()
+        self.version += 1
+
+    def index(self, alarm_id):
+        """Позиция будильника в списке (для прокрутки к нему)"""
+        return self._ordered().index(alarm_id)
+
+    def _ordered(self):
+        if self._order is None:
+            self._order = list(self._alarms)
+        return self._order
+
+    def window(self, start, count):
+        """Записи с позиции start, не больше count - только видимые строки списка"""
+        alarms = self._alarms
+        return [alarms[alarm_id] for alarm_id in self._ordered()[start:start + count]]
+
+    def mark_fired(self, alarm_id):
+        alarm = self._alarms.get(alarm_id)
+        if alarm is not None:
+            alarm.fired = True
+            alarm.fire_count += 1
+            self._dirty.add(alarm_id)
+
+    def take_dirty(self):
+        """id записей, измененных с прошлого вызова"""
+        dirty = self._dirty
+        self._dirty = set()
+        return dirty
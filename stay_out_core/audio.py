@@ -0,0 +1,241 @@
+"""
+Звуки будильника: синтез в память, кэш и проигрывание в фоновом потоке
+"""
+import io
+import math
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import wave
+from array import array
+
+SAMPLE_RATE = 22050
+
+# Мелодии: (частота Гц, длительность мс); частота 0 - пауза
+PATTERNS = {
+    "alarm": [(1000, 500), (0, 100)] * 3,
+    "test": [(800, 300), (0, 100), (1000, 300), (0, 100), (1200, 300)],
+}
+
+# Плееры Linux/macOS в порядке предпочтения
+PLAYERS = (("pw-play",), ("paplay",), ("aplay", "-q"), ("afplay",))
+
+_FADE = SAMPLE_RATE // 200  # 5 мс нарастания и спада против щелчков
+
+# Элемент очереди: остановить поток (None в очереди - синтез заранее, см. prepare())
+_STOP = object()
+
+
+def synthesize(pattern, volume):
+    """WAV (байты, 16 бит моно) мелодии pattern с громкостью volume (0-100)"""
+    amplitude = 32767 * max(0, min(100, int(volume))) / 100
+    samples = array('h')
+    for freq, duration_ms in PATTERNS[pattern]:
+        n = SAMPLE_RATE * duration_ms // 1000
+        if freq == 0 or amplitude == 0:
+            samples.extend(array('h', bytes(2 * n)))
+            continue
+        step = 2 * math.pi * freq / SAMPLE_RATE
+        fade = min(_FADE, n // 2) or 1
+        samples.extend(
+            int(amplitude * min(1.0, i / fade, (n - i) / fade) * math.sin(i * step))
+            for i in range(n))
+    if sys.byteorder == "big":
+        samples.byteswap()
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(samples.tobytes())
+    return out.getvalue()
+
+
+def _winsound_backend():
+    import winsound  # Только Windows: импорт при первом звуке, а не при загрузке модуля
+
+    def play(wav, path):
+        # SND_MEMORY: волновая форма из кэша, без временного файла
+        winsound.PlaySound(wav, winsound.SND_MEMORY)
+    return play
+
+
+def _player_backend():
+    for command in PLAYERS:
+        if shutil.which(command[0]):
+            def play(wav, path, command=command):
+                subprocess.run(command + (path,), stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, check=False)
+            play.needs_file = True
+            return play
+    return None
+
+
+def default_backend():
+    """Проигрыватель для текущей платформы или None (тогда нужен системный звонок)"""
+    if sys.platform == "win32":
+        try:
+            return _winsound_backend()
+        except ImportError:
+            return None
+    return _player_backend()
+
+
+class AudioEngine:
+    """
+    Очередь звуков с одним фоновым потоком. play() из потока Tk только
+    кладет запрос в очередь и сразу возвращается, поэтому будильник не
+    останавливает ни интерфейс, ни часы. Волновые формы синтезируются
+    один раз на пару (мелодия, громкость) и хранятся в памяти; для внешних
+    плееров Linux/macOS они же записываются во временный файл.
+
+    prepare(volume) синтезирует все мелодии заранее в том же потоке -
+    при запуске и после смены громкости, чтобы первый будильник не ждал
+    синтеза. Подряд идущие prepare() (движение ползунка) сливаются в
+    один, по последней громкости; формы прежней громкости выбрасываются.
+
+    backend - функция (wav_bytes, path) или None для выбора по платформе
+    при первом звуке. Если проигрывателя нет, play() возвращает False.
+    on_error(сообщение) вызывается в фоновом потоке при ошибке
+    проигрывания.
+    """
+
+    def __init__(self, backend=None, maxsize=8, on_error=None):
+        self._backend = backend
+        self._resolved = backend is not None
+        self._queue = queue.Queue(maxsize)
+        self._thread = None
+        self._cache = {}
+        self._files = {}
+        self._lock = threading.Lock()
+        self._on_error = on_error
+        self._warm_volume = None
+        self.played = 0
+        self.dropped = 0
+        self.errors = 0
+
+    @property
+    def available(self):
+        if not self._resolved:
+            self._backend = default_backend()
+            self._resolved = True
+        return self._backend is not None
+
+    def play(self, pattern="alarm", volume=100):
+        """Поставить мелодию в очередь; False если звук воспроизвести нечем"""
+        if not self.available:
+            return False
+        if volume <= 0:
+            return True
+        self._start()
+        try:
+            self._queue.put_nowait((pattern, int(volume)))
+        except queue.Full:
+            # Очередь полна: звук уже играет, новые не накапливаются
+            self.dropped += 1
+        return True
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audio", daemon=True)
+            self._thread.start()
+
+    def prepare(self, volume):
+        """Синтезировать все мелодии для volume в фоне заранее"""
+        if not self.available or volume <= 0:
+            return
+        with self._lock:
+            queued = self._warm_volume is not None
+            self._warm_volume = int(volume)
+        if queued:
+            return
+        self._start()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            # Очередь занята звуками: форма синтезируется при проигрывании
+            with self._lock:
+                self._warm_volume = None
+
+    def _warm(self):
+        with self._lock:
+            volume, self._warm_volume = self._warm_volume, None
+        for key in [key for key in self._cache if key[1] != volume]:
+            with self._lock:
+                del self._cache[key]
+            path = self._files.pop(key, None)
+            if path is not None:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        for pattern in PATTERNS:
+            wav = self.waveform(pattern, volume)
+            if getattr(self._backend, "needs_file", False):
+                self._path((pattern, volume), wav)
+
+    def waveform(self, pattern, volume):
+        """Кэшированный WAV для (pattern, volume)"""
+        key = (pattern, int(volume))
+        with self._lock:
+            wav = self._cache.get(key)
+            if wav is None:
+                wav = self._cache[key] = synthesize(pattern, volume)
+        return wav
+
+    def _path(self, key, wav):
+        path = self._files.get(key)
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="stayout_", suffix=".wav")
+            with os.fdopen(fd, "wb") as f:
+                f.write(wav)
+            self._files[key] = path
+        return path
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            try:
+                if item is None:
+                    self._warm()
+                    continue
+                wav = self.waveform(*item)
+                path = self._path(item, wav) if getattr(self._backend, "needs_file", False) else None
+                self._backend(wav, path)
+                self.played += 1
+            except Exception as e:
+                self.errors += 1
+                if self._on_error is not None:
+                    self._on_error(f"Не удалось воспроизвести звук: {e}")
+            finally:
+                self._queue.task_done()
+
+    def wait(self):
+        """Дождаться окончания всех поставленных звуков (для тестов)"""
+        self._queue.join()
+
+    def close(self, timeout=1.0):
+        """Остановить поток и удалить временные файлы"""
+        if self._thread is not None:
+            # Недоигранные звуки при выходе не нужны
+            while True:
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                except queue.Empty:
+                    break
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+        for path in self._files.values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._files.clear()
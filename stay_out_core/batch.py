@@ -0,0 +1,176 @@
+"""
+Пакетный перевод реального времени в игровое и обратно, экспорт прогноза
+"""
+import json
+import os
+import time
+
+from .clock import DAY_MS, NS_PER_MS, NS_PER_SECOND, day_strings
+
+try:
+    import numpy as np
+except ImportError:  # NumPy не обязателен: без него используются обычные списки
+    np = None
+
+# Нет ответа в real_at_many (время стоит или цель вне текущей эпохи)
+NEVER = -(2 ** 63)
+
+FORECAST_HEADER = ("Дата", "Реальное время", "Игровое время", "Игровой день")
+
+
+def _segments(clock, epoch_only=False):
+    seg_real, seg_game, seg_num, seg_den, epoch = clock.timeline()
+    lo = epoch if epoch_only else 0
+    # Копия, а не frombuffer: экспорт буфера запретил бы часам дописывать сегменты
+    return (np.array(seg_real[lo:], dtype=np.int64), np.array(seg_game[lo:], dtype=np.int64),
+            np.array(seg_num[lo:], dtype=np.int64), np.array(seg_den[lo:], dtype=np.int64))
+
+
+def game_at_many(clock, reals):
+    """Игровое время (нс) для массива реальных моментов (нс источника часов)"""
+    if np is None:
+        return [clock.game_at(real) for real in reals]
+
+    reals = np.asarray(reals, dtype=np.int64)
+    seg_real, seg_game, seg_num, seg_den = _segments(clock)
+    idx = np.searchsorted(seg_real, reals, side="right") - 1
+    np.maximum(idx, 0, out=idx)
+    num = seg_num[idx]
+    den = seg_den[idx]
+    # delta * num // den через divmod, чтобы не переполнить int64 на неделях в нс
+    q, r = np.divmod(reals - seg_real[idx], den)
+    return seg_game[idx] + q * num + r * num // den
+
+
+def real_at_many(clock, games):
+    """Первые реальные моменты (нс) достижения игровых времен; NEVER если недостижимо"""
+    if np is None:
+        result = []
+        for game in games:
+            real = clock.real_at(game)
+            result.append(NEVER if real is None else real)
+        return result
+
+    games = np.asarray(games, dtype=np.int64)
+    seg_real, seg_game, seg_num, seg_den = _segments(clock, epoch_only=True)
+    idx = np.searchsorted(seg_game, games, side="left") - 1
+    before = idx < 0
+    np.maximum(idx, 0, out=idx)
+    num = seg_num[idx]
+    den = seg_den[idx]
+    stopped = num == 0
+    safe_num = np.where(stopped, 1, num)
+    q, r = np.divmod(games - seg_game[idx], safe_num)
+    result = seg_real[idx] + q * den - (-r * den // safe_num)
+    result[stopped] = NEVER
+    result[before] = np.where(games[before] == seg_game[0], seg_real[0], NEVER)
+    return result
+
+
+def forecast(clock, hours=24, step_s=60, start_wall_s=None):
+    """
+    Игровое время (мс) в каждый шаг реального времени на hours часов вперед.
+    Возвращает (настенные секунды Unix, игровые мс); по умолчанию ряд
+    начинается со следующей целой минуты (секунды) настенных часов.
+    """
+    now_wall = time.time_ns()
+    now_real = clock.real_now()
+    if start_wall_s is None:
+        start_wall_s = (now_wall // NS_PER_SECOND // step_s + 1) * step_s
+    count = int(hours * 3600 // step_s)
+
+    if np is None:
+        walls = [start_wall_s + i * step_s for i in range(count)]
+        reals = [wall * NS_PER_SECOND - now_wall + now_real for wall in walls]
+        return walls, [game // NS_PER_MS for game in game_at_many(clock, reals)]
+
+    walls = start_wall_s + np.arange(count, dtype=np.int64) * step_s
+    reals = walls * NS_PER_SECOND - now_wall + now_real
+    return walls, game_at_many(clock, reals) // NS_PER_MS
+
+
+def _hour_offset(hour):
+    """Смещение местного времени от UTC на весь час Unix или None, если внутри часа оно меняется"""
+    start = time.localtime(hour * 3600).tm_gmtoff
+    return start if time.localtime(hour * 3600 + 3599).tm_gmtoff == start else None
+
+
+def _utc_offsets(walls):
+    """
+    Смещение местного времени (с) для каждого настенного момента: неделя
+    прогноза может пройти переход на летнее время. localtime() - раз на
+    час ряда, и по строке только в часе самого перехода.
+    """
+    if np is None:
+        hours = {}
+        offsets = []
+        for wall in walls:
+            hour = wall // 3600
+            if hour not in hours:
+                hours[hour] = _hour_offset(hour)
+            offset = hours[hour]
+            offsets.append(time.localtime(wall).tm_gmtoff if offset is None else offset)
+        return offsets
+
+    hours, inverse = np.unique(walls // 3600, return_inverse=True)
+    per_hour = [_hour_offset(int(hour)) for hour in hours]
+    offsets = np.array([0 if offset is None else offset for offset in per_hour], dtype=np.int64)[inverse]
+    mixed = np.array([offset is None for offset in per_hour], dtype=bool)[inverse]
+    for i in np.flatnonzero(mixed):
+        offsets[i] = time.localtime(int(walls[i])).tm_gmtoff
+    return offsets
+
+
+def _forecast_columns(walls, games):
+    """Строковые столбцы прогноза за один проход по таблице строк суток"""
+    if len(walls) == 0:
+        return [], [], [], []
+    offsets = _utc_offsets(walls)
+    table = day_strings()
+
+    if np is None:
+        local = [wall + offset for wall, offset in zip(walls, offsets)]
+        dates = {}
+        date_col = []
+        for value in local:
+            day = value // 86400
+            if day not in dates:
+                dates[day] = time.strftime("%Y-%m-%d", time.gmtime(day * 86400))
+            date_col.append(dates[day])
+        return (date_col,
+                [table[value % 86400] for value in local],
+                [table[(game // 1000) % 86400] for game in games],
+                [str(game // DAY_MS) for game in games])
+
+    table = np.array(table, dtype=object)
+    local = walls + offsets
+    days, inverse = np.unique(local // 86400, return_inverse=True)
+    day_names = np.array([time.strftime("%Y-%m-%d", time.gmtime(int(day) * 86400)) for day in days],
+                         dtype=object)
+    return (day_names[inverse].tolist(),
+            table[local % 86400].tolist(),
+            table[(games // 1000) % 86400].tolist(),
+            (games // DAY_MS).astype(str).tolist())
+
+
+def write_forecast(path, clock, hours=24, step_s=60, fmt=None):
+    """Запись прогноза в CSV или JSON (по расширению файла); возвращает число строк"""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".") or "csv").lower()
+    walls, games = forecast(clock, hours, step_s)
+    dates, real_times, game_times, game_days = _forecast_columns(walls, games)
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "json":
+            json.dump({
+                "step_seconds": step_s,
+                "game_tick_duration": clock.game_tick_duration,
+                "real_time_tick": clock.real_time_tick,
+                "real_date": dates,
+                "real_time": real_times,
+                "game_time": game_times,
+                "game_day": [int(day) for day in game_days],
+            }, f, ensure_ascii=False)
+        else:
+            f.write(",".join(FORECAST_HEADER) + "\n")
+            f.write("".join(map("{},{},{},{}\n".format, dates, real_times, game_times, game_days)))
+    return len(dates)
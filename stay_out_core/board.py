@@ -0,0 +1,280 @@
+"""
+Панель именованных игровых часов: много часов в столбцах, один планировщик на все
+"""
+import time
+from array import array
+from itertools import count
+
+from .clock import DEFAULT_GAME_TICK, DEFAULT_REAL_TICK, NS_PER_MS
+from .sources import resolve_source
+
+try:
+    import numpy as np
+except ImportError:  # NumPy не обязателен: без него сроки сравниваются по строкам
+    np = None
+
+# Срок "никогда" в столбце сроков: часы стоят
+NEVER = 2 ** 63 - 1
+
+# Не чаще одной перерисовки панели за столько мс, сколько бы часов ни менялось
+FRAME_MS = 50
+
+# С какого числа часов сроки сравниваются NumPy: на десятке строк вызов дороже цикла
+NUMPY_MIN_ROWS = 32
+
+
+class ClockBoard:
+    """
+    Именованные игровые часы (серверы, персонажи), каждые со своим
+    якорем и скоростью, в столбцах array('q'): якорь (real0, game0),
+    скорость tick/real_tick, флаги запуска и срок следующей смены
+    показываемого значения. Источник реального времени общий.
+
+    Планировщику нужен один срок на всю панель: next_change() - минимум
+    столбца сроков (min() по массиву, без цикла Python), но не раньше
+    чем через frame_ms после прошлой перерисовки - так 50 часов с разными
+    скоростями дают не больше 1000 / frame_ms пробуждений в секунду, а
+    не по пробуждению на каждые часы. due() отдает id часов, чье значение
+    сменилось: столбец сроков сравнивается целиком (маска NumPy, без него -
+    проход по строкам), а сроки пересчитываются только сменившимся.
+
+    Строки удаляются перестановкой последней на место удаленной, поэтому
+    порядок строк не совпадает с порядком добавления; order() - id по
+    порядку добавления. store - область StateStore: каждое изменение часов
+    записывается якорем по настенным часам, restore() продолжает идущие.
+    """
+
+    def __init__(self, source=None, resolution_ms=1000, frame_ms=FRAME_MS, store=None, wall=time.time_ns):
+        self._now = resolve_source(source)
+        self._resolution = int(resolution_ms) * NS_PER_MS
+        self._frame = int(frame_ms) * NS_PER_MS
+        self._store = store
+        self._wall = wall
+        self.ids = array('q')
+        self.names = []
+        self._real0 = array('q')
+        self._game0 = array('q')
+        self._tick = array('q')
+        self._real_tick = array('q')
+        self._running = array('b')
+        self._paused = array('b')
+        self._due = array('q')
+        self._rows = {}
+        self._ids = count(1)
+        self._last_frame = None
+        self.renders = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, clock_id):
+        return clock_id in self._rows
+
+    def order(self):
+        """id часов по порядку добавления"""
+        return sorted(self._rows)
+
+    @property
+    def resolution_ms(self):
+        return self._resolution // NS_PER_MS
+
+    @resolution_ms.setter
+    def resolution_ms(self, value):
+        self._resolution = int(value) * NS_PER_MS
+        self.invalidate()
+
+    def add(self, name, game_ms=0, tick=DEFAULT_GAME_TICK, real_tick=DEFAULT_REAL_TICK, clock_id=None):
+        """Новые остановленные часы; возвращает id"""
+        if clock_id is None:
+            clock_id = next(self._ids)
+        elif clock_id in self._rows:
+            raise ValueError(f"Часы {clock_id} уже есть")
+        self._rows[clock_id] = len(self.ids)
+        self.ids.append(clock_id)
+        self.names.append(name)
+        self._real0.append(self._now())
+        self._game0.append(int(game_ms) * NS_PER_MS)
+        self._tick.append(int(tick))
+        self._real_tick.append(int(real_tick))
+        self._running.append(0)
+        self._paused.append(0)
+        self._due.append(0)  # Показать при ближайшей перерисовке
+        self._save(clock_id)
+        return clock_id
+
+    def remove(self, clock_id):
+        row = self._rows.pop(clock_id)
+        last = len(self.ids) - 1
+        columns = (self.ids, self.names, self._real0, self._game0, self._tick, self._real_tick,
+                   self._running, self._paused, self._due)
+        if row != last:
+            for column in columns:
+                column[row] = column[last]
+            self._rows[self.ids[row]] = row
+        for column in columns:
+            column.pop()
+        if self._store is not None:
+            self._store.delete_named_clock(clock_id)
+
+    def clear(self):
+        for clock_id in self.order():
+            self.remove(clock_id)
+
+    def rename(self, clock_id, name):
+        self.names[self._rows[clock_id]] = name
+        self._save(clock_id)
+
+    def name(self, clock_id):
+        return self.names[self._rows[clock_id]]
+
+    def _active(self, row):
+        return self._running[row] and not self._paused[row]
+
+    def _game_at(self, row, real):
+        game = self._game0[row]
+        if self._active(row):
+            game += (real - self._real0[row]) * self._tick[row] // self._real_tick[row]
+        return game
+
+    def now(self, clock_id):
+        """Игровое время часов в наносекундах"""
+        return self._game_at(self._rows[clock_id], self._now())
+
+    def now_ms(self, clock_id):
+        return self.now(clock_id) // NS_PER_MS
+
+    def state(self, clock_id):
+        """(скорость, реальный тик, запущены, на паузе)"""
+        row = self._rows[clock_id]
+        return self._tick[row], self._real_tick[row], bool(self._running[row]), bool(self._paused[row])
+
+    def _fold(self, row, real):
+        """Перенос якоря в момент real без изменения игрового времени"""
+        self._game0[row] = self._game_at(row, real)
+        self._real0[row] = real
+
+    def _changed(self, clock_id):
+        self._due[self._rows[clock_id]] = 0
+        self._save(clock_id)
+
+    def start(self, clock_id):
+        row = self._rows[clock_id]
+        if self._active(row):
+            return False
+        self._real0[row] = self._now()
+        self._running[row] = 1
+        self._paused[row] = 0
+        self._changed(clock_id)
+        return True
+
+    def pause(self, clock_id):
+        row = self._rows[clock_id]
+        if not self._active(row):
+            return False
+        self._fold(row, self._now())
+        self._paused[row] = 1
+        self._changed(clock_id)
+        return True
+
+    def stop(self, clock_id):
+        row = self._rows[clock_id]
+        if not self._running[row]:
+            return False
+        self._fold(row, self._now())
+        self._running[row] = 0
+        self._paused[row] = 0
+        self._changed(clock_id)
+        return True
+
+    def set_ms(self, clock_id, game_ms):
+        row = self._rows[clock_id]
+        self._real0[row] = self._now()
+        self._game0[row] = int(game_ms) * NS_PER_MS
+        self._changed(clock_id)
+
+    def set_speed(self, clock_id, tick, real_tick=None):
+        """Смена скорости: уже прошедшее время не пересчитывается"""
+        row = self._rows[clock_id]
+        self._fold(row, self._now())
+        self._tick[row] = int(tick)
+        if real_tick is not None:
+            self._real_tick[row] = int(real_tick)
+        self._changed(clock_id)
+
+    def start_all(self):
+        return [clock_id for clock_id in self.order() if self.start(clock_id)]
+
+    def pause_all(self):
+        return [clock_id for clock_id in self.order() if self.pause(clock_id)]
+
+    def _next_due(self, row, real):
+        """Реальный момент следующей смены показываемого значения строки"""
+        if not self._active(row):
+            return NEVER
+        resolution = self._resolution
+        boundary = (self._game_at(row, real) // resolution + 1) * resolution
+        return self._real0[row] - (-(boundary - self._game0[row]) * self._real_tick[row] // self._tick[row])
+
+    def invalidate(self):
+        """Показать все часы заново при ближайшей перерисовке (вкладка открыта, разрешение сменилось)"""
+        for row in range(len(self._due)):
+            self._due[row] = 0
+        self._last_frame = None
+
+    def next_change(self):
+        """Реальный момент ближайшей перерисовки панели (нс источника) или None"""
+        if not self._due:
+            return None
+        deadline = min(self._due)
+        if deadline == NEVER:
+            return None
+        if self._last_frame is not None:
+            deadline = max(deadline, self._last_frame + self._frame)
+        return deadline
+
+    def due(self):
+        """id часов, чье показываемое значение сменилось (их сроки пересчитываются)"""
+        real = self._now()
+        self._last_frame = real
+        due = self._due
+        if np is not None and len(due) >= NUMPY_MIN_ROWS:
+            # Вид на столбец без копирования, отпускается сразу: строки можно добавлять и удалять
+            changed = np.flatnonzero(np.frombuffer(due, dtype=np.int64) <= real).tolist()
+        else:
+            changed = [row for row, deadline in enumerate(due) if deadline <= real]
+        for row in changed:
+            due[row] = self._next_due(row, real)
+        if changed:
+            self.renders += 1
+        return [self.ids[row] for row in changed]
+
+    def checkpoint(self, clock_id):
+        """Строка для хранилища: (id, имя, настенный момент якоря, игровое время в нем, скорость, флаги)"""
+        row = self._rows[clock_id]
+        wall_ns = self._wall() - (self._now() - self._real0[row])
+        return (clock_id, self.names[row], wall_ns, self._game0[row], self._tick[row], self._real_tick[row],
+                bool(self._running[row]), bool(self._paused[row]))
+
+    def _save(self, clock_id):
+        if self._store is not None:
+            self._store.save_named_clock(self.checkpoint(clock_id))
+
+    def restore(self, rows):
+        """Часы из строк checkpoint(); идущие переносятся на прошедшее с записи время"""
+        store, self._store = self._store, None
+        try:
+            real = self._now()
+            wall = self._wall()
+            for clock_id, name, wall_ns, game_ns, tick, real_tick, running, paused in rows:
+                self.add(name, 0, tick, real_tick, clock_id=clock_id)
+                row = self._rows[clock_id]
+                if running and not paused:
+                    game_ns += max(0, wall - wall_ns) * tick // real_tick
+                self._real0[row] = real
+                self._game0[row] = game_ns
+                self._running[row] = int(bool(running))
+                self._paused[row] = int(bool(running and paused))
+            if self._rows:
+                self._ids = count(max(self._rows) + 1)
+        finally:
+            self._store = store
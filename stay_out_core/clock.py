@@ -0,0 +1,266 @@
+"""
+Игровые часы Stay Out: общее ядро для всех интерфейсов (без зависимости от Tk)
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+from .sources import resolve_source
+
+NS_PER_MS = 1_000_000
+NS_PER_SECOND = 1_000_000_000
+DAY_MS = 24 * 3600 * 1000
+
+DEFAULT_GAME_TICK = 6870  # Стандартная скорость игрового времени в мс
+DEFAULT_REAL_TICK = 1000  # 1 секунда реального времени
+
+
+_day_strings = None
+
+
+def day_strings():
+    """Таблица строк ЧЧ:ММ:СС для всех 86 400 секунд суток (строится при первом обращении)"""
+    global _day_strings
+    if _day_strings is None:
+        _day_strings = [f"{h:02d}:{m:02d}:{s:02d}"
+                        for h in range(24) for m in range(60) for s in range(60)]
+    return _day_strings
+
+
+def format_time(milliseconds):
+    """Форматирование времени в миллисекундах в ЧЧ:ММ:СС"""
+    table = _day_strings or day_strings()
+    return table[int(milliseconds // 1000) % 86400]
+
+
+def parse_time(time_str):
+    """Разбор строки ЧЧ:ММ:СС в миллисекунды (ValueError при ошибке)"""
+    parts = time_str.strip().split(':')
+    if len(parts) != 3:
+        raise ValueError("Неверный формат")
+
+    hours, minutes, seconds = map(int, parts)
+
+    if not (0 <= hours <= 23 and 0 <= minutes <= 59 and 0 <= seconds <= 59):
+        raise ValueError("Недопустимые значения")
+
+    return hours * 3600000 + minutes * 60000 + seconds * 1000
+
+
+class GameClock:
+    """
+    Игровые часы в целых наносекундах.
+
+    Состояние хранится как якорь (реальный момент, игровое время в этот
+    момент), поэтому now() не накапливает ошибку и ничего не выделяет:
+    игровое время = game0 + (real - real0) * game_tick_duration / real_time_tick.
+
+    Каждое изменение состояния дописывает сегмент (real, game, скорость) в
+    хронологию, поэтому смена скорости не пересчитывает прошлое, а игровое
+    время в любой реальный момент (и обратно) ищется бинарным поиском.
+    Установка времени и сброс начинают новую эпоху: внутри эпохи игровое
+    время не убывает, и обратный поиск ведется только по ней.
+    """
+
+    __slots__ = ("_now", "_tick", "_real_tick", "_real0", "_game0",
+                 "_running", "_paused",
+                 "_seg_real", "_seg_game", "_seg_num", "_seg_den",
+                 "_epoch", "_version")
+
+    def __init__(self, game_tick_duration=DEFAULT_GAME_TICK,
+                 real_time_tick=DEFAULT_REAL_TICK, game_ms=0, source=None):
+        # source: "monotonic" (по умолчанию), "wall" или вызываемый объект -> нс
+        self._now = resolve_source(source)
+        self._tick = int(game_tick_duration)
+        self._real_tick = int(real_time_tick)
+        self._real0 = self._now()
+        self._game0 = int(game_ms) * NS_PER_MS
+        self._running = False
+        self._paused = False
+        # Хронология сегментов: начало (real, game) и скорость (num/den, 0 - стоит)
+        self._seg_real = array('q')
+        self._seg_game = array('q')
+        self._seg_num = array('q')
+        self._seg_den = array('q')
+        self._epoch = 0
+        self._version = 0
+        self._mark()
+
+    @property
+    def running(self):
+        """Таймер запущен (в том числе на паузе)"""
+        return self._running
+
+    @property
+    def paused(self):
+        """Таймер на паузе"""
+        return self._paused
+
+    @property
+    def active(self):
+        """Игровое время идет"""
+        return self._running and not self._paused
+
+    @property
+    def source(self):
+        """Источник реального времени (вызываемый объект, возвращающий нс)"""
+        return self._now
+
+    def real_now(self):
+        """Текущее реальное время источника в наносекундах"""
+        return self._now()
+
+    @property
+    def version(self):
+        """Счетчик изменений состояния (старт, пауза, установка, скорость)"""
+        return self._version
+
+    @property
+    def segment_count(self):
+        return len(self._seg_real)
+
+    @property
+    def game_tick_duration(self):
+        return self._tick
+
+    @property
+    def real_time_tick(self):
+        return self._real_tick
+
+    def now(self):
+        """Текущее игровое время в наносекундах"""
+        if self._running and not self._paused:
+            return self._game0 + (self._now() - self._real0) * self._tick // self._real_tick
+        return self._game0
+
+    def now_ms(self):
+        """Текущее игровое время в миллисекундах"""
+        return self.now() // NS_PER_MS
+
+    def _fold(self, real_ns):
+        """Перенос якоря в момент real_ns без изменения игрового времени"""
+        if self._running and not self._paused:
+            self._game0 += (real_ns - self._real0) * self._tick // self._real_tick
+        self._real0 = real_ns
+
+    def _mark(self, new_epoch=False):
+        """Новый сегмент хронологии от текущего якоря"""
+        num = self._tick if (self._running and not self._paused) else 0
+        last = len(self._seg_real) - 1
+        if last >= 0 and self._seg_real[last] == self._real0:
+            # Нулевой сегмент (несколько изменений в один момент) заменяется
+            self._seg_game[last] = self._game0
+            self._seg_num[last] = num
+            self._seg_den[last] = self._real_tick
+        else:
+            self._seg_real.append(self._real0)
+            self._seg_game.append(self._game0)
+            self._seg_num.append(num)
+            self._seg_den.append(self._real_tick)
+            last += 1
+        if new_epoch:
+            self._epoch = last
+        self._version += 1
+
+    def copy(self):
+        """Независимая копия часов с хронологией: для расчетов в другом потоке"""
+        clock = GameClock.__new__(GameClock)
+        for name in GameClock.__slots__:
+            value = getattr(self, name)
+            setattr(clock, name, array('q', value) if isinstance(value, array) else value)
+        return clock
+
+    def anchor(self):
+        """Текущий сегмент: (real0, game0, num, den); num == 0 если время стоит"""
+        num = self._tick if (self._running and not self._paused) else 0
+        return self._real0, self._game0, num, self._real_tick
+
+    def timeline(self):
+        """Столбцы хронологии (real, game, num, den) и индекс начала эпохи, без копирования"""
+        return self._seg_real, self._seg_game, self._seg_num, self._seg_den, self._epoch
+
+    def game_at(self, real_ns):
+        """Игровое время (нс) в реальный момент real_ns по хронологии"""
+        i = bisect_right(self._seg_real, real_ns) - 1
+        if i < 0:
+            i = 0
+        return self._seg_game[i] + (real_ns - self._seg_real[i]) * self._seg_num[i] // self._seg_den[i]
+
+    def real_at(self, game_ns):
+        """
+        Первый реальный момент (нс), когда игровое время достигает game_ns
+        в текущей эпохе; None если этого не было и не будет (пауза, остановка).
+        """
+        lo = self._epoch
+        i = bisect_left(self._seg_game, game_ns, lo) - 1
+        if i < lo:
+            return self._seg_real[lo] if self._seg_game[lo] == game_ns else None
+        num = self._seg_num[i]
+        if num == 0:
+            return None
+        return self._seg_real[i] - (-(game_ns - self._seg_game[i]) * self._seg_den[i] // num)
+
+    def start(self):
+        """Запуск или возобновление после паузы; False если уже идет"""
+        if self._running and not self._paused:
+            return False
+        self._real0 = self._now()
+        self._running = True
+        self._paused = False
+        self._mark()
+        return True
+
+    def pause(self):
+        """Пауза; False если таймер не идет"""
+        if not (self._running and not self._paused):
+            return False
+        self._fold(self._now())
+        self._paused = True
+        self._mark()
+        return True
+
+    def stop(self):
+        """Остановка с сохранением накопленного времени"""
+        if not self._running:
+            return False
+        self._fold(self._now())
+        self._running = False
+        self._paused = False
+        self._mark()
+        return True
+
+    def reset(self):
+        """Сброс до 00:00:00 с остановкой"""
+        self._real0 = self._now()
+        self._game0 = 0
+        self._running = False
+        self._paused = False
+        self._mark(new_epoch=True)
+
+    def set(self, game_ns):
+        """Установка игрового времени (состояние запуска сохраняется)"""
+        self._real0 = self._now()
+        self._game0 = int(game_ns)
+        self._mark(new_epoch=True)
+
+    def set_ms(self, game_ms):
+        """Установка игрового времени в миллисекундах"""
+        self.set(int(game_ms) * NS_PER_MS)
+
+    def set_speed(self, game_tick_duration, real_time_tick=None):
+        """Смена скорости: уже прошедшее время не пересчитывается"""
+        if real_time_tick is None:
+            real_time_tick = self._real_tick
+        if int(game_tick_duration) == self._tick and int(real_time_tick) == self._real_tick:
+            return
+        self._fold(self._now())
+        self._tick = int(game_tick_duration)
+        self._real_tick = int(real_time_tick)
+        self._mark()
+
+    def restore(self, game_ns, running=False, paused=False):
+        """Восстановление состояния (контрольная точка): игровое время с этого момента и флаги запуска"""
+        self._real0 = self._now()
+        self._game0 = int(game_ns)
+        self._running = bool(running)
+        self._paused = bool(running and paused)
+        self._mark(new_epoch=True)
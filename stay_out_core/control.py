@@ -0,0 +1,238 @@
+"""
+Управляющий сокет запущенного интерфейса: один экземпляр на пользователя, команды второго запуска и скриптов
+"""
+import json
+import os
+import sys
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing.connection import Client, Listener, address_type
+
+from .clock import format_time, parse_time
+from .store import data_dir
+
+# Unix: сокет в каталоге данных (доступен только владельцу); Windows: именованный канал пользователя
+SOCKET_FILE = "control.sock"
+PIPE_NAME = r"\\.\pipe\StayOutTimer-{user}"
+
+# Сколько второй запуск ждет ответа; занятый или зависший интерфейс не держит его дольше
+REPLY_TIMEOUT_S = 5.0
+
+# Команды: имя -> разбор аргумента (None - без аргумента)
+COMMANDS = {
+    "show": None,
+    "status": None,
+    "start": None,
+    "pause": None,
+    "stop": None,
+    "reset": None,
+    "set": parse_time,
+    "speed": int,
+}
+
+USAGE = "Команды: show, status, start, pause, stop, reset, set ЧЧ:ММ:СС, speed МС"
+
+
+def control_address(directory=None):
+    """(адрес, семейство) управляющего сокета для multiprocessing.connection"""
+    if sys.platform == "win32":
+        user = os.environ.get("USERNAME") or "user"
+        return PIPE_NAME.format(user=user), "AF_PIPE"
+    return os.path.join(directory or data_dir(), SOCKET_FILE), "AF_UNIX"
+
+
+def parse_command(args):
+    """(имя, значение) из аргументов командной строки; без аргументов - show. ValueError с подсказкой"""
+    args = list(args) or ["show"]
+    name = args[0].lower().lstrip("-")
+    if name not in COMMANDS:
+        raise ValueError(f"Неизвестная команда {args[0]}. {USAGE}")
+    parse = COMMANDS[name]
+    if parse is None:
+        if len(args) != 1:
+            raise ValueError(f"У команды {name} нет аргументов")
+        return name, None
+    if len(args) != 2:
+        raise ValueError(f"Команде {name} нужен один аргумент. {USAGE}")
+    try:
+        value = parse(args[1])
+    except ValueError:
+        raise ValueError(f"Неверный аргумент {args[1]} команды {name}. {USAGE}") from None
+    if name == "speed" and not 100 <= value <= 10000:
+        raise ValueError("Значение должно быть от 100 до 10000 мс")
+    return name, value
+
+
+def clock_status(clock):
+    """Ответ интерфейса на команду: игровое время и состояние часов"""
+    game_ms = clock.now_ms()
+    return {"game_ms": game_ms, "game_time": format_time(game_ms), "running": clock.running,
+            "paused": clock.paused, "speed": clock.game_tick_duration}
+
+
+def describe(reply):
+    """Ответ одной строкой для печати"""
+    if "error" in reply:
+        return "Ошибка: " + reply["error"]
+    if reply["running"]:
+        state = "на паузе" if reply["paused"] else "идет"
+    else:
+        state = "остановлено"
+    return f"{reply['game_time']} ({state}, {reply['speed']} мс)"
+
+
+def send(args, address=None, timeout=REPLY_TIMEOUT_S):
+    """
+    Команда запущенному экземпляру: его ответ (dict) или None, если
+    никто не слушает. Ответ с ключом "error" - команда не выполнена.
+    """
+    address, family = address or control_address()
+    try:
+        conn = Client(address, family)
+    except OSError:
+        return None
+    with conn:
+        conn.send_bytes(json.dumps(list(args)).encode("utf-8"))
+        if not conn.poll(timeout):
+            return {"error": "Запущенный экземпляр не отвечает"}
+        try:
+            return json.loads(conn.recv_bytes())
+        except (EOFError, OSError):
+            return {"error": "Запущенный экземпляр закрыл соединение"}
+
+
+def claim(address=None):
+    """
+    Listener управляющего сокета или None, если экземпляр уже запущен.
+    bind() сокета (создание первого экземпляра канала на Windows)
+    атомарен: из двух одновременных запусков слушать будет один. Файл
+    сокета, оставшийся после аварийного выхода, никто не слушает - он
+    удаляется и занимается заново.
+    """
+    address, family = address or control_address()
+    if family == "AF_UNIX":
+        os.makedirs(os.path.dirname(address), exist_ok=True)
+    for _ in range(2):
+        try:
+            return Listener(address, family)
+        except OSError:
+            if family != "AF_UNIX" or _alive(address, family):
+                return None
+            try:
+                os.unlink(address)
+            except FileNotFoundError:
+                pass
+    return None
+
+
+def single_instance(args, address=None):
+    """
+    Для main() интерфейса до создания окна. Если экземпляр уже запущен,
+    передает ему команду args, печатает ответ и возвращает None - этому
+    запуску остается выйти. Иначе (listener, (имя, значение)): listener
+    для ControlServer или None, если сокет занять не удалось (тогда
+    интерфейс работает без него). ValueError - неверные аргументы.
+    """
+    command = parse_command(args)
+    listener = claim(address)
+    if listener is None:
+        reply = send(args, address)
+        if reply is not None:
+            print(describe(reply))
+            return None
+    return listener, command
+
+
+def _alive(address, family):
+    try:
+        Client(address, family).close()
+    except OSError:
+        return False
+    return True
+
+
+class ControlServer:
+    """
+    Принимает команды на управляющем сокете в фоновых потоках: по потоку
+    на соединение, так что скрипт или пульт может держать соединение
+    открытым и слать команды одну за другой без опроса.
+
+    Протокол - сообщения multiprocessing.connection без ключа (4 байта
+    длины big-endian и тело): запрос - JSON-массив аргументов командной
+    строки (["set", "12:00:00"]), ответ - JSON-объект. handle(имя,
+    значение) возвращает ответ; с dispatch (например, CallQueue.post) он
+    выполняется в потоке интерфейса, а поток соединения ждет результат.
+    """
+
+    def __init__(self, listener, handle, dispatch=None, timeout=REPLY_TIMEOUT_S):
+        self._listener = listener
+        self._address = listener.address
+        self._family = address_type(listener.address)
+        self._handle = handle
+        self._dispatch = dispatch
+        self.timeout = timeout
+        self._closed = False
+        self._thread = None
+        self.commands = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._accept, name="control", daemon=True)
+        self._thread.start()
+        return self
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+            if self._closed:
+                conn.close()
+                return
+            threading.Thread(target=self._serve, args=(conn,), name="control-client", daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while not self._closed:
+                try:
+                    data = conn.recv_bytes()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send_bytes(json.dumps(self.reply(data), ensure_ascii=False).encode("utf-8"))
+                except OSError:
+                    return
+
+    def reply(self, data):
+        """Ответ на один запрос (байты JSON)"""
+        try:
+            args = json.loads(data)
+            if not isinstance(args, list):
+                raise ValueError("Запрос - JSON-массив аргументов")
+            name, value = parse_command(str(arg) for arg in args)
+        except ValueError as e:
+            return {"error": str(e)}
+        self.commands += 1
+        if self._dispatch is None:
+            return self._call(name, value)
+        future = Future()
+        self._dispatch(lambda: future.set_result(self._call(name, value)))
+        try:
+            return future.result(self.timeout)
+        except FutureTimeout:
+            return {"error": "Интерфейс не ответил вовремя"}
+
+    def _call(self, name, value):
+        try:
+            return self._handle(name, value)
+        except Exception as e:
+            return {"error": str(e)}
+
+    def close(self):
+        self._closed = True
+        # accept() в потоке закрытием слушателя не прерывается: будим его подключением
+        if self._thread is not None:
+            _alive(self._address, self._family)
+            self._thread.join(1.0)
+            self._thread = None
+        self._listener.close()
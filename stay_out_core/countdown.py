@@ -0,0 +1,147 @@
+"""
+Таймеры обратного отсчета в игровой и реальной длительности
+"""
+from itertools import count
+
+from .clock import NS_PER_MS
+from .wheel import TimingWheel
+
+GAME = "game"
+REAL = "real"
+
+# Тик колес: оставшееся время показывается с точностью до секунды
+COUNTDOWN_TICK_MS = 1000
+
+
+class Countdown:
+    """Таймер: id, вид (GAME/REAL), длительность (мс), описание, срок (тик колеса)"""
+    __slots__ = ("id", "kind", "duration_ms", "label", "expires")
+
+    def __init__(self, countdown_id, kind, duration_ms, label, expires):
+        self.id = countdown_id
+        self.kind = kind
+        self.duration_ms = duration_ms
+        self.label = label
+        self.expires = expires
+
+
+class CountdownTimers:
+    """
+    Два колеса таймеров: по реальному времени источника часов и по
+    пройденному игровому времени. Игровой отсчет идет, только пока идут
+    игровые часы; установка времени и сброс - скачок, а не ход времени,
+    поэтому на оставшееся время не влияют.
+
+    Сроки лежат на целых тиках колеса, поэтому все показываемые остатки
+    одного колеса меняются одновременно - на границе тика: next_change()
+    дает этот момент для перерисовки, next_expiry() - ближайшее
+    срабатывание (для пробуждения при скрытом окне).
+    """
+
+    def __init__(self, clock, tick_ms=COUNTDOWN_TICK_MS):
+        self.clock = clock
+        self.tick_ms = tick_ms
+        self._ids = count(1)
+        self._timers = {}
+        self._epoch = self._epoch_key()
+        self._segment = clock.segment_count - 1
+        self._game_ns = clock.now()
+        self._progress_ns = 0
+        self._wheels = {GAME: TimingWheel(0), REAL: TimingWheel(self._real_ms() // tick_ms)}
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __iter__(self):
+        return iter(self._timers.values())
+
+    def __contains__(self, countdown_id):
+        return countdown_id in self._timers
+
+    def get(self, countdown_id):
+        return self._timers.get(countdown_id)
+
+    def _real_ms(self):
+        return self.clock.real_now() // NS_PER_MS
+
+    def _epoch_key(self):
+        seg_real, seg_game, _, _, epoch = self.clock.timeline()
+        return epoch, seg_real[epoch], seg_game[epoch]
+
+    def _progress(self):
+        """Пройденное игровое время (мс) без учета установок времени"""
+        seg_real, seg_game, seg_num, seg_den, epoch = self.clock.timeline()
+        now = self.clock.now()
+        key = epoch, seg_real[epoch], seg_game[epoch]
+        if key != self._epoch:
+            # Ход часов до установки засчитывается: каждый сегмент от прошлого вызова до своего конца
+            game = self._game_ns
+            for i in range(self._segment, epoch):
+                self._progress_ns += seg_game[i] + (seg_real[i + 1] - seg_real[i]) * seg_num[i] // seg_den[i] - game
+                game = seg_game[i + 1]
+            self._epoch = key
+            self._game_ns = seg_game[epoch]
+        self._progress_ns += now - self._game_ns
+        self._game_ns = now
+        self._segment = len(seg_real) - 1
+        return self._progress_ns // NS_PER_MS
+
+    def _position(self, kind):
+        return self._progress() if kind == GAME else self._real_ms()
+
+    def add(self, kind, duration_ms, label):
+        """Запустить таймер на duration_ms игровых (GAME) или реальных (REAL) мс"""
+        position = self._position(kind)
+        expires = -(-(position + int(duration_ms)) // self.tick_ms)
+        countdown = Countdown(next(self._ids), kind, int(duration_ms), label, expires)
+        self._timers[countdown.id] = countdown
+        self._wheels[kind].add(countdown.id, expires)
+        return countdown
+
+    def cancel(self, countdown_id):
+        countdown = self._timers.pop(countdown_id, None)
+        if countdown is not None:
+            self._wheels[countdown.kind].cancel(countdown_id)
+        return countdown
+
+    def clear(self):
+        for countdown_id in list(self._timers):
+            self.cancel(countdown_id)
+
+    def remaining_ms(self, countdown):
+        return max(0, countdown.expires * self.tick_ms - self._position(countdown.kind))
+
+    def poll(self):
+        """Сработавшие таймеры (по порядку сроков)"""
+        expired = []
+        for kind in (GAME, REAL):
+            wheel = self._wheels[kind]
+            for countdown_id in wheel.advance(self._position(kind) // self.tick_ms):
+                expired.append(self._timers.pop(countdown_id))
+        return expired
+
+    def _real_at(self, kind, tick):
+        """Реальный момент (нс), когда колесо kind дойдет до тика; None если игровое время стоит"""
+        if kind == REAL:
+            return tick * self.tick_ms * NS_PER_MS
+        self._progress()
+        return self.clock.real_at(self._game_ns + tick * self.tick_ms * NS_PER_MS - self._progress_ns)
+
+    def _earliest(self, ticks):
+        earliest = None
+        for kind, tick in ticks:
+            if tick is None:
+                continue
+            real = self._real_at(kind, tick)
+            if real is not None and (earliest is None or real < earliest):
+                earliest = real
+        return earliest
+
+    def next_expiry(self):
+        """Реальный момент (нс) ближайшего срабатывания или None"""
+        return self._earliest((kind, wheel.next_expiry()) for kind, wheel in self._wheels.items())
+
+    def next_change(self):
+        """Реальный момент (нс) следующей смены показываемых остатков или None"""
+        return self._earliest((kind, self._position(kind) // self.tick_ms + 1)
+                              for kind, wheel in self._wheels.items() if len(wheel))
@@ -0,0 +1,132 @@
+"""
+Журнал контрольных точек игровых часов: продолжение после сбоя или kill -9
+"""
+import json
+import os
+import time
+
+from .persist import atomic_write_text
+
+JOURNAL_FILE = "clock_journal.jsonl"
+
+# Столько записей журнал держит до сжатия в одну (последнюю)
+MAX_RECORDS = 256
+
+
+def _line(record):
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+class ClockJournal:
+    """
+    Журнал якоря часов: реальный момент по настенным часам, игровое время
+    в этот момент, скорость и флаги запуска. Запись - одна строка JSON,
+    дописывается с fsync только когда состояние часов изменилось (по
+    clock.version), а не каждый тик: между изменениями игровое время
+    вычисляется по якорю, поэтому записи нужны лишь при старте, паузе,
+    установке и смене скорости.
+
+    При запуске restore() берет последнюю целую строку (оборванная при
+    сбое пропускается) и переносит идущие часы на прошедшее с тех пор
+    время. Когда записей больше max_records, журнал атомарно сжимается до
+    последней.
+
+    writer - WriteBehind: запись идет в его фоновом потоке; без него -
+    сразу (консоль). store - область StateStore (load_clock/save_clock):
+    тогда якорь хранится строкой базы, а не в файле журнала.
+    """
+
+    def __init__(self, clock, path=JOURNAL_FILE, writer=None, wall=time.time_ns, max_records=MAX_RECORDS,
+                 store=None):
+        self.clock = clock
+        self.path = path
+        self._writer = writer
+        self._store = store
+        self._wall = wall
+        self.max_records = max_records
+        self._records = None
+        self._version = None
+        self.written = 0
+
+    def checkpoint(self):
+        """Запись текущего состояния часов с якорем по настенным часам"""
+        clock = self.clock
+        real0, game0, _, _ = clock.anchor()
+        # Источник часов может быть монотонным: якорь переносится на настенные часы
+        wall_ns = self._wall() - (clock.real_now() - real0)
+        return {
+            "wall_ns": wall_ns,
+            "game_ns": game0,
+            "tick": clock.game_tick_duration,
+            "real_tick": clock.real_time_tick,
+            "running": clock.running,
+            "paused": clock.paused,
+        }
+
+    def record(self):
+        """Записать контрольную точку, если состояние изменилось; True если записано"""
+        version = self.clock.version
+        if version == self._version:
+            return False
+        self._version = version
+        record = self.checkpoint()
+        if self._store is not None:
+            self._store.save_clock(record)
+        elif self._writer is not None:
+            self._writer.submit(self.path, record, write=self._append)
+        else:
+            self._append(self.path, record)
+        return True
+
+    def _append(self, path, record):
+        if self._records is None:
+            self._read_lines()
+        if self._records >= self.max_records:
+            atomic_write_text(path, _line(record))
+            self._records = 1
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(_line(record))
+                f.flush()
+                os.fsync(f.fileno())
+            self._records += 1
+        self.written += 1
+
+    def _read_lines(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            text = ""
+        lines = text.splitlines()
+        # Оборванная последняя строка склеилась бы со следующей записью: сначала сжатие
+        self._records = len(lines) if text.endswith("\n") or not text else self.max_records
+        return lines
+
+    def load(self):
+        """Последняя целая контрольная точка или None"""
+        if self._store is not None:
+            return self._store.load_clock()
+        for line in reversed(self._read_lines()):
+            try:
+                record = json.loads(line)
+                return {key: record[key] for key in ("wall_ns", "game_ns", "tick", "real_tick", "running", "paused")}
+            except (ValueError, TypeError, KeyError):
+                continue
+        return None
+
+    def restore(self):
+        """Восстановить часы по журналу; False если журнала нет"""
+        record = self.load()
+        if record is None:
+            return False
+        clock = self.clock
+        game_ns = int(record["game_ns"])
+        if record["running"] and not record["paused"]:
+            # Часы шли и после сбоя: прибавляется прошедшее реальное время
+            elapsed = max(0, self._wall() - int(record["wall_ns"]))
+            game_ns += elapsed * int(record["tick"]) // int(record["real_tick"])
+        clock.set_speed(record["tick"], record["real_tick"])
+        clock.restore(game_ns, record["running"], record["paused"])
+        self._version = clock.version
+        return True
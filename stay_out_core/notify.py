@@ -0,0 +1,137 @@
+"""
+Очередь немодальных уведомлений: склейка за тик, ограничение частоты, автоскрытие
+"""
+import time
+from collections import deque
+
+# Больше строк в одном уведомлении не показывается: остаток сворачивается в "и еще N"
+MAX_LINES = 6
+
+
+class Notification:
+    __slots__ = ("title", "lines", "hidden")
+
+    def __init__(self, title):
+        self.title = title
+        self.lines = []
+        self.hidden = 0
+
+    def add(self, line):
+        if len(self.lines) < MAX_LINES:
+            self.lines.append(line)
+        else:
+            self.hidden += 1
+
+    @property
+    def count(self):
+        return len(self.lines) + self.hidden
+
+    def text(self):
+        lines = list(self.lines)
+        if self.hidden:
+            lines.append(f"...и еще {self.hidden}")
+        return "\n".join(lines)
+
+
+class Notifier:
+    """
+    Уведомления вместо messagebox: ничего не ждет ответа пользователя и не
+    запускает вложенный цикл событий, поэтому часы и тики идут вовремя.
+
+    post() в пределах одного тика копятся в одно уведомление, которое
+    отдается show(notification) через after(0). Одновременно на экране одно
+    уведомление; оно скрывается через display_ms (hide()) или по dismiss().
+    Следующее показывается не раньше min_interval_ms после предыдущего, а
+    пока оно ждет, новые сообщения с тем же заголовком дописываются в него.
+    Очередь ограничена maxlen: при переполнении пропадает самое старое.
+    """
+
+    def __init__(self, after, after_cancel, show, hide, display_ms=6000, min_interval_ms=1500,
+                 maxlen=4, now=time.monotonic):
+        self._after = after
+        self._after_cancel = after_cancel
+        self._show = show
+        self._hide = hide
+        self.display_ms = display_ms
+        self.min_interval_ms = min_interval_ms
+        self._now = now
+        self._pending = deque(maxlen=maxlen)
+        self._batch = None
+        self._flush_id = None
+        self._timer_id = None
+        self._showing = None
+        self._last_shown = None
+        self.shown = 0
+        self.dropped = 0
+
+    @property
+    def showing(self):
+        """Уведомление на экране или None"""
+        return self._showing
+
+    def __len__(self):
+        return len(self._pending)
+
+    def post(self, title, line):
+        """Добавить сообщение; показ - после текущего тика"""
+        if self._batch is None or self._batch.title != title:
+            self._queue_batch()
+            self._batch = Notification(title)
+        self._batch.add(line)
+        if self._flush_id is None:
+            self._flush_id = self._after(0, self._flush)
+
+    def _queue_batch(self):
+        batch = self._batch
+        if batch is None:
+            return
+        self._batch = None
+        for pending in self._pending:
+            if pending.title == batch.title:
+                for line in batch.lines:
+                    pending.add(line)
+                pending.hidden += batch.hidden
+                return
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(batch)
+
+    def _flush(self):
+        self._flush_id = None
+        self._queue_batch()
+        self._pump()
+
+    def _pump(self):
+        if self._showing is not None or not self._pending or self._timer_id is not None:
+            return
+        if self._last_shown is not None:
+            wait_ms = int(self.min_interval_ms - (self._now() - self._last_shown) * 1000)
+            if wait_ms > 0:
+                self._timer_id = self._after(wait_ms, self._ready)
+                return
+        notification = self._showing = self._pending.popleft()
+        self._last_shown = self._now()
+        self.shown += 1
+        self._show(notification)
+        self._timer_id = self._after(self.display_ms, self.dismiss)
+
+    def _ready(self):
+        self._timer_id = None
+        self._pump()
+
+    def dismiss(self):
+        """Скрыть текущее уведомление и показать следующее"""
+        if self._timer_id is not None:
+            self._after_cancel(self._timer_id)
+            self._timer_id = None
+        if self._showing is not None:
+            self._showing = None
+            self._hide()
+        self._pump()
+
+    def cancel(self):
+        """Снять все отложенные вызовы (закрытие окна)"""
+        for after_id in (self._flush_id, self._timer_id):
+            if after_id is not None:
+                self._after_cancel(after_id)
+        self._flush_id = self._timer_id = None
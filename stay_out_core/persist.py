@@ -0,0 +1,174 @@
+"""
+Сохранение файлов состояния: атомарная запись и отложенная запись в фоновом потоке
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Интервал склейки изменений: не больше одной записи файла за это время
+WRITE_INTERVAL_MS = 500
+
+# Пометка в очереди: файл нужно удалить, а не записать
+REMOVE = object()
+
+
+def _fsync_dir(directory):
+    """Закрепить на диске запись каталога о переименовании (на Windows каталог не открыть)"""
+    if os.name != "posix":
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path, text):
+    """
+    Записать text так, чтобы на диске всегда был либо старый файл, либо
+    новый целиком: временный файл в том же каталоге, fsync и os.replace.
+    Сбой посреди записи оставляет прежний файл нетронутым.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(directory)
+
+
+def atomic_write_json(path, data, indent=2):
+    """Атомарная запись data как JSON (atomic_write_text)"""
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False, indent=indent))
+
+
+def remove_file(path):
+    """Удалить файл, если он есть"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class WriteBehind:
+    """
+    Отложенная запись файлов состояния. submit() из потока интерфейса только
+    запоминает последнее значение для пути и сразу возвращается; фоновый
+    поток пишет его через interval_ms после первого несохраненного
+    изменения. Все изменения за интервал (перетаскивание ползунка,
+    повторные правки) дают одну запись на файл, а запись идет атомарно
+    (atomic_write_json).
+
+    data - снимок: он пишется позже, поэтому после submit() объект не
+    изменяют. remove(path) ставит в ту же очередь удаление файла, так что
+    ранее отправленная запись его не вернет. flush() - записать все сейчас
+    и дождаться, close() - то же и остановить поток (при выходе).
+    Ошибки записи не прерывают поток: последняя хранится в last_error.
+    """
+
+    def __init__(self, interval_ms=WRITE_INTERVAL_MS, write=atomic_write_json, now=time.monotonic):
+        self.interval_ms = interval_ms
+        self._write = write
+        self._now = now
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._due = None
+        self._urgent = False
+        self._busy = False
+        self._closed = False
+        self._thread = None
+        self.submitted = 0
+        self.writes = 0
+        self.last_error = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, path, data, write=None):
+        """
+        Запланировать запись data в path; более раннее значение того же пути
+        заменяется. write(path, data) - своя функция записи вместо общей.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Запись уже остановлена")
+            if not self._pending:
+                self._due = self._now() + self.interval_ms / 1000
+            # Повторная запись встает в конец: порядок разных записей сохраняется
+            self._pending.pop(path, None)
+            self._pending[path] = (data, write or self._write)
+            self.submitted += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="persist", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def remove(self, path):
+        """Запланировать удаление файла"""
+        self.submit(path, REMOVE)
+
+    def _run(self):
+        cond = self._cond
+        while True:
+            with cond:
+                while not self._pending and not self._closed:
+                    cond.wait()
+                if not self._pending:
+                    return
+                while not (self._urgent or self._closed):
+                    remaining = self._due - self._now()
+                    if remaining <= 0:
+                        break
+                    cond.wait(remaining)
+                batch = self._pending
+                self._pending = {}
+                self._urgent = False
+                self._busy = True
+            # Диск - без блокировки: submit() из интерфейса не ждет записи
+            for path, (data, write) in batch.items():
+                try:
+                    if data is REMOVE:
+                        remove_file(path)
+                    else:
+                        write(path, data)
+                        self.writes += 1
+                except Exception as e:
+                    self.last_error = (path, e)
+                    print(f"Не удалось сохранить {path}: {e}")
+            with cond:
+                self._busy = False
+                cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Записать все отложенное сейчас; False если не успели за timeout секунд"""
+        with self._cond:
+            if not self._pending and not self._busy:
+                return True
+            self._urgent = bool(self._pending)
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def close(self, timeout=5.0):
+        """Дописать отложенное и остановить поток"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,83 @@
+"""
+Обратный запрос: в какой реальный момент игровое время дойдет до ЧЧ:ММ:СС
+"""
+import time
+
+from .clock import DAY_MS, NS_PER_MS
+
+DAY_NS = DAY_MS * NS_PER_MS
+
+
+class _Entry:
+    __slots__ = ("version", "real0", "game0", "num", "den", "offset", "count", "reals")
+
+
+class OccurrencePlanner:
+    """
+    Ближайшие реальные моменты, когда игровое время достигнет заданного
+    времени суток. Внутри одного сегмента часов k-е наступление цели равно
+    real0 + ceil((offset + k * сутки) * den / num), где offset - игровое
+    расстояние от начала сегмента до цели, поэтому ответ считается за O(1).
+    Результат кэшируется по (цель, сегмент) и пересчитывается только после
+    старта/паузы/установки времени/смены скорости или когда первое
+    наступление уже прошло.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def add(self, target_ms):
+        """Добавить цель (миллисекунды от начала игровых суток)"""
+        self._entries.setdefault(int(target_ms) % DAY_MS, None)
+
+    def remove(self, target_ms):
+        self._entries.pop(int(target_ms) % DAY_MS, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def next_occurrences(self, target_ms, count=1):
+        """
+        Список из count реальных моментов (нс источника часов) ближайших
+        наступлений цели; пустой список, если игровое время не идет.
+        """
+        target_ms = int(target_ms) % DAY_MS
+        clock = self.clock
+        entry = self._entries.get(target_ms)
+        real_now = clock.real_now()
+        if (entry is not None and entry.version == clock.version
+                and entry.count >= count and (not entry.reals or entry.reals[0] >= real_now)):
+            return entry.reals if entry.count == count else entry.reals[:count]
+
+        if entry is None or entry.version != clock.version:
+            entry = entry or _Entry()
+            entry.version = clock.version
+            entry.real0, entry.game0, entry.num, entry.den = clock.anchor()
+            entry.offset = (target_ms * NS_PER_MS - entry.game0) % DAY_NS
+            self._entries[target_ms] = entry
+
+        entry.count = count
+        if entry.num == 0:
+            entry.reals = []
+            return entry.reals
+
+        # Первое наступление не раньше текущего игрового времени
+        passed = entry.game0 + entry.offset
+        game_now = entry.game0 + (real_now - entry.real0) * entry.num // entry.den
+        k = -(-(game_now - passed) // DAY_NS) if game_now > passed else 0
+        entry.reals = [
+            entry.real0 - (-(entry.offset + (k + i) * DAY_NS) * entry.den // entry.num)
+            for i in range(count)
+        ]
+        return entry.reals
+
+    def to_wall(self, real_ns):
+        """Перевод момента источника часов в настенное время (нс эпохи Unix)"""
+        return time.time_ns() - self.clock.real_now() + real_ns
@@ -0,0 +1,92 @@
+"""
+Слой отрисовки: в Tk уходят только действительно изменившиеся строки
+"""
+import time
+
+NS_PER_MINUTE = 60 * 1_000_000_000
+
+
+class RenderLayer:
+    """
+    Запоминает последнюю отрисованную строку каждого виджета. За кадр
+    (один вызов планировщика) интерфейс вызывает set() для всех меток, а
+    flush() применяет одним проходом только те, чей текст изменился, - каждый
+    лишний widget.config(text=...) это вызов интерпретатора Tcl и перерасчет
+    геометрии.
+
+    requested - запрошенные обновления, applied - реально выполненные вызовы
+    Tk. saved_per_minute - сколько вызовов сэкономлено за последнюю полную
+    минуту (до ее окончания - оценка по текущей неполной минуте).
+    """
+
+    def __init__(self, now=time.monotonic_ns):
+        self._now = now
+        self._shown = {}
+        self._pending = {}
+        self.requested = 0
+        self.applied = 0
+        self._window_start = now()
+        self._window_saved = 0
+        self._last_minute = None
+
+    @property
+    def saved(self):
+        return self.requested - self.applied
+
+    def set(self, widget, text):
+        """Запросить текст виджета; применяется в flush()"""
+        self.requested += 1
+        if self._shown.get(widget) == text:
+            self._pending.pop(widget, None)
+        else:
+            self._pending[widget] = text
+
+    def set_cell(self, tree, iid, column, text):
+        """Запросить текст ячейки Treeview (tree.set(iid, column, text))"""
+        self.set((tree, iid, column), text)
+
+    def flush(self):
+        """Применить накопленные изменения; возвращает число вызовов Tk"""
+        pending = self._pending
+        for widget, text in pending.items():
+            if type(widget) is tuple:
+                tree, iid, column = widget
+                tree.set(iid, column, text)
+            else:
+                widget.config(text=text)
+            self._shown[widget] = text
+        count = len(pending)
+        self.applied += count
+        pending.clear()
+        self._roll()
+        return count
+
+    def invalidate(self, widget=None):
+        """
+        Забыть отрисованное (виджет пересоздан или текст изменен в обход
+        слоя); для ячейки - ключ (tree, iid, column).
+        """
+        if widget is None:
+            self._shown.clear()
+        else:
+            self._shown.pop(widget, None)
+            self._pending.pop(widget, None)
+
+    def _roll(self):
+        now = self._now()
+        elapsed = now - self._window_start
+        if elapsed >= NS_PER_MINUTE:
+            saved = self.saved
+            # Пропущенные минуты (окно было скрыто) не растягивают счет
+            self._last_minute = (saved - self._window_saved) * NS_PER_MINUTE // elapsed
+            self._window_start = now
+            self._window_saved = saved
+
+    def saved_per_minute(self):
+        """Сэкономленные вызовы Tk в минуту"""
+        if self._last_minute is not None:
+            return self._last_minute
+        elapsed = self._now() - self._window_start
+        if elapsed <= 0:
+            return 0
+        return (self.saved - self._window_saved) * NS_PER_MINUTE // elapsed
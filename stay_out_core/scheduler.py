@@ -0,0 +1,232 @@
+"""
+Планировщик обновлений интерфейса по сроку следующей смены отображаемого значения
+"""
+import queue
+import time
+
+from .clock import NS_PER_MS, NS_PER_SECOND
+
+# Опрос очереди вызовов из фоновых потоков: сразу после вызова - частый, без вызовов - до раза в 250 мс
+CALL_POLL_MIN_MS = 10
+CALL_POLL_MAX_MS = 250
+
+
+def _ceil_ms(ns):
+    return -(-ns // NS_PER_MS)
+
+
+class TickScheduler:
+    """
+    Вместо опроса root.after(1000) каждую секунду планировщик вычисляет из
+    скорости часов точный реальный момент, когда сменится отображаемое
+    игровое значение (секунда или минута), и ставит ровно одно пробуждение
+    на этот срок. Срок абсолютный, поэтому опоздание обратного вызова не
+    накапливается: следующий срок считается от текущего игрового времени.
+
+    after/after_cancel - функции вида root.after и root.after_cancel,
+    callback - отрисовка, вызываемая на каждом сроке. Дополнительные сроки
+    (смена секунды реального времени и т.п.) добавляются через add_source:
+    функция возвращает реальный момент (нс источника часов) или None.
+
+    Когда окно скрыто, suspend() отключает отрисовку: остаются только
+    обязательные сроки (essential), на которых вызывается background.
+    Если ни один срок не определен, пробуждений нет вовсе.
+    """
+
+    def __init__(self, clock, after, after_cancel, callback, resolution_ms=1000, background=None):
+        self.clock = clock
+        self._after = after
+        self._after_cancel = after_cancel
+        self._callback = callback
+        self._background = background
+        self._resolution = int(resolution_ms) * NS_PER_MS
+        self._sources = []
+        self._essential = []
+        self._suspended = False
+        self._after_id = None
+        self._deadline = None
+        self.wakeups = 0  # Срабатывания таймера
+        self.renders = 0  # Вызовы отрисовки
+        self.last_lateness_ns = 0  # Опоздание последнего пробуждения относительно срока
+
+    @property
+    def resolution_ms(self):
+        return self._resolution // NS_PER_MS
+
+    @resolution_ms.setter
+    def resolution_ms(self, value):
+        self._resolution = int(value) * NS_PER_MS
+        self.poke()
+
+    @property
+    def armed(self):
+        """Запланировано ли пробуждение"""
+        return self._after_id is not None
+
+    @property
+    def suspended(self):
+        return self._suspended
+
+    def add_source(self, source, essential=False):
+        """Дополнительный срок; essential - нужен и при скрытом окне"""
+        (self._essential if essential else self._sources).append(source)
+
+    def remove_source(self, source):
+        for sources in (self._sources, self._essential):
+            if source in sources:
+                sources.remove(source)
+
+    def suspend(self):
+        """Окно скрыто: отрисовки нет, остаются только обязательные сроки"""
+        if not self._suspended:
+            self._suspended = True
+            self.cancel()
+            self._arm()
+
+    def resume(self):
+        """Окно снова видно: отрисовка из текущего состояния часов"""
+        if self._suspended:
+            self._suspended = False
+            self.poke()
+
+    def next_game_change(self):
+        """Реальный момент (нс) следующей смены игрового значения; None если время стоит"""
+        real0, game0, num, den = self.clock.anchor()
+        if num == 0:
+            return None
+        resolution = self._resolution
+        boundary = (self.clock.now() // resolution + 1) * resolution
+        return real0 - (-(boundary - game0) * den // num)
+
+    @staticmethod
+    def _earliest(sources, deadline):
+        for source in sources:
+            candidate = source()
+            if candidate is not None and (deadline is None or candidate < deadline):
+                deadline = candidate
+        return deadline
+
+    def next_deadline(self):
+        if self._suspended:
+            return self._earliest(self._essential, None)
+        deadline = self._earliest(self._sources, self.next_game_change())
+        return self._earliest(self._essential, deadline)
+
+    def poke(self):
+        """Немедленная отрисовка и перепланирование (после старта, паузы, установки времени)"""
+        self.cancel()
+        if self._suspended:
+            self._arm()
+            return
+        self._run()
+
+    def cancel(self):
+        if self._after_id is not None:
+            self._after_cancel(self._after_id)
+            self._after_id = None
+
+    def _run(self):
+        self.renders += 1
+        try:
+            self._callback()
+        finally:
+            self._arm()
+
+    def _arm(self):
+        deadline = self.next_deadline()
+        self._deadline = deadline
+        if deadline is None:
+            # Ничего не изменится само по себе: пробуждений нет
+            self._after_id = None
+            return
+        delay = _ceil_ms(deadline - self.clock.real_now())
+        self._after_id = self._after(max(delay, 1), self._fire)
+
+    def _fire(self):
+        self._after_id = None
+        self.wakeups += 1
+        now = self.clock.real_now()
+        if now < self._deadline:
+            # Таймер сработал раньше срока: досыпаем остаток без отрисовки
+            self._after_id = self._after(max(_ceil_ms(self._deadline - now), 1), self._fire)
+            return
+        self.last_lateness_ns = now - self._deadline
+        if self._suspended:
+            try:
+                if self._background is not None:
+                    self._background()
+            finally:
+                self._arm()
+            return
+        self._run()
+
+
+def wall_second_source(clock):
+    """Срок смены секунды настенных часов (для метки реального времени)"""
+    def next_wall_second():
+        return clock.real_now() + NS_PER_SECOND - time.time_ns() % NS_PER_SECOND
+    return next_wall_second
+
+
+class CallQueue:
+    """
+    Вызовы из фоновых потоков (слежение за файлами, фоновые задачи,
+    управляющий сокет, звук) в поток Tk. Tk не потокобезопасен, и
+    root.after из чужого потока тоже: поток только кладет вызов в
+    queue.SimpleQueue (post), а поток Tk разбирает очередь опросом через
+    after. После разобранного вызова опрос частый (следующие команды того
+    же скрипта, цепочки фоновых задач), без вызовов интервал удваивается
+    до max_ms.
+    """
+
+    def __init__(self, after, after_cancel, min_ms=CALL_POLL_MIN_MS, max_ms=CALL_POLL_MAX_MS):
+        self._queue = queue.SimpleQueue()
+        self._after = after
+        self._after_cancel = after_cancel
+        self._min_ms = int(min_ms)
+        self._max_ms = int(max_ms)
+        self._interval = self._max_ms
+        self._after_id = None
+        self._running = False
+        self.polls = 0  # Опросы очереди
+        self.calls = 0  # Выполненные вызовы
+
+    def post(self, func, *args):
+        """Из любого потока: func(*args) выполнится в потоке Tk"""
+        self._queue.put((func, args))
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self._after_id = self._after(self._interval, self._poll)
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._after_id is not None:
+            self._after_cancel(self._after_id)
+            self._after_id = None
+
+    def drain(self):
+        """Выполнить накопившиеся вызовы по порядку; их число"""
+        done = 0
+        while True:
+            try:
+                func, args = self._queue.get_nowait()
+            except queue.Empty:
+                return done
+            done += 1
+            self.calls += 1
+            func(*args)
+
+    def _poll(self):
+        self._after_id = None
+        self.polls += 1
+        busy = True
+        try:
+            busy = self.drain() > 0
+        finally:
+            # Ошибка вызова не останавливает опрос: остаток очереди - на следующем, скором
+            self._interval = self._min_ms if busy else min(self._interval * 2, self._max_ms)
+            if self._running:
+                self._after_id = self._after(self._interval, self._poll)
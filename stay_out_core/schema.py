@@ -0,0 +1,79 @@
+"""
+Типизированная схема настроек: значения по умолчанию и проверка загруженного
+"""
+import re
+
+_COLOR = re.compile(r"#(?:[0-9a-fA-F]{3}){1,2}|[A-Za-z]+(?: [A-Za-z]+)*")
+
+
+class Setting:
+    """Настройка: тип, значение по умолчанию и допустимые значения (диапазон или набор)"""
+    __slots__ = ("type", "default", "low", "high", "choices", "color")
+
+    def __init__(self, type_, default, low=None, high=None, choices=None, color=False):
+        self.type = type_
+        self.default = default
+        self.low = low
+        self.high = high
+        self.choices = choices
+        self.color = color
+
+    def check(self, value):
+        """Значение, приведенное к типу настройки; ValueError если оно недопустимо"""
+        if self.type is bool:
+            if not isinstance(value, bool):
+                raise ValueError("ожидается true/false")
+        elif self.type is int:
+            # bool - подкласс int, но 1/0 вместо скорости - почти наверняка ошибка
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value):
+                raise ValueError("ожидается целое число")
+            value = int(value)
+        elif not isinstance(value, str):
+            raise ValueError("ожидается строка")
+        if self.low is not None and value < self.low or self.high is not None and value > self.high:
+            raise ValueError(f"допустимо от {self.low} до {self.high}")
+        if self.choices is not None and value not in self.choices:
+            raise ValueError("допустимо: " + ", ".join(self.choices))
+        if self.color and not _COLOR.fullmatch(value):
+            raise ValueError("ожидается цвет #RRGGBB или имя цвета")
+        return value
+
+
+# Настройки расширенной версии (область "app" хранилища)
+APP_SETTINGS = {
+    "game_tick_duration": Setting(int, 6870, 100, 10000),
+    "real_time_tick": Setting(int, 1000, 1, 60000),
+    "background_color": Setting(str, "#2c2c2c", color=True),
+    "text_color": Setting(str, "#ffffff", color=True),
+    "accent_color": Setting(str, "#ff6b35", color=True),
+    "alarm_sound_enabled": Setting(bool, True),
+    "volume_level": Setting(int, 100, 0, 100),
+    "theme": Setting(str, "stalker", choices=("stalker", "dark", "light")),
+    "auto_save_on_exit": Setting(bool, True),
+    "show_real_time": Setting(bool, True),
+    "display_resolution": Setting(str, "seconds", choices=("seconds", "minutes")),
+}
+
+
+def defaults(schema):
+    """Новый словарь значений по умолчанию"""
+    return {key: setting.default for key, setting in schema.items()}
+
+
+def validate(schema, values):
+    """
+    Проверка словаря настроек по схеме: (годные значения, ошибки [(ключ,
+    сообщение)]). Неизвестные ключи пропускаются молча (их могла записать
+    более новая версия), недопустимые - с ошибкой, и в результат не входят.
+    """
+    clean = {}
+    errors = []
+    for key, value in values.items():
+        setting = schema.get(key)
+        if setting is None:
+            continue
+        try:
+            clean[key] = setting.check(value)
+        except ValueError as e:
+            errors.append((key, str(e)))
+    return clean, errors
@@ -0,0 +1,518 @@
+"""
+Локальный HTTP/JSON API игрового времени на asyncio, без Tk
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from urllib.parse import parse_qsl, urlsplit
+
+from .clock import DAY_MS, NS_PER_MS, NS_PER_SECOND, format_time, parse_time
+from .notify import Notifier
+from .scheduler import TickScheduler
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8737
+
+# Сколько ближайших будильников в ответе
+UPCOMING_ALARMS = 10
+
+# Простаивающее keep-alive соединение закрывается через столько секунд
+IDLE_TIMEOUT_S = 30
+
+# Больше команде управления не нужно
+MAX_BODY = 64 * 1024
+
+_REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+            405: "Method Not Allowed"}
+
+# Команда без этого заголовка или JSON-тела - "простой" запрос, который браузер
+# отправит с любой страницы без preflight; такие команды отклоняются
+COMMAND_HEADER = "X-Stay-Out"
+
+# Поток событий (GET /events): шаг тиков на выбор подписчика
+STREAM_RESOLUTIONS = {"second": 1000, "minute": 60000}
+
+# Очередь событий будильников и состояния на подписчика; тик хранится один - последний
+EVENT_QUEUE = 32
+
+# Комментарий-пинг в тихом потоке: мертвые соединения закрываются, прокси не рвут живые
+HEARTBEAT_S = 15
+
+_STREAM_HEADERS = ("HTTP/1.1 200 OK\r\n"
+                   "Content-Type: text/event-stream; charset=utf-8\r\n"
+                   "Cache-Control: no-cache\r\n"
+                   "Access-Control-Allow-Origin: *\r\n"
+                   "\r\n").encode("ascii")
+
+
+def _command_allowed(headers):
+    """Запрос команды не "простой": с JSON-телом или заголовком COMMAND_HEADER"""
+    if COMMAND_HEADER.lower() in headers:
+        return True
+    return headers.get("content-type", "").split(";")[0].strip().lower() == "application/json"
+
+
+def _json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _response(status, body, public=False):
+    """Полный ответ HTTP/1.1 байтами: заголовки и тело JSON
+
+    public - чтение, открытое любому источнику: оверлеи в браузере (OBS) читают
+    API с другого источника. Ответы командам этого заголовка не получают.
+    """
+    return (f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Cache-Control: no-cache\r\n"
+            + ("Access-Control-Allow-Origin: *\r\n" if public else "")
+            + "\r\n").encode("ascii") + body
+
+
+def _error(status, message):
+    return _response(status, _json({"error": message}))
+
+
+def _event(kind, data):
+    """Событие SSE байтами"""
+    return b"event: " + kind.encode("ascii") + b"\ndata: " + _json(data) + b"\n\n"
+
+
+def _asyncio_after(loop):
+    """after/after_cancel для TickScheduler на таймерах цикла asyncio (вместо root.after)"""
+    def after(delay_ms, callback):
+        return loop.call_later(delay_ms / 1000, callback)
+
+    def after_cancel(handle):
+        handle.cancel()
+    return after, after_cancel
+
+
+class Subscriber:
+    """Подписчик потока: шаг тиков, последний неотправленный тик, очередь прочих событий"""
+    __slots__ = ("resolution_ms", "tick", "events", "ready", "dropped")
+
+    def __init__(self, resolution_ms):
+        self.resolution_ms = resolution_ms
+        self.tick = None
+        self.events = deque(maxlen=EVENT_QUEUE)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+
+class EventStream:
+    """
+    Рассылка событий подписчикам SSE: tick - смена игровой секунды или
+    минуты (на выбор подписчика), alarm - срабатывание будильника, state
+    - изменение часов (старт, пауза, установка, скорость).
+
+    Событие кодируется один раз и одни и те же байты раздаются всем.
+    У каждого подписчика своя задача записи и ограниченная очередь:
+    тик - одно место, новый тик заменяет неотправленный (устаревшее
+    время никому не нужно), события будильников и состояния - очередь
+    на EVENT_QUEUE, переполнение вытесняет старейшее. Медленный клиент
+    теряет промежуточные тики, но не отстает от реального времени и не
+    копит память; остальных он не задерживает.
+    """
+
+    def __init__(self):
+        self._subscribers = {resolution_ms: set() for resolution_ms in STREAM_RESOLUTIONS.values()}
+        self._steps = dict.fromkeys(self._subscribers)
+        self._closed = False
+        self.published = 0
+
+    def __len__(self):
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def tick(self, game_ns, data):
+        """Тик подписчикам, у которых сменился шаг; data(game_ns) строит тело, только если оно нужно"""
+        payload = None
+        for resolution_ms, subscribers in self._subscribers.items():
+            if not subscribers:
+                continue
+            step = game_ns // (resolution_ms * NS_PER_MS)
+            if step == self._steps[resolution_ms]:
+                continue
+            self._steps[resolution_ms] = step
+            if payload is None:
+                payload = _event("tick", data(game_ns))
+            for subscriber in subscribers:
+                if subscriber.tick is not None:
+                    subscriber.dropped += 1
+                subscriber.tick = payload
+                subscriber.ready.set()
+            self.published += 1
+
+    def publish(self, kind, data):
+        """Событие будильника или состояния всем подписчикам"""
+        if not len(self):
+            return
+        payload = _event(kind, data)
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                if len(subscriber.events) == EVENT_QUEUE:
+                    subscriber.dropped += 1
+                subscriber.events.append(payload)
+                subscriber.ready.set()
+        self.published += 1
+
+    async def serve(self, writer, resolution_ms, initial):
+        """Поток одного подписчика до разрыва соединения или close(); initial - первое событие"""
+        subscriber = Subscriber(resolution_ms)
+        self._subscribers[resolution_ms].add(subscriber)
+        try:
+            writer.write(_STREAM_HEADERS + initial)
+            await writer.drain()
+            while not self._closed:
+                try:
+                    await asyncio.wait_for(subscriber.ready.wait(), HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+                    await writer.drain()
+                    continue
+                subscriber.ready.clear()
+                chunks = list(subscriber.events)
+                subscriber.events.clear()
+                if subscriber.tick is not None:
+                    chunks.append(subscriber.tick)
+                    subscriber.tick = None
+                if chunks:
+                    writer.write(b"".join(chunks))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._subscribers[resolution_ms].discard(subscriber)
+        return subscriber
+
+    def close(self):
+        """Завершить все потоки (выход)"""
+        self._closed = True
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                subscriber.ready.set()
+
+
+class TimeService:
+    """
+    Часы, будильники и журнал без интерфейса. Ответ на GET /time (время,
+    состояние часов, ближайшие будильники) собирается один раз на смену
+    игровой секунды и хранится готовыми байтами HTTP: запрос из кэша - это
+    сравнение ключа (версия часов, игровая секунда) и одна запись в сокет,
+    так что сотни опрашивающих клиентов почти ничего не стоят.
+
+    tick() вызывает TickScheduler на таймерах цикла asyncio - на смене
+    игровой секунды и на сроке будильника: срабатывания, контрольная
+    точка журнала, отрезки сеансов и новый ответ. Команды управления -
+    те же операции часов, что у кнопок интерфейса (start_timer,
+    pause_timer, edit_time...), и сразу перестраивают ответ.
+
+    state - область StateStore (будильники, история, настройки скорости
+    по ключу speed_key); journal и session_log необязательны. stream -
+    EventStream подписчиков GET /events: тики, будильники и изменения
+    часов рассылаются из тех же мест. notify(notification) показывает
+    срабатывания будильников через Notifier, как всплывающие окна
+    интерфейса (будильники одного тика - одним уведомлением).
+    """
+
+    def __init__(self, clock, alarms=None, engine=None, state=None, journal=None, session_log=None,
+                 speed_key=None, upcoming=UPCOMING_ALARMS, notify=None):
+        self.clock = clock
+        self.alarms = alarms
+        self.engine = engine
+        self.state = state
+        self.journal = journal
+        self.session_log = session_log
+        self.speed_key = speed_key
+        self.upcoming = upcoming
+        self.notify = notify
+        self.notifier = None
+        self.scheduler = None
+        self._key = None
+        self._response = None
+        self.renders = 0
+        self.stream = EventStream()
+
+    def attach(self, loop):
+        """Запуск тиков на цикле asyncio: одно пробуждение на смену игровой секунды или срок будильника"""
+        after, after_cancel = _asyncio_after(loop)
+        if self.notify is not None:
+            # Без окна уведомление показывается сразу и целиком: ни паузы между ними, ни автоскрытия
+            self.notifier = Notifier(after, after_cancel, self.notify, lambda: None, display_ms=0, min_interval_ms=0)
+        self.scheduler = TickScheduler(self.clock, after, after_cancel, self.tick)
+        if self.engine is not None:
+            self.scheduler.add_source(self.engine.next_real, essential=True)
+        self.scheduler.poke()
+
+    def detach(self):
+        if self.scheduler is not None:
+            self.scheduler.cancel()
+            self.scheduler = None
+        if self.notifier is not None:
+            self.notifier.cancel()
+            self.notifier = None
+
+    def tick(self):
+        self.check_alarms()
+        if self.journal is not None:
+            self.journal.record()
+        if self.session_log is not None:
+            self.session_log.record()
+        self.response()
+        self.stream.tick(self.clock.now(), self.tick_data)
+
+    def check_alarms(self):
+        """Сработавшие будильники: отметка, запись в базу и историю, уведомление"""
+        if self.engine is None:
+            return
+        fired = self.engine.poll()
+        for alarm_id in fired:
+            alarm = self.alarms.get(alarm_id)
+            if alarm is not None:
+                self.alarms.mark_fired(alarm_id)
+                if self.state is not None:
+                    self.state.save_alarm(alarm)
+                    self.state.add_history("alarm", self.clock.now_ms(), alarm.description)
+                if self.notifier is not None:
+                    self.notifier.post("Будильник", f"{format_time(alarm.time_ms)} - {alarm.description}")
+                self.stream.publish("alarm", {"id": alarm.id, "time": format_time(alarm.time_ms),
+                                              "description": alarm.description, "game_ms": self.clock.now_ms()})
+        if fired:
+            self._key = None
+
+    def tick_data(self, game_ns):
+        """Тело события tick: только игровое время"""
+        game_ms = game_ns // NS_PER_MS
+        return {"game_ms": game_ms, "game_time": format_time(game_ms), "game_day": game_ms // DAY_MS}
+
+    def snapshot(self, game_ns=None):
+        """Состояние для ответа: игровое время, часы и ближайшие будильники"""
+        clock = self.clock
+        if game_ns is None:
+            game_ns = clock.now()
+        game_ms = game_ns // NS_PER_MS
+        data = {
+            "game_ms": game_ms,
+            "game_time": format_time(game_ms),
+            "game_day": game_ms // DAY_MS,
+            "running": clock.running,
+            "paused": clock.paused,
+            "speed": clock.game_tick_duration,
+            "real_tick": clock.real_time_tick,
+        }
+        alarms = []
+        if self.engine is not None:
+            # Реальный срок - по настенным часам (мс Unix); null, пока время стоит
+            offset = time.time_ns() - clock.real_now()
+            for alarm_id, due_ms in self.engine.upcoming(self.upcoming):
+                alarm = self.alarms.get(alarm_id)
+                if alarm is None:
+                    continue
+                real = clock.real_at(due_ms * NS_PER_MS)
+                alarms.append({
+                    "id": alarm.id,
+                    "time": format_time(alarm.time_ms),
+                    "description": alarm.description,
+                    "repeat": alarm.rule.describe(),
+                    "due_game_ms": due_ms,
+                    "due_wall_ms": None if real is None else (real + offset) // NS_PER_MS,
+                })
+        data["alarms"] = alarms
+        return data
+
+    def response(self):
+        """Ответ на GET /time: пересобирается, только если сменились игровая секунда или состояние часов"""
+        game_ns = self.clock.now()
+        key = (self.clock.version, game_ns // NS_PER_SECOND)
+        if key != self._key:
+            self._key = key
+            self._response = _response(200, _json(self.snapshot(game_ns)), public=True)
+            self.renders += 1
+        return self._response
+
+    def _changed(self):
+        # Как scheduler.poke() в интерфейсе: сразу тик и перепланирование
+        self._key = None
+        self.stream.publish("state", self.snapshot())
+        if self.scheduler is not None:
+            self.scheduler.poke()
+        else:
+            self.tick()
+
+    def start_timer(self):
+        started = self.clock.start()
+        self._changed()
+        return started
+
+    def pause_timer(self):
+        paused = self.clock.pause()
+        self._changed()
+        return paused
+
+    def stop_timer(self):
+        stopped = self.clock.stop()
+        self._changed()
+        return stopped
+
+    def reset_timer(self):
+        self.clock.reset()
+        self._changed()
+
+    def edit_time(self, time_str):
+        """Установка времени ЧЧ:ММ:СС (ValueError при ошибке)"""
+        self.clock.set_ms(parse_time(str(time_str)))
+        self._changed()
+
+    def change_game_speed(self, new_speed):
+        """Скорость игрового времени в мс за секунду (ValueError вне 100-10000)"""
+        new_speed = int(new_speed)
+        if not 100 <= new_speed <= 10000:
+            raise ValueError("Значение должно быть от 100 до 10000 мс")
+        self.clock.set_speed(new_speed)
+        if self.state is not None and self.speed_key is not None:
+            self.state.settings[self.speed_key] = new_speed
+            self.state.save_settings(self.state.settings)
+        self._changed()
+
+    def close(self):
+        """Последняя контрольная точка и отрезок сеанса перед выходом"""
+        self.detach()
+        self.stream.close()
+        if self.journal is not None:
+            self.journal.record()
+        if self.session_log is not None:
+            self.session_log.cut()
+
+
+# Команды управления: POST адрес -> операция; параметры из строки запроса или тела JSON
+COMMANDS = {
+    "/start": lambda service, params: service.start_timer(),
+    "/pause": lambda service, params: service.pause_timer(),
+    "/stop": lambda service, params: service.stop_timer(),
+    "/reset": lambda service, params: service.reset_timer(),
+    "/set": lambda service, params: service.edit_time(params["time"]),
+    "/speed": lambda service, params: service.change_game_speed(params["speed"]),
+}
+
+
+class ApiServer:
+    """
+    HTTP/1.1 с keep-alive поверх asyncio.start_server: GET /time - ответ
+    TimeService из кэша, GET /events - поток SSE (EventStream), POST
+    /start, /pause, /stop, /reset, /set?time=, /speed?speed= - команды
+    (только с JSON-телом или заголовком COMMAND_HEADER, и без CORS). Слушает только localhost по умолчанию; port=0 - свободный порт (его
+    номер в port после start()).
+    """
+
+    def __init__(self, service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.service = service
+        self.host = host
+        self.port = port
+        self._server = None
+        self.requests = 0
+
+    async def start(self):
+        self.service.attach(asyncio.get_running_loop())
+        self._server = await asyncio.start_server(self._client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        # Открытые потоки событий держали бы wait_closed()
+        self.service.stream.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.service.detach()
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), IDLE_TIMEOUT_S)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                url = urlsplit(target)
+                if url.path.rstrip("/") == "/events" and method == "GET":
+                    await self.stream_events(writer, dict(parse_qsl(url.query)))
+                    break
+                writer.write(self.handle(method, target, body, headers))
+                await writer.drain()
+                # HTTP/1.0 без keep-alive: соединение на один запрос
+                if version != "HTTP/1.1" or headers.get("connection", "").lower() == "close":
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader):
+        """(метод, адрес, версия, заголовки, тело) или None, если клиент закрыл соединение"""
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3:
+            raise ValueError("Неверная строка запроса")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if not 0 <= length <= MAX_BODY:
+            raise ValueError("Слишком большое тело запроса")
+        body = await reader.readexactly(length) if length else b""
+        return parts[0], parts[1], parts[2], headers, body
+
+    async def stream_events(self, writer, params):
+        """GET /events?resolution=second|minute: поток SSE до разрыва соединения"""
+        resolution_ms = STREAM_RESOLUTIONS.get(params.get("resolution", "second"))
+        if resolution_ms is None:
+            writer.write(_error(400, "resolution: " + ", ".join(STREAM_RESOLUTIONS)))
+            return
+        service = self.service
+        await service.stream.serve(writer, resolution_ms, _event("state", service.snapshot()))
+
+    def handle(self, method, target, body=b"", headers=None):
+        """Ответ на запрос байтами HTTP; headers - заголовки с именами в нижнем регистре"""
+        self.requests += 1
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/time"
+        if path == "/time":
+            if method != "GET":
+                return _error(405, "Только GET")
+            return self.service.response()
+
+        command = COMMANDS.get(path)
+        if command is None:
+            return _error(404, "Нет такого адреса")
+        if method != "POST":
+            return _error(405, "Команды - только POST")
+        if not _command_allowed(headers or {}):
+            return _error(403, "Команде нужен Content-Type: application/json "
+                               f"или заголовок {COMMAND_HEADER}")
+        params = dict(parse_qsl(url.query))
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                return _error(400, "Тело запроса - не JSON")
+            if isinstance(data, dict):
+                params.update(data)
+        try:
+            command(self.service, params)
+        except KeyError as e:
+            return _error(400, f"Не задан параметр {e.args[0]}")
+        except (ValueError, TypeError) as e:
+            return _error(400, str(e))
+        return _response(200, _json(self.service.snapshot()))
@@ -0,0 +1,269 @@
+"""
+Журнал отрезков хода часов и сводки по дням: сколько играли, сколько прошло игровых суток
+"""
+import time
+from array import array
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from .clock import DAY_MS, NS_PER_MS, NS_PER_SECOND, format_time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy не обязателен: без него используются обычные списки
+    np = None
+
+# Столбцы отрезка: настенные моменты начала и конца, игровое время на них, скорость
+FIELDS = ("start_ns", "end_ns", "game_start_ns", "game_end_ns", "tick", "real_tick")
+
+SESSIONS_HEADER = ("Начало", "Конец", "Реальных минут", "Скорость, мс", "Игровое время с", "Игровое время по")
+DAILY_HEADER = ("Дата", "Реальных часов", "Игровых суток")
+
+_DAY_NS = DAY_MS * NS_PER_MS
+
+
+class SessionLog:
+    """
+    Отрезки, на которых игровые часы шли: от старта до паузы или
+    остановки; смена скорости и установка времени делят отрезок, так что
+    скорость внутри отрезка постоянна. Отрезки берутся из хронологии
+    часов (clock.timeline()), поэтому record() - сравнение версии, как в
+    ClockJournal, и его можно звать на каждом тике: ни одно изменение
+    между вызовами не теряется.
+
+    Столбцы - array('q') по FIELDS в порядке начала. Дописывание - шесть
+    append() в потоке Tk; в базу строка уходит через область StateStore
+    (ее WriteBehind). snapshot() копирует столбцы вместе с идущим сейчас
+    отрезком, и сводки по копии считаются в любом потоке.
+    """
+
+    def __init__(self, clock, store=None, wall=time.time_ns):
+        self.clock = clock
+        self._store = store
+        self._wall = wall
+        self.columns = tuple(array('q') for _ in FIELDS)
+        if store is not None:
+            for row in store.load_sessions():
+                self._append(row)
+        # Сегменты хронологии до создания журнала не считаются, текущий - считается
+        self._first = self._next = max(0, clock.segment_count - 1)
+        # Начало незаписанной части текущего сегмента: момент источника часов и настенный
+        self._open_real = self._open_wall = None
+        self._version = None
+        self.record()
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def _append(self, row):
+        for column, value in zip(self.columns, row):
+            column.append(value)
+
+    def _add(self, row):
+        self._append(row)
+        if self._store is not None:
+            self._store.add_session(row)
+
+    def _row(self, real, game, num, den, end_real, end_wall):
+        """Строка отрезка сегмента (real, game, num/den) от незаписанного начала до end_real"""
+        return (self._open_wall, end_wall, game + (self._open_real - real) * num // den,
+                game + (end_real - real) * num // den, num, den)
+
+    def record(self):
+        """Закрыть отрезки, законченные с прошлого вызова; True если что-то изменилось в часах"""
+        clock = self.clock
+        version = clock.version
+        if version == self._version:
+            return False
+        self._version = version
+        seg_real, seg_game, seg_num, seg_den, _ = clock.timeline()
+        count = len(seg_real)
+        if self._next >= count:
+            return True
+        # Источник часов может быть монотонным: границы переносятся на настенные часы один раз
+        offset = self._wall() - clock.real_now()
+        for j in range(self._next, count):
+            real = seg_real[j]
+            i = j - 1
+            if i >= self._first and seg_num[i]:
+                self._add(self._row(seg_real[i], seg_game[i], seg_num[i], seg_den[i], real, real + offset))
+            self._open_real = real
+            self._open_wall = real + offset
+        self._next = count
+        return True
+
+    def _current(self):
+        """Идущий сейчас отрезок до текущего момента: (строка, момент источника) или None"""
+        clock = self.clock
+        if not clock.active:
+            return None
+        real0, game0, num, den = clock.anchor()
+        now = clock.real_now()
+        if now <= self._open_real:
+            return None
+        return self._row(real0, game0, num, den, now, self._wall()), now
+
+    def cut(self):
+        """Записать идущий отрезок до текущего момента (выход из программы); дальше он продолжается"""
+        self.record()
+        current = self._current()
+        if current is not None:
+            row, self._open_real = current
+            self._add(row)
+            self._open_wall = row[1]
+
+    def snapshot(self):
+        """Копия столбцов с идущим отрезком - для сводок в другом потоке"""
+        self.record()
+        columns = tuple(array('q', column) for column in self.columns)
+        current = self._current()
+        if current is not None:
+            for column, value in zip(columns, current[0]):
+                column.append(value)
+        return columns
+
+
+def _prefix(values):
+    return [0] + list(accumulate(values))
+
+
+def played_until(columns, instants):
+    """
+    Реальное время игры (нс) и пройденное игровое время (нс) до каждого
+    настенного момента instants: (реальное, игровое). Отрезки не
+    пересекаются, поэтому это префиксные суммы и один бинарный поиск на
+    момент; внутри отрезка игровое время растет с его скоростью.
+    """
+    start, end, game0, game1, tick, real_tick = columns
+    if np is None:
+        durations = [b - a for a, b in zip(start, end)]
+        real_sum = _prefix(durations)
+        game_sum = _prefix(b - a for a, b in zip(game0, game1))
+        reals, games = [], []
+        for instant in instants:
+            k = bisect_right(start, instant) - 1
+            if k < 0:
+                reals.append(0)
+                games.append(0)
+                continue
+            part = min(instant - start[k], durations[k])
+            reals.append(real_sum[k] + part)
+            games.append(game_sum[k] + part * tick[k] // real_tick[k])
+        return reals, games
+
+    start, end, game0, game1, tick, real_tick = (np.frombuffer(column, dtype=np.int64) for column in columns)
+    instants = np.asarray(instants, dtype=np.int64)
+    if len(start) == 0:
+        zeros = np.zeros(len(instants), dtype=np.int64)
+        return zeros, zeros.copy()
+    durations = end - start
+    real_sum = np.concatenate(([0], np.cumsum(durations)))
+    game_sum = np.concatenate(([0], np.cumsum(game1 - game0)))
+    k = np.searchsorted(start, instants, side="right") - 1
+    before = k < 0
+    np.maximum(k, 0, out=k)
+    part = np.clip(instants - start[k], 0, durations[k])
+    reals = real_sum[k] + part
+    # part * tick // real_tick через divmod, как в batch.py: отрезок дольше двух недель переполнил бы int64
+    q, r = np.divmod(part, real_tick[k])
+    games = game_sum[k] + q * tick[k] + r * tick[k] // real_tick[k]
+    reals[before] = 0
+    games[before] = 0
+    return reals, games
+
+
+def _midnight_ns(day):
+    # mktime учитывает переход на летнее время: сутки бывают по 23 и 25 часов
+    return int(time.mktime(day.timetuple())) * NS_PER_SECOND
+
+
+def daily(columns, days=30, today=None):
+    """Последние days суток по местному времени: [(дата, реальное нс, игровое нс)], старые первыми"""
+    today = today or date.today()
+    first = today - timedelta(days=days - 1)
+    dates = [first + timedelta(days=i) for i in range(days + 1)]
+    reals, games = played_until(columns, [_midnight_ns(day) for day in dates])
+    return [(dates[i].isoformat(), int(reals[i + 1] - reals[i]), int(games[i + 1] - games[i]))
+            for i in range(days)]
+
+
+def week_start(today=None):
+    """Местная полночь понедельника текущей недели (нс)"""
+    today = today or date.today()
+    return _midnight_ns(today - timedelta(days=today.weekday()))
+
+
+def between(columns, since_ns, until_ns):
+    """Реальное и игровое время (нс), сыгранные между двумя настенными моментами"""
+    reals, games = played_until(columns, [since_ns, until_ns])
+    return int(reals[1] - reals[0]), int(games[1] - games[0])
+
+
+def longest_session(columns):
+    """Самый длинный непрерывный сеанс (стыкующиеся отрезки - один сеанс): (начало, конец, игровое нс) или None"""
+    start, end, game0, game1 = columns[:4]
+    if len(start) == 0:
+        return None
+    if np is None:
+        best = None
+        first = 0
+        game = 0
+        for i in range(len(start)):
+            if i and start[i] != end[i - 1]:
+                first, game = i, 0
+            game += game1[i] - game0[i]
+            if best is None or end[i] - start[first] > best[1] - best[0]:
+                best = (start[first], end[i], game)
+        return best
+
+    start, end, game0, game1 = (np.frombuffer(column, dtype=np.int64) for column in columns[:4])
+    firsts = np.concatenate(([0], np.flatnonzero(start[1:] != end[:-1]) + 1))
+    lasts = np.concatenate((firsts[1:], [len(start)])) - 1
+    lengths = end[lasts] - start[firsts]
+    best = int(np.argmax(lengths))
+    games = np.add.reduceat(game1 - game0, firsts)
+    return int(start[firsts[best]]), int(end[lasts[best]]), int(games[best])
+
+
+def summary(columns, days=30, now_ns=None):
+    """Все сводки вкладки истории за один вызов (для фонового потока)"""
+    now_ns = time.time_ns() if now_ns is None else now_ns
+    today = datetime.fromtimestamp(now_ns / NS_PER_SECOND).date()
+    week_real, week_game = between(columns, week_start(today), now_ns)
+    return {
+        "daily": daily(columns, days, today),
+        "week_real_ns": week_real,
+        "week_game_days": week_game / _DAY_NS,
+        "total_real_ns": int(played_until(columns, [now_ns])[0][0]),
+        "longest": longest_session(columns),
+        "segments": len(columns[0]),
+    }
+
+
+def _wall_text(wall_ns):
+    return datetime.fromtimestamp(wall_ns / NS_PER_SECOND).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _game_text(game_ns):
+    # Игровое время с номером суток: отрезок может пройти полночь игры
+    game_ms = game_ns // NS_PER_MS
+    return f"{game_ms // DAY_MS}/{format_time(game_ms)}"
+
+
+def write_sessions_csv(path, columns):
+    """Все отрезки в CSV; возвращает число строк"""
+    start, end, game0, game1, tick, _ = columns
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(SESSIONS_HEADER) + "\n")
+        f.write("".join(f"{_wall_text(start[i])},{_wall_text(end[i])},{(end[i] - start[i]) / 60e9:.2f},"
+                        f"{tick[i]},{_game_text(game0[i])},{_game_text(game1[i])}\n" for i in range(len(start))))
+    return len(start)
+
+
+def write_daily_csv(path, rows):
+    """Сводка по дням (результат daily()) в CSV; возвращает число строк"""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(DAILY_HEADER) + "\n")
+        f.write("".join(f"{day},{real / 3600e9:.2f},{game / _DAY_NS:.3f}\n" for day, real, game in rows))
+    return len(rows)
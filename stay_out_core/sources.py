@@ -0,0 +1,42 @@
+"""
+Источники реального времени для игровых часов
+"""
+import time
+
+# Системные источники: монотонные часы (по умолчанию) и настенные часы
+CLOCK_SOURCES = {
+    "monotonic": time.monotonic_ns,
+    "wall": time.time_ns,
+}
+
+
+class ManualClock:
+    """Ручные (фейковые) часы для тестов: время двигается только через advance()"""
+
+    __slots__ = ("ns",)
+
+    def __init__(self, ns=0):
+        self.ns = int(ns)
+
+    def __call__(self):
+        return self.ns
+
+    def advance(self, seconds=0, ms=0, ns=0):
+        """Перемотка вперед; возвращает новое значение в наносекундах"""
+        self.ns += int(seconds * 1_000_000_000) + int(ms) * 1_000_000 + int(ns)
+        return self.ns
+
+    def set(self, ns):
+        self.ns = int(ns)
+
+
+def resolve_source(source):
+    """Источник по имени ("monotonic", "wall"), вызываемому объекту или None"""
+    if source is None:
+        return CLOCK_SOURCES["monotonic"]
+    if callable(source):
+        return source
+    try:
+        return CLOCK_SOURCES[source]
+    except KeyError:
+        raise ValueError(f"Неизвестный источник времени: {source}") from None
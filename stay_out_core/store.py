@@ -0,0 +1,539 @@
+"""
+Единое хранилище состояния в SQLite (WAL) в каталоге данных пользователя
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from itertools import count
+from pathlib import Path
+
+APP_DIR = "StayOutTimer"
+DB_FILE = "stay_out.db"
+
+# Переопределение каталога данных (переносная установка, тесты)
+DATA_DIR_ENV = "STAY_OUT_DATA_DIR"
+
+# Области состояния: интерфейсы с общими файлами настроек делят и область
+APP = "app"      # settings.json, game_time.json: stay_out_timer и расширенная версия
+TIMER = "timer"  # timer_settings.json, last_time.json: полная, русская и консольная версии
+
+_MISSING = object()
+
+# Прежние JSON-файлы областей: (настройки, сохраненное время, ключ скорости в настройках)
+LEGACY_FILES = {
+    APP: ("settings.json", "game_time.json", "game_tick_duration"),
+    TIMER: ("timer_settings.json", "last_time.json", "game_speed"),
+}
+
+# Каталоги интерфейсов в проекте (относительно корня), откуда их запускали прежние версии
+LEGACY_APP_DIRS = ("stay_out_timer", "stay_out_timer_enhanced", "final_package")
+
+# Запись legacy_import для области, перенос в которую отменен пользователем
+SKIPPED = "skipped"
+
+CLOCK_FIELDS = ("wall_ns", "game_ns", "tick", "real_tick", "running", "paused")
+
+# Запросы горячих путей: модуль sqlite3 держит скомпилированные выражения в кэше соединения
+_SAVE_SETTING = ("INSERT INTO settings (scope, key, value) VALUES (?, ?, ?) "
+                 "ON CONFLICT (scope, key) DO UPDATE SET value = excluded.value")
+_SAVE_CLOCK = ("INSERT INTO clock (scope, wall_ns, game_ns, tick, real_tick, running, paused) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (scope) DO UPDATE SET "
+               "wall_ns = excluded.wall_ns, game_ns = excluded.game_ns, tick = excluded.tick, "
+               "real_tick = excluded.real_tick, running = excluded.running, paused = excluded.paused")
+_SAVE_ALARM = ("INSERT INTO alarms (scope, id, time_ms, description, rule, fired, fire_count) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (scope, id) DO UPDATE SET "
+               "time_ms = excluded.time_ms, description = excluded.description, rule = excluded.rule, "
+               "fired = excluded.fired, fire_count = excluded.fire_count")
+_DELETE_ALARM = "DELETE FROM alarms WHERE scope = ? AND id = ?"
+_CLEAR_ALARMS = "DELETE FROM alarms WHERE scope = ?"
+_ADD_HISTORY = "INSERT INTO history (scope, wall_ns, kind, game_ms, detail) VALUES (?, ?, ?, ?, ?)"
+_ADD_SESSION = ("INSERT INTO sessions (scope, start_ns, end_ns, game_start_ns, game_end_ns, tick, real_tick) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)")
+_SAVE_NAMED_CLOCK = ("INSERT INTO named_clocks (scope, id, name, wall_ns, game_ns, tick, real_tick, running, paused) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (scope, id) DO UPDATE SET "
+                     "name = excluded.name, wall_ns = excluded.wall_ns, game_ns = excluded.game_ns, "
+                     "tick = excluded.tick, real_tick = excluded.real_tick, running = excluded.running, "
+                     "paused = excluded.paused")
+_DELETE_NAMED_CLOCK = "DELETE FROM named_clocks WHERE scope = ? AND id = ?"
+
+
+def data_dir():
+    """Каталог данных пользователя для текущей платформы"""
+    override = os.environ.get(DATA_DIR_ENV)
+    if override:
+        return override
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.join(home, "AppData", "Roaming")
+    elif sys.platform == "darwin":
+        base = os.path.join(home, "Library", "Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.join(home, ".local", "share")
+    return os.path.join(base, APP_DIR)
+
+
+def default_path():
+    return os.path.join(data_dir(), DB_FILE)
+
+
+def _schema(db):
+    # executescript() зафиксировал бы транзакцию миграции: выражения по одному
+    for statement in """
+        CREATE TABLE settings (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID;
+        CREATE TABLE clock (
+            scope TEXT PRIMARY KEY,
+            wall_ns INTEGER NOT NULL,
+            game_ns INTEGER NOT NULL,
+            tick INTEGER NOT NULL,
+            real_tick INTEGER NOT NULL,
+            running INTEGER NOT NULL,
+            paused INTEGER NOT NULL
+        );
+        CREATE TABLE alarms (
+            scope TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            time_ms INTEGER NOT NULL,
+            description TEXT NOT NULL,
+            rule TEXT NOT NULL,
+            fired INTEGER NOT NULL,
+            fire_count INTEGER NOT NULL,
+            PRIMARY KEY (scope, id)
+        ) WITHOUT ROWID;
+        CREATE TABLE history (
+            id INTEGER PRIMARY KEY,
+            scope TEXT NOT NULL,
+            wall_ns INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            game_ms INTEGER,
+            detail TEXT
+        );
+        CREATE INDEX history_scope_time ON history (scope, wall_ns);
+    """.split(";"):
+        if statement.strip():
+            db.execute(statement)
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _stopped_clock(game_ms, tick, wall_ns):
+    return {"wall_ns": wall_ns, "game_ns": int(game_ms) * 1_000_000, "tick": int(tick), "real_tick": 1000,
+            "running": False, "paused": False}
+
+
+def _legacy_imports(db):
+    """Записи переноса JSON-файлов: область -> каталог, откуда перенесено, или SKIPPED"""
+    db.execute("CREATE TABLE legacy_import (scope TEXT PRIMARY KEY, source TEXT NOT NULL) WITHOUT ROWID")
+
+
+def legacy_dirs():
+    """
+    Каталоги, где версии до базы могли оставить JSON-файлы (их писали в
+    текущий каталог): каталог запущенного скрипта или exe, каталоги
+    интерфейсов проекта и текущий каталог, без повторов.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    launcher = sys.executable if getattr(sys, "frozen", False) else (sys.argv[0] if sys.argv else "")
+    dirs = [os.path.dirname(os.path.abspath(launcher)), root]
+    dirs += [os.path.join(root, name) for name in LEGACY_APP_DIRS]
+    dirs.append(os.getcwd())
+    return list(dict.fromkeys(os.path.normcase(os.path.normpath(path)) for path in dirs))
+
+
+def _newest(dirs, name):
+    """Самый новый из файлов name в каталогах dirs или None"""
+    newest, newest_mtime = None, None
+    for directory in dirs:
+        path = os.path.join(directory, name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        if newest is None or mtime > newest_mtime:
+            newest, newest_mtime = path, mtime
+    return newest
+
+
+def _empty_scope(db, scope):
+    return (db.execute("SELECT 1 FROM settings WHERE scope = ? LIMIT 1", (scope,)).fetchone() is None
+            and db.execute("SELECT 1 FROM clock WHERE scope = ?", (scope,)).fetchone() is None)
+
+
+def _pending_legacy(db):
+    """Области, куда перенос еще не записан и которые пока пусты (только чтение базы)"""
+    done = {scope for scope, in db.execute("SELECT scope FROM legacy_import")}
+    return [scope for scope in LEGACY_FILES if scope not in done and _empty_scope(db, scope)]
+
+
+def _legacy_files_found(dirs, scopes):
+    """Есть ли что переносить в области scopes: файлы ищутся до блокировки записи"""
+    if not scopes:
+        return False
+    from .journal import JOURNAL_FILE
+    names = [JOURNAL_FILE] + [name for scope in scopes for name in LEGACY_FILES[scope][:2]]
+    return any(_newest(dirs, name) for name in names)
+
+
+def _connect_readonly(path):
+    """Соединение только для чтения или None: базы еще нет или ее схему нужно обновить"""
+    try:
+        db = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True, isolation_level=None,
+                             check_same_thread=False)
+    except sqlite3.OperationalError:
+        return None
+    try:
+        if db.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS):
+            db.execute("PRAGMA busy_timeout=2000")
+            return db
+    except sqlite3.DatabaseError:
+        pass
+    db.close()
+    return None
+
+
+def _import_legacy(db, dirs):
+    """
+    Перенос прежних JSON-файлов (сами файлы не удаляются) в области, для
+    которых он еще не записан и которые пока пусты: данные, сохраненные
+    уже в базе, старые файлы не перезаписывают. Перенос записывается в
+    legacy_import, только если файлы области нашлись, - иначе его
+    попробуют при следующем открытии (возможно, из другого каталога).
+    """
+    scopes = _pending_legacy(db) if dirs else ()
+    if not scopes:
+        return
+    from .journal import JOURNAL_FILE, ClockJournal
+    wall_ns = time.time_ns()
+    # Журнал часов писали все версии: его запись новее сохраненного времени
+    journal = _newest(dirs, JOURNAL_FILE)
+    record = ClockJournal(None, path=journal).load() if journal else None
+    for scope in scopes:
+        settings_file, time_file, speed_key = LEGACY_FILES[scope]
+        sources = []
+        path = _newest(dirs, settings_file)
+        settings = _read_json(path) if path else None
+        if isinstance(settings, dict):
+            db.executemany(_SAVE_SETTING, [(scope, key, json.dumps(value, ensure_ascii=False))
+                                           for key, value in settings.items()])
+            sources.append(path)
+        else:
+            settings = {}
+        path = _newest(dirs, time_file)
+        saved = _read_json(path) if path else None
+        clock = None
+        if isinstance(saved, dict) and isinstance(saved.get("game_time"), (int, float)):
+            clock = _stopped_clock(saved["game_time"], settings.get(speed_key, 6870), wall_ns)
+            sources.append(path)
+        if record is not None:
+            clock = record
+            sources.append(journal)
+        if clock is not None:
+            db.execute(_SAVE_CLOCK, (scope,) + tuple(clock[field] for field in CLOCK_FIELDS))
+        if sources:
+            db.execute("INSERT INTO legacy_import (scope, source) VALUES (?, ?)",
+                       (scope, os.path.dirname(sources[0])))
+
+
+def _sessions(db):
+    """Отрезки хода часов (sessions.SessionLog): одна строка на отрезок"""
+    db.execute("""
+        CREATE TABLE sessions (
+            id INTEGER PRIMARY KEY,
+            scope TEXT NOT NULL,
+            start_ns INTEGER NOT NULL,
+            end_ns INTEGER NOT NULL,
+            game_start_ns INTEGER NOT NULL,
+            game_end_ns INTEGER NOT NULL,
+            tick INTEGER NOT NULL,
+            real_tick INTEGER NOT NULL
+        )""")
+    db.execute("CREATE INDEX sessions_scope_start ON sessions (scope, start_ns)")
+
+
+def _named_clocks(db):
+    """Именованные часы панели (board.ClockBoard): якорь по настенным часам, скорость, флаги"""
+    db.execute("""
+        CREATE TABLE named_clocks (
+            scope TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            wall_ns INTEGER NOT NULL,
+            game_ns INTEGER NOT NULL,
+            tick INTEGER NOT NULL,
+            real_tick INTEGER NOT NULL,
+            running INTEGER NOT NULL,
+            paused INTEGER NOT NULL,
+            PRIMARY KEY (scope, id)
+        ) WITHOUT ROWID""")
+
+
+# Миграции по порядку: номер версии схемы (PRAGMA user_version) - их число
+MIGRATIONS = (_schema, _sessions, _named_clocks, _legacy_imports)
+
+
+class StateStore:
+    """
+    Одна база SQLite в режиме WAL на все интерфейсы: настройки, якорь
+    часов, будильники, история, отрезки сеансов и часы панели, по
+    областям (APP, TIMER). Схема
+    версионируется через PRAGMA user_version; после миграций прежние
+    JSON-файлы переносятся из каталогов legacy_dir (один каталог или
+    список), пока не найдутся (_import_legacy).
+
+    Без path база лежит в каталоге данных пользователя (data_dir()), а
+    legacy_dir по умолчанию - все известные каталоги прежних версий
+    (legacy_dirs()), так что перенос не зависит от того, из какого
+    каталога запущен первый интерфейс. Соединение общее для потока Tk и
+    потока записи (WriteBehind), доступ к нему - под блокировкой.
+
+    readonly - для разовых запросов: соединение только для чтения, без
+    миграций и поиска прежних файлов. Если базы еще нет или ее схема
+    устарела, она открывается обычным образом (readonly остается False).
+    """
+
+    def __init__(self, path=None, legacy_dir=None, readonly=False):
+        default = path is None
+        if default:
+            path = default_path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = _connect_readonly(path) if readonly and path != ":memory:" else None
+        self.readonly = self._db is not None
+        if self.readonly:
+            return
+        if default and legacy_dir is None:
+            legacy_dir = legacy_dirs()
+        if isinstance(legacy_dir, str):
+            legacy_dir = [legacy_dir]
+        # Транзакции открываются явно: каждая запись - одна фиксация
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # В WAL фиксация с synchronous=NORMAL не ждет fsync; база остается целой и при сбое
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=2000")
+        self._migrate(legacy_dir)
+
+    @property
+    def version(self):
+        return self._db.execute("PRAGMA user_version").fetchone()[0]
+
+    def _migrate(self, legacy_dir):
+        db = self._db
+        # Обычное открытие: схема актуальна и переносить нечего - без блокировки записи
+        if db.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS) and not (
+                legacy_dir and _legacy_files_found(legacy_dir, _pending_legacy(db))):
+            return
+        with self._lock:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                version = db.execute("PRAGMA user_version").fetchone()[0]
+                for number in range(version, len(MIGRATIONS)):
+                    MIGRATIONS[number](db)
+                    db.execute(f"PRAGMA user_version = {number + 1}")
+                _import_legacy(db, legacy_dir)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def skip_legacy_import(self):
+        """Отказ от переноса прежних JSON-файлов в области, куда он еще не записан"""
+        self._write("INSERT OR IGNORE INTO legacy_import (scope, source) VALUES (?, ?)",
+                    [(scope, SKIPPED) for scope in LEGACY_FILES], many=True)
+
+    def legacy_imports(self):
+        """Записанные переносы: область -> каталог-источник или SKIPPED"""
+        with self._lock:
+            return dict(self._db.execute("SELECT scope, source FROM legacy_import"))
+
+    def _write(self, sql, params=(), many=False):
+        with self._lock:
+            db = self._db
+            db.execute("BEGIN")
+            try:
+                if many:
+                    db.executemany(sql, params)
+                else:
+                    db.execute(sql, params)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def load(self, scope):
+        """Все состояние области одной транзакцией чтения: (настройки, якорь часов, строки будильников)"""
+        with self._lock:
+            db = self._db
+            db.execute("BEGIN")
+            try:
+                settings = {key: json.loads(value) for key, value in
+                            db.execute("SELECT key, value FROM settings WHERE scope = ?", (scope,))}
+                row = db.execute("SELECT wall_ns, game_ns, tick, real_tick, running, paused FROM clock "
+                                 "WHERE scope = ?", (scope,)).fetchone()
+                alarms = db.execute("SELECT id, time_ms, description, rule, fired, fire_count FROM alarms "
+                                    "WHERE scope = ? ORDER BY id", (scope,)).fetchall()
+            finally:
+                db.execute("COMMIT")
+        clock = None
+        if row is not None:
+            clock = dict(zip(CLOCK_FIELDS, row))
+            clock["running"] = bool(clock["running"])
+            clock["paused"] = bool(clock["paused"])
+        return settings, clock, alarms
+
+    def load_settings(self, scope):
+        with self._lock:
+            return {key: json.loads(value) for key, value in
+                    self._db.execute("SELECT key, value FROM settings WHERE scope = ?", (scope,))}
+
+    def sessions(self, scope):
+        """Все отрезки хода часов области в порядке начала (столбцы sessions.FIELDS)"""
+        with self._lock:
+            return self._db.execute("SELECT start_ns, end_ns, game_start_ns, game_end_ns, tick, real_tick "
+                                    "FROM sessions WHERE scope = ? ORDER BY start_ns", (scope,)).fetchall()
+
+    def named_clocks(self, scope):
+        """Часы панели области по id: (id, имя, wall_ns, game_ns, скорость, реальный тик, запущены, на паузе)"""
+        with self._lock:
+            rows = self._db.execute("SELECT id, name, wall_ns, game_ns, tick, real_tick, running, paused "
+                                    "FROM named_clocks WHERE scope = ? ORDER BY id", (scope,)).fetchall()
+        return [row[:6] + (bool(row[6]), bool(row[7])) for row in rows]
+
+    def data_version(self):
+        """Меняется, только когда базу изменило другое соединение (другой процесс)"""
+        with self._lock:
+            return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def scope(self, name, writer=None):
+        """Состояние области name, загруженное сразу; запись через writer (WriteBehind) или сразу"""
+        return StateScope(self, name, writer)
+
+    def history(self, scope, limit=100):
+        """Последние события истории: (wall_ns, вид, игровое время мс, описание), новые первыми"""
+        with self._lock:
+            return self._db.execute("SELECT wall_ns, kind, game_ms, detail FROM history WHERE scope = ? "
+                                    "ORDER BY id DESC LIMIT ?", (scope, limit)).fetchall()
+
+    def files(self):
+        """Файлы базы на диске (основной и WAL) - для слежения за изменениями"""
+        return [self.path, self.path + "-wal"]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class StateScope:
+    """
+    Состояние одной области: settings, clock (запись якоря или None) и
+    alarms (строки id, time_ms, описание, правило, сработал, сколько раз)
+    читаются при создании одной транзакцией. save_*(), delete_*(),
+    add_history() и add_session() пишут в базу через WriteBehind, если он задан (поток Tk диска не
+    ждет), иначе сразу. Ключи очереди разные у каждой записи, поэтому
+    склеиваются только повторные изменения одного и того же.
+
+    external_settings() отдает настройки, измененные в базе другим
+    процессом: чужая фиксация видна по PRAGMA data_version, а свои еще
+    не записанные изменения не принимаются за чужие - сравнение идет с
+    тем, что эта область сама уже записала.
+    """
+
+    def __init__(self, store, name, writer=None):
+        self.store = store
+        self.name = name
+        self._writer = writer
+        self._batches = count()
+        self.settings, self.clock, self.alarms = store.load(name)
+        self._written = dict(self.settings)
+        self._written_lock = threading.Lock()
+        self._data_version = store.data_version()
+
+    def _submit(self, key, sql, params, many=False, done=None):
+        def write(key, params):
+            self.store._write(sql, params, many)
+            if done is not None:
+                done()
+        if self._writer is None:
+            write(key, params)
+        else:
+            self._writer.submit((self.name,) + key, params, write=write)
+
+    def save_settings(self, settings):
+        self.settings = snapshot = dict(settings)
+        rows = [(self.name, key, json.dumps(value, ensure_ascii=False)) for key, value in snapshot.items()]
+
+        def written():
+            with self._written_lock:
+                self._written.update(snapshot)
+        self._submit(("settings",), _SAVE_SETTING, rows, many=True, done=written)
+
+    def external_settings(self):
+        """Настройки, измененные другим процессом с прошлого вызова (пустой словарь, если таких нет)"""
+        version = self.store.data_version()
+        if version == self._data_version:
+            return {}
+        self._data_version = version
+        stored = self.store.load_settings(self.name)
+        with self._written_lock:
+            changed = {key: value for key, value in stored.items() if self._written.get(key, _MISSING) != value}
+            self._written.update(changed)
+        return changed
+
+    def load_clock(self):
+        return self.clock
+
+    def save_clock(self, record):
+        self.clock = record
+        self._submit(("clock",), _SAVE_CLOCK, (self.name,) + tuple(record[field] for field in CLOCK_FIELDS))
+
+    def save_alarm(self, alarm):
+        """Записать будильник (новый или измененный) по его текущим полям"""
+        row = (self.name, alarm.id, alarm.time_ms, alarm.description, alarm.rule.spec(),
+               int(alarm.fired), alarm.fire_count)
+        self._submit(("alarm", alarm.id), _SAVE_ALARM, row)
+
+    def save_alarms(self, alarms):
+        """Пакет будильников одной транзакцией (импорт)"""
+        rows = [(self.name, alarm.id, alarm.time_ms, alarm.description, alarm.rule.spec(),
+                 int(alarm.fired), alarm.fire_count) for alarm in alarms]
+        if rows:
+            self._submit(("alarms", next(self._batches)), _SAVE_ALARM, rows, many=True)
+
+    def delete_alarm(self, alarm_id):
+        self._submit(("alarm", alarm_id), _DELETE_ALARM, (self.name, alarm_id))
+
+    def clear_alarms(self):
+        self._submit(("alarms", next(self._batches)), _CLEAR_ALARMS, (self.name,))
+
+    def load_sessions(self):
+        return self.store.sessions(self.name)
+
+    def add_session(self, row):
+        self._submit(("session", next(self._batches)), _ADD_SESSION, (self.name,) + tuple(row))
+
+    def load_named_clocks(self):
+        return self.store.named_clocks(self.name)
+
+    def save_named_clock(self, row):
+        self._submit(("named_clock", row[0]), _SAVE_NAMED_CLOCK, (self.name,) + tuple(row))
+
+    def delete_named_clock(self, clock_id):
+        self._submit(("named_clock", clock_id), _DELETE_NAMED_CLOCK, (self.name, clock_id))
+
+    def add_history(self, kind, game_ms=None, detail=None):
+        self._submit(("history", next(self._batches)), _ADD_HISTORY,
+                     (self.name, time.time_ns(), kind, game_ms, detail))
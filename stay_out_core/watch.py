@@ -0,0 +1,161 @@
+"""
+Слежение за файлами в фоновом потоке: inotify на Linux, иначе опрос mtime
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+# Маска inotify: запись, закрытие после записи, замена переименованием, создание, удаление
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT = struct.Struct("iIII")
+
+# Пауза после события: запись обычно идет пачкой событий, обработка - одна
+SETTLE_S = 0.1
+POLL_INTERVAL_S = 1.0
+
+
+def _inotify_watch(directory):
+    """Дескриптор inotify, следящий за каталогом, или None (не Linux, нет libc, ошибка)"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _event_names(data):
+    """Имена файлов из буфера событий inotify"""
+    names = set()
+    offset = 0
+    while offset + _EVENT.size <= len(data):
+        _, _, _, length = _EVENT.unpack_from(data, offset)
+        offset += _EVENT.size
+        names.add(os.fsdecode(data[offset:offset + length].rstrip(b"\0")))
+        offset += length
+    return names
+
+
+class FileWatcher:
+    """
+    Вызывает on_change() в своем потоке, когда меняется один из файлов
+    paths (все в одном каталоге). На Linux ждет событий inotify и не
+    тратит ничего, пока файлы не трогают; в остальных системах (или если
+    inotify недоступен) раз в poll_interval сравнивает mtime и размер.
+    stat() делается только в этом потоке и только при опросе - цикл тиков
+    интерфейса файлов не касается.
+    """
+
+    def __init__(self, paths, on_change, poll_interval=POLL_INTERVAL_S, settle=SETTLE_S, use_inotify=True):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.directory = os.path.dirname(self.paths[0])
+        self._names = {os.path.basename(path) for path in self.paths}
+        self._on_change = on_change
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self._use_inotify = use_inotify
+        self._stop = threading.Event()
+        self._wake_r = self._wake_w = None
+        self._thread = None
+        self.backend = None
+        self.changes = 0
+
+    def start(self):
+        fd = _inotify_watch(self.directory) if self._use_inotify else None
+        if fd is not None:
+            self.backend = "inotify"
+            self._wake_r, self._wake_w = os.pipe()
+            target = lambda: self._run_inotify(fd)
+        else:
+            self.backend = "poll"
+            # Отсчет берется до запуска потока: изменение сразу после start() не теряется
+            last = self._stamp()
+            target = lambda: self._run_poll(last)
+        self._thread = threading.Thread(target=target, name="watch", daemon=True)
+        self._thread.start()
+        return self
+
+    def _fire(self):
+        self.changes += 1
+        try:
+            self._on_change()
+        except Exception as e:
+            print(f"Ошибка обработки изменения файла: {e}")
+
+    def _run_inotify(self, fd):
+        try:
+            while True:
+                ready, _, _ = select.select([fd, self._wake_r], [], [])
+                if self._wake_r in ready:
+                    return
+                if not self._names & self._drain(fd):
+                    continue
+                # Досчитываем пачку событий, чтобы обработать изменение один раз
+                while not self._stop.is_set():
+                    ready, _, _ = select.select([fd, self._wake_r], [], [], self.settle)
+                    if self._wake_r in ready:
+                        return
+                    if not ready:
+                        break
+                    self._drain(fd)
+                self._fire()
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _drain(fd):
+        names = set()
+        while True:
+            try:
+                data = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            if not data:
+                return names
+            names |= _event_names(data)
+
+    def _stamp(self):
+        stamp = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append(None)
+        return stamp
+
+    def _run_poll(self, last):
+        while not self._stop.wait(self.poll_interval):
+            stamp = self._stamp()
+            if stamp != last:
+                last = stamp
+                self._fire()
+
+    def close(self, timeout=1.0):
+        self._stop.set()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"\0")
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        for fd in (self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._wake_r = self._wake_w = None
@@ -0,0 +1,169 @@
+"""
+Иерархическое колесо таймеров: добавление, отмена и срабатывание за O(1)
+"""
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+SLOT_MASK = SLOTS - 1
+LEVELS = 6
+
+# Скачок дальше этого числа тиков - пересборка за O(n) вместо обхода каждого тика
+REBUILD_TICKS = SLOTS * SLOTS
+
+
+class _Timer:
+    __slots__ = ("key", "expires", "slot")
+
+    def __init__(self, key, expires):
+        self.key = key
+        self.expires = expires
+        self.slot = None
+
+
+class TimingWheel:
+    """
+    Колесо из LEVELS уровней по 64 ячейки. Ячейка уровня i покрывает 64**i
+    тиков. Таймер кладется на самый нижний уровень, где срок совпадает с
+    текущим тиком во всех старших разрядах, - в ячейку по разрядам уровня.
+    Когда текущий тик входит в окно ячейки верхнего уровня, ее таймеры
+    переносятся ниже (каскад); на нижнем уровне ячейка - это ровно один тик.
+
+    Ячейки - словари ключ -> таймер, поэтому отмена - одно удаление.
+    Ближайший срок ищется без перебора таймеров: на нижнем непустом уровне
+    первая непустая ячейка после текущей содержит самые ранние сроки.
+    """
+
+    def __init__(self, now=0):
+        self._now = int(now)
+        self._levels = [[{} for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self._counts = [0] * LEVELS
+        self._due = {}  # Сроки, уже наступившие при добавлении
+        self._timers = {}
+
+    @property
+    def now(self):
+        return self._now
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def expires(self, key):
+        timer = self._timers.get(key)
+        return timer.expires if timer is not None else None
+
+    def _place(self, timer):
+        expires = timer.expires
+        now = self._now
+        if expires <= now:
+            slot = self._due
+            level = None
+        else:
+            level = 0
+            while level < LEVELS - 1 and (expires >> (SLOT_BITS * (level + 1))) != (now >> (SLOT_BITS * (level + 1))):
+                level += 1
+            slot = self._levels[level][(expires >> (SLOT_BITS * level)) & SLOT_MASK]
+            self._counts[level] += 1
+        slot[timer.key] = timer
+        timer.slot = (slot, level)
+
+    def _unplace(self, timer):
+        slot, level = timer.slot
+        del slot[timer.key]
+        if level is not None:
+            self._counts[level] -= 1
+        timer.slot = None
+
+    def add(self, key, expires):
+        """Таймер key со сроком expires (абсолютный тик); заменяет прежний"""
+        self.cancel(key)
+        timer = self._timers[key] = _Timer(key, int(expires))
+        self._place(timer)
+
+    def cancel(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            self._unplace(timer)
+        return timer is not None
+
+    def _collect(self, slot, level, expired):
+        """Каскад ячейки: таймеры переносятся ниже или срабатывают"""
+        if not slot:
+            return
+        timers = list(slot.values())
+        slot.clear()
+        self._counts[level] -= len(timers)
+        for timer in timers:
+            if timer.expires <= self._now:
+                timer.slot = None
+                expired.append(timer)
+            else:
+                self._place(timer)
+
+    def advance(self, to_tick):
+        """Перевести колесо на тик to_tick; ключи сработавших таймеров по порядку сроков"""
+        to_tick = int(to_tick)
+        expired = []
+        if self._due:
+            for timer in self._due.values():
+                timer.slot = None
+                expired.append(timer)
+            self._due.clear()
+        if to_tick > self._now:
+            if not self._timers:
+                self._now = to_tick
+            elif to_tick - self._now > REBUILD_TICKS:
+                self._rebuild(to_tick, expired)
+            else:
+                while self._now < to_tick:
+                    self._step(expired)
+        for timer in expired:
+            del self._timers[timer.key]
+        expired.sort(key=lambda timer: timer.expires)
+        return [timer.key for timer in expired]
+
+    def _step(self, expired):
+        now = self._now = self._now + 1
+        # Каскад сверху вниз: перенесенное с верхнего уровня может попасть в ячейку нижнего
+        level = 1
+        while level < LEVELS and now & ((1 << (SLOT_BITS * level)) - 1) == 0:
+            level += 1
+        for cascade in range(level - 1, 0, -1):
+            if self._counts[cascade]:
+                self._collect(self._levels[cascade][(now >> (SLOT_BITS * cascade)) & SLOT_MASK], cascade, expired)
+        slot = self._levels[0][now & SLOT_MASK]
+        if slot:
+            self._collect(slot, 0, expired)
+
+    def _rebuild(self, to_tick, expired):
+        timers = [timer for timer in self._timers.values() if timer.slot is not None]
+        for level in self._levels:
+            for slot in level:
+                slot.clear()
+        self._counts = [0] * LEVELS
+        self._now = to_tick
+        for timer in timers:
+            if timer.expires <= to_tick:
+                timer.slot = None
+                expired.append(timer)
+            else:
+                self._place(timer)
+
+    def next_expiry(self):
+        """Ближайший срок (тик) или None"""
+        if self._due:
+            return min(timer.expires for timer in self._due.values())
+        now = self._now
+        for level in range(LEVELS - 1):
+            if not self._counts[level]:
+                continue
+            slots = self._levels[level]
+            for index in range(((now >> (SLOT_BITS * level)) & SLOT_MASK) + 1, SLOTS):
+                if slots[index]:
+                    return min(timer.expires for timer in slots[index].values())
+        if self._counts[LEVELS - 1]:
+            # Верхний уровень собирает и сроки за пределами колеса: полный перебор
+            return min(timer.expires for slot in self._levels[LEVELS - 1] for timer in slot.values())
+        return None
@@ -0,0 +1,121 @@
+"""
+Таймер Stay Out без интерфейса: HTTP/JSON API игрового времени на localhost
+"""
+import argparse
+import asyncio
+import signal
+import sys
+
+from stay_out_core import AlarmEngine, AlarmStore, ClockJournal, GameClock, StateStore, control, format_time
+from stay_out_core import persist, sessions
+from stay_out_core.server import DEFAULT_HOST, DEFAULT_PORT, ApiServer, TimeService
+
+# Ключ скорости в настройках каждой области хранилища
+SPEED_KEYS = {"app": "game_tick_duration", "timer": "game_speed"}
+
+
+def print_notification(notification):
+    """Уведомление (будильники одного тика) в консоль - вместо всплывающего окна интерфейса"""
+    print(f"{notification.title}: " + notification.text().replace("\n", "; "), flush=True)
+
+
+def build_service(store, scope="app", writer=None, source=None, notify=None):
+    """Часы, будильники и журнал области scope, восстановленные из базы, как при запуске интерфейса"""
+    state = store.scope(scope, writer=writer)
+    clock = GameClock(state.settings.get(SPEED_KEYS[scope], 6870), state.settings.get("real_time_tick", 1000),
+                      source=source)
+    # После сбоя идущий таймер продолжается с того времени, которое было бы сейчас
+    journal = ClockJournal(clock, store=state)
+    journal.restore()
+
+    alarms = AlarmStore()
+    engine = AlarmEngine(clock)
+    restored = alarms.restore(state.alarms)
+    engine.add_many((alarm.id, alarm.rule) for alarm in restored if alarm.rule.repeats or not alarm.fired)
+
+    return TimeService(clock, alarms, engine, state=state, journal=journal,
+                       session_log=sessions.SessionLog(clock, store=state), speed_key=SPEED_KEYS[scope],
+                       notify=notify)
+
+
+def handle_control(service, name, value):
+    """Команда управляющего сокета - как у интерфейса; окна нет, show только отвечает состоянием"""
+    if name == "start":
+        service.start_timer()
+    elif name == "pause":
+        service.pause_timer()
+    elif name == "stop":
+        service.stop_timer()
+    elif name == "reset":
+        service.reset_timer()
+    elif name == "set":
+        service.edit_time(format_time(value))
+    elif name == "speed":
+        service.change_game_speed(value)
+    return control.clock_status(service.clock)
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, scope="app", listener=None):
+    """listener - занятый управляющий сокет (control.claim()): его команды выполняются на цикле asyncio"""
+    # Запись в базу - в фоновом потоке: цикл asyncio диска не ждет
+    writer = persist.WriteBehind()
+    store = StateStore()
+    service = build_service(store, scope, writer, notify=print_notification)
+    server = await ApiServer(service, host, port).start()
+    loop = asyncio.get_running_loop()
+    commands = None
+    if listener is not None:
+        commands = control.ControlServer(listener, lambda name, value: handle_control(service, name, value),
+                                         dispatch=loop.call_soon_threadsafe).start()
+    print(f"Таймер Stay Out: http://{host}:{server.port}/time")
+    print(f"Поток событий: http://{host}:{server.port}/events?resolution=second|minute")
+    print("Команды (POST, с заголовком X-Stay-Out: 1 или Content-Type: application/json): "
+          "/start, /pause, /stop, /reset, /set?time=ЧЧ:ММ:СС, /speed?speed=6870")
+
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C прерывает asyncio.run, и очистка идет в finally
+            pass
+    try:
+        await stop.wait()
+    finally:
+        if commands is not None:
+            commands.close()
+        await server.close()
+        service.close()
+        writer.close()
+        store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Таймер Stay Out без интерфейса: HTTP/JSON API на localhost")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"адрес (по умолчанию {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"порт (по умолчанию {DEFAULT_PORT})")
+    parser.add_argument("--scope", choices=sorted(SPEED_KEYS), default="app",
+                        help="чье состояние вести: app - расширенная версия, timer - полная и консольная")
+    args = parser.parse_args(argv)
+
+    # Часы области app ведут и интерфейс, и командная строка: два журнала одних часов перезаписывали бы
+    # друг друга, поэтому служба занимает управляющий сокет (и принимает команды) или не запускается
+    listener = None
+    if args.scope == "app":
+        listener = control.claim()
+        if listener is None:
+            print("Таймер уже запущен (окно или другая служба); команды ему: stay_out_cli.py", file=sys.stderr)
+            return 1
+    try:
+        asyncio.run(serve(args.host, args.port, args.scope, listener))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if listener is not None:
+            listener.close()
+    print("До свидания!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,11 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+import os
+
 # UPX is not available in some environments, so set upx=False
 a = Analysis(
-    ['main.py'],
-    pathex=[],
+    [os.path.join(SPECPATH, 'main.py')],
+    pathex=[os.path.dirname(SPECPATH)],  # stay_out_core lives in the repository root
     binaries=[],
     datas=[],
     hiddenimports=[],
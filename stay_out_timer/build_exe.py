@@ -16,7 +16,7 @@ def build_executable():
     print("Создание исполняемого файла...")
     
     # Change to the project directory
-    os.chdir("/workspace/stay_out_timer")
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
     
     # Build command with options for a clean GUI application
     build_cmd = [
@@ -25,13 +25,14 @@ def build_executable():
         "--windowed",          # Create a GUI application (no console)
         "--name=StayOutTimer", # Name of the executable
         "--icon=",             # No icon specified
+        "--paths=..",          # stay_out_core lives in the repository root
         "main.py"
     ]
     
     try:
         subprocess.run(build_cmd, check=True)
         print("Исполняемый файл успешно создан в папке 'dist'")
-        print("Путь к исполняемому файлу: /workspace/stay_out_timer/dist/StayOutTimer.exe")
+        print("Путь к исполняемому файлу: dist/StayOutTimer.exe")
     except subprocess.CalledProcessError as e:
         print(f"Ошибка при создании исполняемого файла: {e}")
         return False
@@ -44,6 +45,6 @@ if __name__ == "__main__":
     
     if success:
         print("\nГотово! Исполняемый файл таймера Stay Out создан.")
-        print("Вы можете найти его в папке: /workspace/stay_out_timer/dist/")
+        print("Вы можете найти его в папке: dist/")
     else:
         print("\nПроизошла ошибка при создании исполняемого файла.")
\ No newline at end of file
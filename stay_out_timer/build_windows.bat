@@ -3,7 +3,7 @@ echo Installing PyInstaller...
 pip install pyinstaller
 
 echo Creating Windows executable...
-pyinstaller --onefile --windowed --name=StayOutTimer --icon= --add-data "settings.json;." main.py
+pyinstaller --onefile --windowed --name=StayOutTimer --icon= --paths=.. --add-data "settings.json;." main.py
 
 echo.
 echo Windows executable created in the 'dist' folder
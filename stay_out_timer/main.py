@@ -1,13 +1,22 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox
 import time
-import threading
-import json
 import os
-from tkinter import font
+import sys
+
+# The shared core package lives in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stay_out_core import CallQueue, ClockJournal, GameClock, StateStore, TickScheduler, control, format_time, persist
+
+# Delay after the last slider motion event before the new speed is applied
+SPEED_SETTLE_MS = 200
+
+# How long the "settings saved" note stays under the save button
+SAVED_NOTICE_MS = 3000
 
 class StayOutTimerApp:
-    def __init__(self, root):
+    def __init__(self, root, source=None):
+        # source: real-time source for the game clock ("monotonic", "wall" or a ManualClock)
         self.root = root
         self.root.title("Таймер Stay Out - Harper_IDS")
         self.root.geometry("600x500")
@@ -20,24 +29,37 @@ class StayOutTimerApp:
             "background_color": "#f0f0f0",
             "text_color": "#000000"
         }
+        
+        # One SQLite store for settings and the clock anchor, read once at startup;
+        # writes go through a background thread (no disk I/O on the Tk thread)
+        self.persist = persist.WriteBehind()
+        self.store = StateStore()
+        self.state = self.store.scope("app", writer=self.persist)
         self.load_settings()
         
-        # Timer variables
-        self.start_time = 0  # Real time when timer started (in ms)
-        self.is_running = False
-        self.is_paused = False
-        self.paused_time = 0  # Real time when paused (in ms)
-        self.game_time_at_pause = 0  # Game time at pause (in ms)
-        self.initial_game_time = 0  # Initial game time when timer starts (in ms)
+        # Game clock (start/pause/stop state and the game time itself)
+        self.clock = GameClock(self.settings["game_tick_duration"], self.settings["real_time_tick"],
+                               source=source)
         
-        # Load saved game time if exists
-        self.load_saved_game_time()
+        # Pending slider speed change (applied once the drag settles)
+        self._speed_after_id = None
+        self._speed_changed_at = 0.0
+        # Pending removal of the "settings saved" note
+        self._saved_notice_id = None
+        
+        # Clock anchor checkpoints: after a crash a running timer resumes at the time it would be now
+        self.journal = ClockJournal(self.clock, store=self.state)
+        self.journal.restore()
         
         # Create UI
         self.create_widgets()
         
-        # Start timer update loop
-        self.update_timer()
+        # Redraw exactly when the displayed game second changes
+        self.scheduler = TickScheduler(self.clock, self.root.after, self.root.after_cancel, self.update_timer)
+        self.scheduler.poke()
+        
+        # Commands of a second launch or a script arrive on the control socket (see listen())
+        self.control = None
         
         # Handle window closing
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -70,7 +92,7 @@ class StayOutTimerApp:
     
     def setup_main_tab(self):
         # Timer display
-        self.timer_label = ttk.Label(self.main_frame, text="Время игры: 00:00:00", 
+        self.timer_label = ttk.Label(self.main_frame, text=f"Время игры: {self.format_time(self.clock.now_ms())}", 
                                      font=("Arial", 24), foreground="#333")
         self.timer_label.pack(pady=20)
         
@@ -103,7 +125,7 @@ class StayOutTimerApp:
         self.root.bind('<Return>', lambda event: self.start_timer())
         
         # Status label
-        self.status_label = ttk.Label(self.main_frame, text="Состояние: Остановлен", 
+        self.status_label = ttk.Label(self.main_frame, text=self.status_text(), 
                                       font=("Arial", 12))
         self.status_label.pack(pady=10)
         
@@ -152,7 +174,10 @@ class StayOutTimerApp:
         
         # Save settings button
         ttk.Button(settings_container, text="Сохранить настройки", 
-                   command=self.save_settings).pack(pady=20)
+                   command=self.save_settings).pack(pady=(20, 5))
+        # Confirmation without a modal dialog that would block the Tk thread
+        self.settings_status_label = ttk.Label(settings_container, text="", foreground="#4CAF50")
+        self.settings_status_label.pack()
     
     def setup_help_tab(self):
         help_text = """
@@ -196,135 +221,131 @@ class StayOutTimerApp:
     def update_speed(self, value):
         self.settings["game_tick_duration"] = int(float(value))
         self.speed_label.config(text=f"{int(float(value))} мс")
+        
+        # A slider drag fires hundreds of motion events: coalesce them into one clock segment
+        self._speed_changed_at = time.monotonic()
+        if self._speed_after_id is None:
+            self._speed_after_id = self.root.after(SPEED_SETTLE_MS, self._apply_pending_speed)
+    
+    def _apply_pending_speed(self):
+        idle_ms = int((time.monotonic() - self._speed_changed_at) * 1000)
+        if idle_ms < SPEED_SETTLE_MS:
+            # The slider is still moving
+            self._speed_after_id = self.root.after(SPEED_SETTLE_MS - idle_ms, self._apply_pending_speed)
+            return
+        self._speed_after_id = None
+        self.clock.set_speed(self.settings["game_tick_duration"])
+        self.clock_changed()
     
     def reset_speed_to_default(self):
-        self.speed_var.set(6870)
-        self.settings["game_tick_duration"] = 6870
-        self.speed_label.config(text="6870 мс")
+        self.set_game_speed(6870)
+    
+    def set_game_speed(self, speed):
+        self.speed_var.set(speed)
+        self.settings["game_tick_duration"] = speed
+        self.clock.set_speed(speed)
+        self.speed_label.config(text=f"{speed} мс")
+        self.clock_changed()
     
     def save_settings(self):
         self.settings["game_tick_duration"] = self.speed_var.get()
+        self.clock.set_speed(self.settings["game_tick_duration"])
+        self.clock_changed()
         self.settings["background_color"] = self.bg_color_var.get()
         self.settings["text_color"] = self.text_color_var.get()
         
-        try:
-            with open("settings.json", "w") as f:
-                json.dump(self.settings, f)
-            messagebox.showinfo("Настройки", "Настройки успешно сохранены!")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось сохранить настройки: {str(e)}")
+        self.state.save_settings(self.settings)
+        self.settings_status_label.config(text="Настройки успешно сохранены!")
+        if self._saved_notice_id is not None:
+            self.root.after_cancel(self._saved_notice_id)
+        self._saved_notice_id = self.root.after(SAVED_NOTICE_MS, self._clear_saved_notice)
+
+    def _clear_saved_notice(self):
+        self._saved_notice_id = None
+        self.settings_status_label.config(text="")
     
     def load_settings(self):
-        try:
-            if os.path.exists("settings.json"):
-                with open("settings.json", "r") as f:
-                    loaded_settings = json.load(f)
-                    self.settings.update(loaded_settings)
-        except Exception as e:
-            print(f"Не удалось загрузить настройки: {str(e)}")
+        # Already read from the store together with the clock anchor
+        self.settings.update(self.state.settings)
     
-    def load_saved_game_time(self):
-        """Load saved game time from file"""
-        try:
-            if os.path.exists("game_time.json"):
-                with open("game_time.json", "r") as f:
-                    data = json.load(f)
-                    self.initial_game_time = data.get("game_time", 0)
-                    # Update the display with the loaded time
-                    self.timer_label.config(text=f"Время игры: {self.format_time(self.initial_game_time)}")
-        except Exception as e:
-            print(f"Не удалось загрузить сохраненное игровое время: {str(e)}")
+    def listen(self, listener):
+        """Serve the control socket claimed in main(); commands run on the Tk thread"""
+        # Connection threads never call Tk: commands go through a queue polled on the Tk thread
+        self.tk_calls = CallQueue(self.root.after, self.root.after_cancel).start()
+        self.control = control.ControlServer(listener, self.handle_control, dispatch=self.tk_calls.post).start()
     
-    def save_game_time_on_exit(self):
-        """Save current game time to file when exiting"""
-        try:
-            # Calculate current game time to save
-            current_game_time = self.initial_game_time
-            if self.is_running and not self.is_paused:
-                real_elapsed = (time.time() * 1000 - self.start_time)
-                game_time_ms = real_elapsed * self.settings["game_tick_duration"] / self.settings["real_time_tick"]
-                current_game_time = self.initial_game_time + game_time_ms
-            
-            with open("game_time.json", "w") as f:
-                json.dump({"game_time": current_game_time}, f)
-        except Exception as e:
-            print(f"Не удалось сохранить игровое время: {str(e)}")
+    def handle_control(self, name, value):
+        """A command forwarded by a second launch or sent by a script; returns the clock status"""
+        if name == "show":
+            self.root.deiconify()
+            self.root.lift()
+            self.root.focus_force()
+        elif name == "start":
+            self.start_timer()
+        elif name == "pause":
+            self.pause_timer()
+        elif name == "stop":
+            self.stop_timer()
+        elif name == "reset":
+            self.reset_timer()
+        elif name == "set":
+            self.clock.set_ms(value)
+            self.clock_changed()
+        elif name == "speed":
+            self.set_game_speed(value)
+        return control.clock_status(self.clock)
     
     def on_closing(self):
         """Handle window closing event"""
-        # Save current game time
-        self.save_game_time_on_exit()
+        if self.control is not None:
+            self.control.close()
+            self.tk_calls.stop()
+        # Save the clock anchor (game time and state)
+        self.journal.record()
+        # One final write of everything still pending
+        self.persist.close()
+        self.store.close()
         # Destroy the window
         self.root.destroy()
     
     def format_time(self, elapsed_time_ms):
         """Format time in milliseconds to HH:MM:SS format"""
-        total_seconds = int(elapsed_time_ms // 1000)
-        hours = (total_seconds // 3600) % 24
-        minutes = (total_seconds % 3600) // 60
-        seconds = total_seconds % 60
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        return format_time(elapsed_time_ms)
     
     def update_timer(self):
-        if self.is_running and not self.is_paused:
-            # Calculate current game time
-            real_elapsed = (time.time() * 1000 - self.start_time)  # in ms
-            game_time_ms = real_elapsed * self.settings["game_tick_duration"] / self.settings["real_time_tick"]
-            
-            # Total game time = initial game time + time elapsed since start + time accumulated while paused
-            total_game_time = self.initial_game_time + game_time_ms
-            
-            self.timer_label.config(text=f"Время игры: {self.format_time(total_game_time)}")
-        
-        # Schedule next update
-        self.root.after(1000, self.update_timer)  # Update every second
+        # Called by the scheduler whenever the displayed game second changes
+        self.timer_label.config(text=f"Время игры: {self.format_time(self.clock.now_ms())}")
+        self.journal.record()
+    
+    def clock_changed(self):
+        """After a start, pause, set or speed change: write the checkpoint now, not only when the
+        label is redrawn (a minimized window may not redraw before a crash), and redraw"""
+        self.journal.record()
+        self.scheduler.poke()
+    
+    def status_text(self):
+        if self.clock.active:
+            return "Состояние: Работает"
+        return "Состояние: На паузе" if self.clock.paused else "Состояние: Остановлен"
     
     def start_timer(self):
-        if not self.is_running or self.is_paused:
-            if self.is_paused:
-                # Resume from pause: adjust start_time to account for pause duration
-                pause_duration = time.time() * 1000 - self.paused_time
-                self.start_time += pause_duration
-                self.initial_game_time = self.game_time_at_pause
-                self.is_paused = False
-            else:
-                # First start or after stop/reset
-                self.start_time = time.time() * 1000
-                # initial_game_time already contains the correct value
-            
-            self.is_running = True
+        if self.clock.start():
             self.status_label.config(text="Состояние: Работает")
+            self.clock_changed()
     
     def pause_timer(self):
-        if self.is_running and not self.is_paused:
-            self.is_paused = True
-            self.paused_time = time.time() * 1000
-            
-            # Calculate the elapsed game time at the moment of pause
-            real_elapsed = (time.time() * 1000 - self.start_time)
-            game_time_ms = real_elapsed * self.settings["game_tick_duration"] / self.settings["real_time_tick"]
-            self.game_time_at_pause = self.initial_game_time + game_time_ms
-            
+        if self.clock.pause():
             self.status_label.config(text="Состояние: На паузе")
+            self.clock_changed()
     
     def stop_timer(self):
-        if self.is_running:
-            if not self.is_paused:
-                # Calculate accumulated time before stopping
-                real_elapsed = (time.time() * 1000 - self.start_time)
-                game_time_ms = real_elapsed * self.settings["game_tick_duration"] / self.settings["real_time_tick"]
-                self.initial_game_time += game_time_ms
-            
-            self.is_running = False
-            self.is_paused = False
+        if self.clock.stop():
             self.status_label.config(text="Состояние: Остановлен")
+            self.clock_changed()
     
     def reset_timer(self):
-        self.is_running = False
-        self.is_paused = False
-        self.initial_game_time = 0
-        self.start_time = time.time() * 1000
-        self.timer_label.config(text="Время игры: 00:00:00")
+        self.clock.reset()
+        self.clock_changed()
         self.status_label.config(text="Состояние: Сброшен")
     
     def edit_time(self):
@@ -367,11 +388,10 @@ class StayOutTimerApp:
                 total_ms = hours * 3600000 + minutes * 60000 + seconds * 1000
                 
                 # Set the timer to this time
-                self.initial_game_time = total_ms
-                self.start_time = time.time() * 1000
+                self.clock.set_ms(total_ms)
                 
                 # Update display
-                self.timer_label.config(text=f"Время игры: {self.format_time(total_ms)}")
+                self.clock_changed()
                 
                 time_window.destroy()
                 
@@ -399,9 +419,23 @@ class StayOutTimerApp:
         # Wait for window to be closed
         time_window.wait_window()
 
-def main():
+def main(argv=None):
+    # One instance per user: a second launch forwards its command (start, pause, set 12:00:00, show) and exits
+    try:
+        instance = control.single_instance(sys.argv[1:] if argv is None else argv)
+    except ValueError as e:
+        print(e)
+        return
+    if instance is None:
+        return
+    listener, command = instance
+    
     root = tk.Tk()
     app = StayOutTimerApp(root)
+    if listener is not None:
+        app.listen(listener)
+    if command[0] != "show":
+        app.handle_control(*command)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -41,13 +41,13 @@ def build_executable():
     # Create icon
     icon_created = create_icon()
     
-    # Build the executable using the spec file
+    # Build the executable; main.py adds the repository root to sys.path only at run time,
+    # so PyInstaller needs it in --paths to bundle stay_out_core
     try:
-        cmd = [sys.executable, '-m', 'PyInstaller', 'stay_out_timer.spec']
-        if not icon_created:
-            # If icon wasn't created, modify the command to not use an icon
-            cmd = [sys.executable, '-m', 'PyInstaller', '--onefile', '--windowed', 
-                   '--name=StayOutTimer', 'main.py']
+        cmd = [sys.executable, '-m', 'PyInstaller', '--onefile', '--windowed',
+               '--name=StayOutTimer', '--paths=..', 'main.py']
+        if icon_created:
+            cmd.insert(-1, '--icon=icon.ico')
         result = subprocess.run(cmd, check=True, capture_output=True, text=True)
         print("Executable built successfully")
         print(result.stdout)
@@ -2,50 +2,284 @@ import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 import time
 import threading
-import json
 import os
-import winsound  # For sound alerts on Windows
+import sys
 from datetime import datetime
 import webbrowser
 
+# The shared core package lives in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stay_out_core import (DAY_MS, GAME_WEEKDAYS, AlarmEngine, AlarmStore, CallQueue, ClockBoard, ClockJournal, CountdownTimers, GameClock, Notifier,
+                           OccurrencePlanner, Recurrence, RenderLayer, StateStore, TickScheduler, alarm_io, audio, batch, day_strings, format_time, parse_time, persist,
+                           schema, sessions, wall_second_source)
+from stay_out_core import control
+from stay_out_core.watch import FileWatcher
+
+# Delay after the last slider motion event before the new speed is applied
+SPEED_SETTLE_MS = 200
+
+# Game time display resolutions (game milliseconds per displayed step)
+DISPLAY_RESOLUTIONS = {"seconds": 1000, "minutes": 60000}
+
+# Window for the scheduler wakeup measurement
+WAKEUP_MEASURE_MS = 10000
+
+# Alarm repeat modes shown in the alarms tab
+REPEAT_MODES = ("Однократно", "Каждый игровой день", "Каждые N игровых минут", "По дням игровой недели")
+
+# Toast titles per notification kind: (one item, several items)
+TOAST_TITLES = {
+    "Будильник": ("Сработал будильник!", "Сработали будильники: {}"),
+    "Таймер": ("Таймер истек!", "Истекли таймеры: {}"),
+    "Настройки": ("Настройки", "Настройки"),
+    "История": ("История", "История"),
+    "Звук": ("Звук", "Звук"),
+}
+
+# Days shown in the history tab
+HISTORY_DAYS = 30
+
+# Dashboard clock states
+BOARD_STATES = {(False, False): "Остановлены", (True, False): "Идут", (True, True): "На паузе"}
+
+# Countdown timer kinds shown in the timers tab
+COUNTDOWN_KINDS = {"game": "Игровое", "real": "Реальное"}
+
+# Alarm notifications: time on screen and minimum gap between two of them
+TOAST_DISPLAY_MS = 6000
+TOAST_INTERVAL_MS = 1500
+
+class AlarmListView:
+    """
+    Alarms Treeview that holds only the visible rows. Row items are reused
+    slots: scrolling rewrites the values of the slots whose content changed,
+    and fired alarms update just their own row, so thousands of alarms cost
+    no more Tk items than one screen of them.
+    """
+    STATUS = {False: "Ожидает", True: "Сработал"}
+    
+    def __init__(self, parent, store, format_time):
+        self.store = store
+        self.format_time = format_time
+        self.offset = 0
+        self.rows = 10
+        self._slots = []  # Alarm id shown in each row slot
+        self._values = []  # Values shown in each row slot
+        self._version = None
+        
+        self.tree = ttk.Treeview(parent, columns=("time", "desc", "status"), show="headings",
+                                 selectmode="browse", height=self.rows)
+        self.tree.heading("time", text="Время")
+        self.tree.heading("desc", text="Описание")
+        self.tree.heading("status", text="Статус")
+        self.tree.column("time", width=100)
+        self.tree.column("desc", width=200)
+        self.tree.column("status", width=100)
+        
+        # The scrollbar drives the window offset instead of the Treeview's own yview
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll_to(self.offset - event.delta // 120 * 3))
+        self.tree.bind("<Button-4>", lambda event: self.scroll_to(self.offset - 3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_to(self.offset + 3))
+        self.tree.bind("<Up>", lambda event: self.step_selection(-1))
+        self.tree.bind("<Down>", lambda event: self.step_selection(1))
+    
+    def on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        rows = max(1, event.height // row_height - 1)  # One row is taken by the headings
+        if rows != self.rows:
+            self.rows = rows
+            self.scroll_to(self.offset, force=True)
+    
+    def on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(value) * len(self.store)))
+        elif unit == "pages":
+            self.scroll_to(self.offset + int(value) * self.rows)
+        else:
+            self.scroll_to(self.offset + int(value))
+    
+    def scroll_to(self, offset, force=False):
+        offset = max(0, min(offset, len(self.store) - self.rows))
+        if offset != self.offset or force:
+            self.offset = offset
+            self.refresh()
+        return "break"
+    
+    def show(self, alarm_id):
+        """Scroll so that the alarm is visible and select it"""
+        index = self.store.index(alarm_id)
+        if not self.offset <= index < self.offset + self.rows:
+            self.offset = index - self.rows + 1
+        self.refresh()
+        self.tree.selection_set(str(self._slots.index(alarm_id)))
+    
+    def _row(self, alarm):
+        if not alarm.rule.repeats:
+            return (self.format_time(alarm.time_ms), alarm.description, self.STATUS[alarm.fired])
+        status = alarm.rule.describe()
+        if alarm.fire_count:
+            status += f" (сработал {alarm.fire_count})"
+        return (self.format_time(alarm.time_ms), alarm.description, status)
+    
+    def refresh(self):
+        """Rewrite the visible window: only slots whose values changed reach Tk"""
+        selected = self.selected_id()
+        self.offset = max(0, min(self.offset, len(self.store) - self.rows))
+        alarms = self.store.window(self.offset, self.rows)
+        self.store.take_dirty()
+        self._version = self.store.version
+        
+        for i, alarm in enumerate(alarms):
+            values = self._row(alarm)
+            if i >= len(self._values):
+                self.tree.insert("", "end", iid=str(i), values=values)
+                self._values.append(values)
+            elif self._values[i] != values:
+                self.tree.item(str(i), values=values)
+                self._values[i] = values
+        for i in range(len(alarms), len(self._values)):
+            self.tree.delete(str(i))
+        del self._values[len(alarms):]
+        self._slots = [alarm.id for alarm in alarms]
+        
+        # Keep the selection on the same alarm, not on the same row slot
+        self.tree.selection_set(str(self._slots.index(selected)) if selected in self._slots else ())
+        total = len(self.store)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+    
+    def update_status(self):
+        """Apply status changes of alarms in the visible window only"""
+        if self._version != self.store.version:
+            self.refresh()
+            return
+        dirty = self.store.take_dirty()
+        if not dirty:
+            return
+        for i, alarm_id in enumerate(self._slots):
+            if alarm_id in dirty:
+                values = self._row(self.store.get(alarm_id))
+                self.tree.item(str(i), values=values)
+                self._values[i] = values
+    
+    def selected_id(self):
+        selected = self.tree.selection()
+        if selected and int(selected[0]) < len(self._slots):
+            return self._slots[int(selected[0])]
+        return None
+    
+    def step_selection(self, step):
+        selected = self.selected_id()
+        if selected is None:
+            return None
+        index = self.store.index(selected) + step
+        if 0 <= index < len(self.store):
+            self.show(self.store.window(index, 1)[0].id)
+        return "break"
+
 class StayOutTimerApp:
-    def __init__(self, root):
+    def __init__(self, root, source=None):
+        # source: real-time source for the game clock ("monotonic", "wall" or a ManualClock)
         self.root = root
         self.root.title("Таймер Stay Out v1.0.0 - Harper_IDS")
         self.root.geometry("700x600")
         self.root.resizable(True, True)
         
-        # Default settings
-        self.settings = {
-            "game_tick_duration": 6870,  # Default speed from original code
-            "real_time_tick": 1000,
-            "background_color": "#2c2c2c",
-            "text_color": "#ffffff",
-            "accent_color": "#ff6b35",
-            "alarm_sound_enabled": True,
-            "volume_level": 100,
-            "theme": "stalker",
-            "auto_save_on_exit": True,
-            "show_real_time": True
-        }
-        self.load_settings()
+        # Default settings (typed schema: the default speed 6870 ms comes from the original code)
+        self.settings = schema.defaults(schema.APP_SETTINGS)
         
-        # Timer variables
-        self.start_time = 0
-        self.is_running = False
-        self.is_paused = False
-        self.paused_time = 0
-        self.elapsed_at_pause = 0
+        # One SQLite store for settings, the clock anchor, alarms and history, read once at startup;
+        # writes go through a background thread, merged per record (no disk I/O on the Tk thread)
+        self.persist = persist.WriteBehind()
+        self.store = StateStore()
+        self.state = self.store.scope("app", writer=self.persist)
+        self.load_settings()
         
-        # Alarms and timers
-        self.alarms = []
-        self.timers = []
+        # Game clock (start/pause/stop state and the game time itself)
+        self.clock = GameClock(self.settings["game_tick_duration"], self.settings["real_time_tick"],
+                               source=source)
+        
+        # Clock anchor checkpoints: after a crash a running timer resumes at the time it would be now
+        self.journal = ClockJournal(self.clock, store=self.state)
+        self.journal.restore()
+        
+        # Run segments (start to pause/stop, one speed each) for the history tab; appended as the clock changes
+        self.session_log = sessions.SessionLog(self.clock, store=self.state)
+        self._history_busy = False
+        
+        # Named clocks of other servers and characters: array-backed, redrawn by the same scheduler
+        self.board = ClockBoard(self.clock.source, DISPLAY_RESOLUTIONS.get(self.settings["display_resolution"], 1000),
+                                store=self.state)
+        self.board.restore(self.state.load_named_clocks())
+        
+        # "When will game time reach HH:MM:SS" answers, cached per clock segment
+        self.planner = OccurrencePlanner(self.clock)
+        self._plan_rows = {}
+        
+        # Pending slider speed change (applied once the drag settles)
+        self._speed_after_id = None
+        self._speed_changed_at = 0.0
+        
+        # Alarms (records keyed by id) and countdown timers (game and real duration, on timing wheels)
+        self.alarms = AlarmStore()
+        self.timers = CountdownTimers(self.clock)
+        # Pending alarms keyed by id in a heap of absolute game deadlines
+        self.alarm_engine = AlarmEngine(self.clock)
+        # Alarms of the previous session keep their ids; fired one-shot alarms stay disarmed
+        restored = self.alarms.restore(self.state.alarms)
+        self.alarm_engine.add_many((alarm.id, alarm.rule) for alarm in restored
+                                   if alarm.rule.repeats or not alarm.fired)
+        
+        # Background threads (audio, file watcher, workers, control socket) never call Tk:
+        # they post to this queue, drained by a poll on the Tk thread
+        self.tk_calls = CallQueue(self.root.after, self.root.after_cancel).start()
+        
+        # Alarm sounds play on a background thread (platform backend loaded on first use)
+        # and are synthesized ahead of the first alarm; playback errors become toasts
+        self.audio = audio.AudioEngine(
+            on_error=lambda message: self.tk_calls.post(self.notifier.post, "Звук", message))
+        self.audio.prepare(self.settings["volume_level"])
+        
+        # Non-modal alarm notifications (alarms of one tick merge into one toast)
+        self.toast = None
+        self.notifier = Notifier(self.root.after, self.root.after_cancel, self.show_toast, self.hide_toast,
+                                 TOAST_DISPLAY_MS, TOAST_INTERVAL_MS)
+        
+        # Label texts go to Tk only when they actually change
+        self.render = RenderLayer()
         
         # Create UI
         self.create_widgets()
         
-        # Start timer update loop
-        self.update_timer()
+        # Redraw exactly when the displayed game time (or the real-time clock) changes
+        self.scheduler = TickScheduler(self.clock, self.root.after, self.root.after_cancel, self.update_timer,
+                                       DISPLAY_RESOLUTIONS.get(self.settings["display_resolution"], 1000),
+                                       background=self.check_due)
+        self._next_wall_second = wall_second_source(self.clock)
+        self.scheduler.add_source(self.next_real_time_change)
+        self.scheduler.add_source(self.next_countdown_change)
+        self.scheduler.add_source(self.next_board_change)
+        # Alarm and timer deadlines wake the app even at minute resolution or while minimized
+        self.scheduler.add_source(self.alarm_engine.next_real, essential=True)
+        self.scheduler.add_source(self.timers.next_expiry, essential=True)
+        self.scheduler.poke()
+        
+        # No redraws while the window is minimized; resume from the clock state on Map
+        self.root.bind("<Unmap>", self.on_window_unmap)
+        self.root.bind("<Map>", self.on_window_map)
+        
+        # Settings changed in the store by another instance or tool are applied live
+        self.settings_watcher = FileWatcher(self.store.files(), self.on_store_changed).start()
+        
+        # Commands of a second launch or a script arrive on the control socket (see listen())
+        self.control = None
         
         # Handle window closing
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -66,6 +300,22 @@ class StayOutTimerApp:
         self.alarms_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.alarms_frame, text="Будильники")
         
+        # Countdown timers tab
+        self.timers_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.timers_frame, text="Таймеры")
+        
+        # Planning tab
+        self.planning_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.planning_frame, text="Планирование")
+        
+        # Named clocks dashboard tab
+        self.board_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.board_frame, text="Часы")
+        
+        # History tab
+        self.history_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.history_frame, text="История")
+        
         # Settings tab
         self.settings_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.settings_frame, text="Настройки")
@@ -80,6 +330,18 @@ class StayOutTimerApp:
         # Alarms widgets
         self.setup_alarms_tab()
         
+        # Countdown timers widgets
+        self.setup_timers_tab()
+        
+        # Planning widgets
+        self.setup_planning_tab()
+        
+        # Dashboard widgets
+        self.setup_board_tab()
+        
+        # History widgets
+        self.setup_history_tab()
+        
         # Settings widgets
         self.setup_settings_tab()
         
@@ -91,7 +353,7 @@ class StayOutTimerApp:
         self.main_frame.configure(style="STALKER.TFrame")
         
         # Timer display
-        timer_frame = ttk.Frame(self.main_frame)
+        timer_frame = self.timer_frame = ttk.Frame(self.main_frame)
         timer_frame.pack(pady=20)
         
         # Game time display
@@ -125,7 +387,7 @@ class StayOutTimerApp:
         self.edit_time_button.pack(side=tk.LEFT, padx=5)
         
         # Status label
-        self.status_label = ttk.Label(self.main_frame, text="Состояние: Остановлен", 
+        self.status_label = ttk.Label(self.main_frame, text=self.status_text(), 
                                       font=("Arial", 12), foreground=self.settings["text_color"])
         self.status_label.pack(pady=10)
         
@@ -158,6 +420,26 @@ class StayOutTimerApp:
         self.alarm_desc_entry = ttk.Entry(add_alarm_frame)
         self.alarm_desc_entry.pack(fill=tk.X, padx=10, pady=5)
         
+        # Alarm repeat rule
+        repeat_frame = ttk.Frame(add_alarm_frame)
+        repeat_frame.pack(fill=tk.X, padx=10, pady=5)
+        ttk.Label(repeat_frame, text="Повтор:").pack(side=tk.LEFT)
+        self.repeat_var = tk.StringVar(value=REPEAT_MODES[0])
+        ttk.Combobox(repeat_frame, textvariable=self.repeat_var, values=REPEAT_MODES, state="readonly", 
+                     width=26).pack(side=tk.LEFT, padx=5)
+        ttk.Label(repeat_frame, text="N мин:").pack(side=tk.LEFT, padx=(10, 0))
+        self.repeat_minutes_var = tk.StringVar(value="60")
+        ttk.Spinbox(repeat_frame, from_=1, to=10080, textvariable=self.repeat_minutes_var, 
+                    width=6).pack(side=tk.LEFT, padx=5)
+        
+        weekdays_frame = ttk.Frame(add_alarm_frame)
+        weekdays_frame.pack(fill=tk.X, padx=10, pady=2)
+        self.weekday_vars = []
+        for name in GAME_WEEKDAYS:
+            var = tk.BooleanVar(value=False)
+            ttk.Checkbutton(weekdays_frame, text=name, variable=var).pack(side=tk.LEFT, padx=2)
+            self.weekday_vars.append(var)
+        
         # Add alarm button
         ttk.Button(add_alarm_frame, text="Добавить будильник", command=self.add_alarm).pack(pady=10)
         
@@ -165,28 +447,254 @@ class StayOutTimerApp:
         alarms_list_frame = ttk.LabelFrame(self.alarms_frame, text="Список будильников")
         alarms_list_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
         
-        # Create treeview for alarms
-        self.alarms_tree = ttk.Treeview(alarms_list_frame, columns=("time", "desc", "status"), show="headings")
-        self.alarms_tree.heading("time", text="Время")
-        self.alarms_tree.heading("desc", text="Описание")
-        self.alarms_tree.heading("status", text="Статус")
-        self.alarms_tree.column("time", width=100)
-        self.alarms_tree.column("desc", width=200)
-        self.alarms_tree.column("status", width=100)
+        # Buttons for alarms (packed first so the list takes the remaining space)
+        alarm_buttons_frame = ttk.Frame(alarms_list_frame)
+        alarm_buttons_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=5)
         
-        # Scrollbar for alarms list
-        scrollbar = ttk.Scrollbar(alarms_list_frame, orient=tk.VERTICAL, command=self.alarms_tree.yview)
-        self.alarms_tree.configure(yscrollcommand=scrollbar.set)
+        ttk.Button(alarm_buttons_frame, text="Удалить", command=self.delete_alarm).pack(side=tk.LEFT, padx=5)
+        ttk.Button(alarm_buttons_frame, text="Сбросить все", command=self.clear_alarms).pack(side=tk.LEFT, padx=5)
+        ttk.Button(alarm_buttons_frame, text="Экспорт...", command=self.export_alarms).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(alarm_buttons_frame, text="Импорт...", command=self.import_alarms).pack(side=tk.RIGHT, padx=5)
+        
+        # Virtualized treeview for alarms: only the visible rows exist as Tk items
+        self.alarm_list = AlarmListView(alarms_list_frame, self.alarms, self.format_time)
+        self.alarms_tree = self.alarm_list.tree
+    
+    def setup_timers_tab(self):
+        # Configure frame for STALKER theme
+        self.timers_frame.configure(style="STALKER.TFrame")
+        
+        # Title
+        title_label = ttk.Label(self.timers_frame, text="Таймеры обратного отсчета", 
+                               font=("Arial", 16, "bold"), foreground=self.settings["text_color"])
+        title_label.pack(pady=10)
         
-        self.alarms_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # Add timer frame
+        add_timer_frame = ttk.LabelFrame(self.timers_frame, text="Новый таймер")
+        add_timer_frame.pack(fill=tk.X, padx=20, pady=10)
+        
+        ttk.Label(add_timer_frame, text="Длительность (ЧЧ:ММ:СС):").pack(anchor=tk.W, padx=10, pady=5)
+        self.countdown_duration_entry = ttk.Entry(add_timer_frame)
+        self.countdown_duration_entry.pack(fill=tk.X, padx=10, pady=5)
+        
+        kind_frame = ttk.Frame(add_timer_frame)
+        kind_frame.pack(fill=tk.X, padx=10, pady=5)
+        ttk.Label(kind_frame, text="Время:").pack(side=tk.LEFT)
+        self.countdown_kind_var = tk.StringVar(value="game")
+        for value, text in COUNTDOWN_KINDS.items():
+            ttk.Radiobutton(kind_frame, text=text, variable=self.countdown_kind_var, 
+                            value=value).pack(side=tk.LEFT, padx=10)
+        
+        ttk.Label(add_timer_frame, text="Описание:").pack(anchor=tk.W, padx=10, pady=5)
+        self.countdown_desc_entry = ttk.Entry(add_timer_frame)
+        self.countdown_desc_entry.pack(fill=tk.X, padx=10, pady=5)
+        
+        ttk.Button(add_timer_frame, text="Запустить таймер", command=self.add_countdown).pack(pady=10)
+        
+        # Running timers list
+        timers_list_frame = ttk.LabelFrame(self.timers_frame, text="Идущие таймеры")
+        timers_list_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        
+        timer_buttons_frame = ttk.Frame(timers_list_frame)
+        timer_buttons_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=5)
+        ttk.Button(timer_buttons_frame, text="Отменить", command=self.cancel_countdown).pack(side=tk.LEFT, padx=5)
+        ttk.Button(timer_buttons_frame, text="Отменить все", command=self.clear_countdowns).pack(side=tk.LEFT, padx=5)
+        
+        self.countdown_tree = ttk.Treeview(timers_list_frame, columns=("desc", "kind", "remaining"), 
+                                           show="headings")
+        self.countdown_tree.heading("desc", text="Описание")
+        self.countdown_tree.heading("kind", text="Время")
+        self.countdown_tree.heading("remaining", text="Осталось")
+        self.countdown_tree.column("desc", width=200)
+        self.countdown_tree.column("kind", width=100)
+        self.countdown_tree.column("remaining", width=100)
+        
+        scrollbar = ttk.Scrollbar(timers_list_frame, orient=tk.VERTICAL, command=self.countdown_tree.yview)
+        self.countdown_tree.configure(yscrollcommand=scrollbar.set)
+        self.countdown_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # Buttons for alarms
-        alarm_buttons_frame = ttk.Frame(alarms_list_frame)
-        alarm_buttons_frame.pack(fill=tk.X, pady=5)
+        # Remaining times are redrawn only while this tab is visible
+        self.notebook.bind("<<NotebookTabChanged>>", lambda event: self.scheduler.poke())
+    
+    def setup_planning_tab(self):
+        # Configure frame for STALKER theme
+        self.planning_frame.configure(style="STALKER.TFrame")
         
-        ttk.Button(alarm_buttons_frame, text="Удалить", command=self.delete_alarm).pack(side=tk.LEFT, padx=5)
-        ttk.Button(alarm_buttons_frame, text="Сбросить все", command=self.clear_alarms).pack(side=tk.LEFT, padx=5)
+        # Title
+        title_label = ttk.Label(self.planning_frame, text="Когда наступит игровое время", 
+                               font=("Arial", 16, "bold"), foreground=self.settings["text_color"])
+        title_label.pack(pady=10)
+        
+        # Add target frame
+        add_target_frame = ttk.LabelFrame(self.planning_frame, text="Добавить игровое время")
+        add_target_frame.pack(fill=tk.X, padx=20, pady=10)
+        
+        ttk.Label(add_target_frame, text="Игровое время (ЧЧ:ММ:СС):").pack(anchor=tk.W, padx=10, pady=5)
+        self.plan_time_entry = ttk.Entry(add_target_frame)
+        self.plan_time_entry.pack(fill=tk.X, padx=10, pady=5)
+        
+        ttk.Label(add_target_frame, text="Сколько ближайших наступлений показывать:").pack(anchor=tk.W, padx=10, pady=5)
+        self.plan_count_var = tk.IntVar(value=3)
+        ttk.Spinbox(add_target_frame, from_=1, to=10, textvariable=self.plan_count_var, 
+                    width=5).pack(anchor=tk.W, padx=10, pady=5)
+        
+        ttk.Button(add_target_frame, text="Добавить", command=self.add_plan_target).pack(pady=10)
+        
+        # Targets list
+        plan_list_frame = ttk.LabelFrame(self.planning_frame, text="Реальное время наступления")
+        plan_list_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        
+        self.plan_tree = ttk.Treeview(plan_list_frame, columns=("time", "next"), show="headings")
+        self.plan_tree.heading("time", text="Игровое время")
+        self.plan_tree.heading("next", text="Ближайшие наступления")
+        self.plan_tree.column("time", width=100)
+        self.plan_tree.column("next", width=400)
+        
+        scrollbar = ttk.Scrollbar(plan_list_frame, orient=tk.VERTICAL, command=self.plan_tree.yview)
+        self.plan_tree.configure(yscrollcommand=scrollbar.set)
+        
+        self.plan_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        plan_buttons_frame = ttk.Frame(plan_list_frame)
+        plan_buttons_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Button(plan_buttons_frame, text="Удалить", command=self.delete_plan_target).pack(side=tk.LEFT, padx=5)
+        
+        # Forecast export
+        forecast_frame = ttk.LabelFrame(self.planning_frame, text="Прогноз игрового времени")
+        forecast_frame.pack(fill=tk.X, padx=20, pady=10)
+        
+        ttk.Label(forecast_frame, text="Период:").pack(side=tk.LEFT, padx=5, pady=5)
+        self.forecast_hours_var = tk.StringVar(value="24 часа")
+        ttk.Combobox(forecast_frame, textvariable=self.forecast_hours_var, values=["24 часа", "168 часов"], 
+                     state="readonly", width=10).pack(side=tk.LEFT, padx=5, pady=5)
+        
+        ttk.Label(forecast_frame, text="Шаг:").pack(side=tk.LEFT, padx=5, pady=5)
+        self.forecast_step_var = tk.StringVar(value="минута")
+        ttk.Combobox(forecast_frame, textvariable=self.forecast_step_var, values=["минута", "секунда"], 
+                     state="readonly", width=10).pack(side=tk.LEFT, padx=5, pady=5)
+        
+        ttk.Button(forecast_frame, text="Экспорт (CSV/JSON)", 
+                   command=self.export_forecast).pack(side=tk.LEFT, padx=10, pady=5)
+    
+    def setup_board_tab(self):
+        # Configure frame for STALKER theme
+        self.board_frame.configure(style="STALKER.TFrame")
+        
+        # Title
+        title_label = ttk.Label(self.board_frame, text="Часы серверов и персонажей", 
+                               font=("Arial", 16, "bold"), foreground=self.settings["text_color"])
+        title_label.pack(pady=10)
+        
+        # Add clock frame
+        add_clock_frame = ttk.LabelFrame(self.board_frame, text="Новые часы")
+        add_clock_frame.pack(fill=tk.X, padx=20, pady=10)
+        
+        fields_frame = ttk.Frame(add_clock_frame)
+        fields_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        ttk.Label(fields_frame, text="Название:").pack(side=tk.LEFT)
+        self.board_name_entry = ttk.Entry(fields_frame, width=20)
+        self.board_name_entry.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(fields_frame, text="Время (ЧЧ:ММ:СС):").pack(side=tk.LEFT, padx=(10, 0))
+        self.board_time_entry = ttk.Entry(fields_frame, width=10)
+        self.board_time_entry.insert(0, "00:00:00")
+        self.board_time_entry.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(fields_frame, text="Скорость (мс):").pack(side=tk.LEFT, padx=(10, 0))
+        self.board_speed_var = tk.IntVar(value=self.settings["game_tick_duration"])
+        ttk.Spinbox(fields_frame, from_=100, to=10000, textvariable=self.board_speed_var, 
+                    width=7).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(add_clock_frame, text="Добавить", command=self.add_board_clock).pack(pady=5)
+        
+        # Clocks list
+        board_list_frame = ttk.LabelFrame(self.board_frame, text="Часы")
+        board_list_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        
+        board_buttons_frame = ttk.Frame(board_list_frame)
+        board_buttons_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=5)
+        for text, command in (("Старт", self.start_board_clocks), ("Пауза", self.pause_board_clocks),
+                              ("Стоп", self.stop_board_clocks), ("Изменить время", self.edit_board_time),
+                              ("Скорость", self.edit_board_speed), ("Удалить", self.delete_board_clocks)):
+            ttk.Button(board_buttons_frame, text=text, command=command).pack(side=tk.LEFT, padx=2)
+        ttk.Button(board_buttons_frame, text="Пауза всех", 
+                   command=self.pause_all_board_clocks).pack(side=tk.RIGHT, padx=2)
+        ttk.Button(board_buttons_frame, text="Старт всех", 
+                   command=self.start_all_board_clocks).pack(side=tk.RIGHT, padx=2)
+        
+        self.board_tree = ttk.Treeview(board_list_frame, columns=("name", "time", "speed", "state"), 
+                                       show="headings")
+        self.board_tree.heading("name", text="Название")
+        self.board_tree.heading("time", text="Игровое время")
+        self.board_tree.heading("speed", text="Скорость, мс")
+        self.board_tree.heading("state", text="Состояние")
+        self.board_tree.column("name", width=200)
+        self.board_tree.column("time", width=100)
+        self.board_tree.column("speed", width=100)
+        self.board_tree.column("state", width=100)
+        
+        scrollbar = ttk.Scrollbar(board_list_frame, orient=tk.VERTICAL, command=self.board_tree.yview)
+        self.board_tree.configure(yscrollcommand=scrollbar.set)
+        
+        self.board_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        for clock_id in self.board.order():
+            self.board_tree.insert("", "end", iid=str(clock_id), values=self.board_row(clock_id))
+    
+    def setup_history_tab(self):
+        # Configure frame for STALKER theme
+        self.history_frame.configure(style="STALKER.TFrame")
+        
+        # Title
+        title_label = ttk.Label(self.history_frame, text="История игры", 
+                               font=("Arial", 16, "bold"), foreground=self.settings["text_color"])
+        title_label.pack(pady=10)
+        
+        # Summary
+        summary_frame = ttk.LabelFrame(self.history_frame, text="Сводка")
+        summary_frame.pack(fill=tk.X, padx=20, pady=10)
+        
+        self.history_week_label = ttk.Label(summary_frame, text="")
+        self.history_week_label.pack(anchor=tk.W, padx=10, pady=2)
+        self.history_longest_label = ttk.Label(summary_frame, text="")
+        self.history_longest_label.pack(anchor=tk.W, padx=10, pady=2)
+        self.history_total_label = ttk.Label(summary_frame, text="")
+        self.history_total_label.pack(anchor=tk.W, padx=10, pady=2)
+        
+        # Per-day table
+        daily_frame = ttk.LabelFrame(self.history_frame, text=f"По дням (последние {HISTORY_DAYS})")
+        daily_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        
+        self.history_tree = ttk.Treeview(daily_frame, columns=("date", "hours", "days"), show="headings")
+        self.history_tree.heading("date", text="Дата")
+        self.history_tree.heading("hours", text="Реальных часов")
+        self.history_tree.heading("days", text="Игровых суток")
+        self.history_tree.column("date", width=120)
+        self.history_tree.column("hours", width=120)
+        self.history_tree.column("days", width=120)
+        
+        scrollbar = ttk.Scrollbar(daily_frame, orient=tk.VERTICAL, command=self.history_tree.yview)
+        self.history_tree.configure(yscrollcommand=scrollbar.set)
+        
+        self.history_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        history_buttons_frame = ttk.Frame(self.history_frame)
+        history_buttons_frame.pack(fill=tk.X, padx=20, pady=5)
+        
+        ttk.Button(history_buttons_frame, text="Обновить", command=self.refresh_history).pack(side=tk.LEFT, padx=5)
+        ttk.Button(history_buttons_frame, text="Экспорт по дням (CSV)", 
+                   command=self.export_daily_history).pack(side=tk.LEFT, padx=5)
+        ttk.Button(history_buttons_frame, text="Экспорт сеансов (CSV)", 
+                   command=self.export_sessions).pack(side=tk.LEFT, padx=5)
+        
+        # Recomputed whenever the tab is opened
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed, add="+")
     
     def setup_settings_tab(self):
         # Configure frame for STALKER theme
@@ -323,12 +831,31 @@ class StayOutTimerApp:
                                           variable=self.show_real_time_var, command=self.toggle_real_time)
         real_time_check.pack(anchor=tk.W, padx=10, pady=5)
         
+        # Game time display resolution
+        ttk.Label(advanced_frame, text="Точность отображения игрового времени:").pack(anchor=tk.W, padx=10, pady=5)
+        self.resolution_var = tk.StringVar(value=self.settings["display_resolution"])
+        for text, value in [("Секунды", "seconds"), ("Минуты", "minutes")]:
+            ttk.Radiobutton(advanced_frame, text=text, variable=self.resolution_var, value=value, 
+                            command=self.update_display_resolution).pack(anchor=tk.W, padx=20, pady=2)
+        
         # Auto-save toggle
         self.auto_save_var = tk.BooleanVar(value=self.settings["auto_save_on_exit"])
         auto_save_check = ttk.Checkbutton(advanced_frame, text="Автосохранение настроек при выходе", 
                                           variable=self.auto_save_var, command=self.toggle_auto_save)
         auto_save_check.pack(anchor=tk.W, padx=10, pady=5)
         
+        # Wakeup measurement (idle mode should show zero)
+        measure_frame = ttk.Frame(advanced_frame)
+        measure_frame.pack(fill=tk.X, padx=10, pady=5)
+        ttk.Button(measure_frame, text="Измерить пробуждения (10 с)", 
+                   command=self.measure_wakeups).pack(side=tk.LEFT)
+        self.wakeups_label = ttk.Label(measure_frame, text="")
+        self.wakeups_label.pack(side=tk.LEFT, padx=10)
+        
+        # Tk calls skipped by the render layer (unchanged label texts)
+        self.render_stats_label = ttk.Label(advanced_frame, text="Сэкономлено вызовов Tk: -")
+        self.render_stats_label.pack(anchor=tk.W, padx=10, pady=5)
+        
         # Reset all settings button
         ttk.Button(parent, text="Сбросить все настройки до стандартных", 
                    command=self.reset_settings).pack(pady=10)
@@ -365,14 +892,21 @@ class StayOutTimerApp:
            - Добавьте описание для будильника
            - Будильник сработает когда игровое время достигнет заданного
         
-        3. ВКЛАДКА "НАСТРОЙКИ":
+        3. ВКЛАДКА "ПЛАНИРОВАНИЕ":
+           - Введите игровое время в формате ЧЧ:ММ:СС
+           - Программа покажет, в какое реальное время оно наступит
+           - Учитываются смена суток, пауза и текущая скорость
+           - Прогноз игрового времени на 24 или 168 часов можно
+             сохранить в CSV или JSON для планирования рейдов
+        
+        4. ВКЛАДКА "НАСТРОЙКИ":
            - Регулируйте скорость игрового времени с помощью ползунка
            - Изменяйте цвета интерфейса
            - Настройте звуковые уведомления
            - Выберите тему оформления (STALKER, темная, светлая)
            - Сохраняйте настройки для постоянного использования
         
-        4. ВКЛАДКА "ПОМОЩЬ":
+        5. ВКЛАДКА "ПОМОЩЬ":
            - Здесь вы находитесь сейчас
            - Информация о программе и инструкции
         
@@ -406,35 +940,96 @@ class StayOutTimerApp:
     def update_speed(self, value):
         self.settings["game_tick_duration"] = int(float(value))
         self.speed_label.config(text=f"{int(float(value))} мс")
+        self.persist_settings()
+        
+        # A slider drag fires hundreds of motion events: coalesce them into one clock segment
+        self._speed_changed_at = time.monotonic()
+        if self._speed_after_id is None:
+            self._speed_after_id = self.root.after(SPEED_SETTLE_MS, self._apply_pending_speed)
+    
+    def _apply_pending_speed(self):
+        idle_ms = int((time.monotonic() - self._speed_changed_at) * 1000)
+        if idle_ms < SPEED_SETTLE_MS:
+            # The slider is still moving
+            self._speed_after_id = self.root.after(SPEED_SETTLE_MS - idle_ms, self._apply_pending_speed)
+            return
+        self._speed_after_id = None
+        self.clock.set_speed(self.settings["game_tick_duration"])
+        self.clock_changed()
     
     def reset_speed_to_default(self):
-        self.speed_var.set(6870)
-        self.settings["game_tick_duration"] = 6870
-        self.speed_label.config(text="6870 мс")
+        self.set_game_speed(6870)
+    
+    def set_game_speed(self, speed):
+        self.speed_var.set(speed)
+        self.settings["game_tick_duration"] = speed
+        self.clock.set_speed(speed)
+        self.speed_label.config(text=f"{speed} мс")
+        self.clock_changed()
+        self.persist_settings()
     
     def toggle_sound(self):
         self.settings["alarm_sound_enabled"] = self.sound_var.get()
+        self.persist_settings()
     
     def update_volume(self, value):
         self.settings["volume_level"] = int(float(value))
         self.volume_label.config(text=f"Уровень: {int(float(value))}%")
+        self.audio.prepare(self.settings["volume_level"])
+        self.persist_settings()
     
     def toggle_real_time(self):
         self.settings["show_real_time"] = self.show_real_time_var.get()
         if self.settings["show_real_time"]:
             if not hasattr(self, 'real_time_label'):
-                self.real_time_label = ttk.Label(self.main_frame, text="Реальное время: --:--:--", 
+                self.real_time_label = ttk.Label(self.timer_frame, text="Реальное время: --:--:--", 
                                            font=("Arial", 16), foreground=self.settings["text_color"])
-                self.real_time_label.pack(pady=5)
+            self.real_time_label.pack(pady=5)
         else:
             if hasattr(self, 'real_time_label'):
                 self.real_time_label.pack_forget()
+        # With the label hidden a stopped or paused timer needs no wakeups at all
+        self.scheduler.poke()
+        self.persist_settings()
+    
+    def on_window_unmap(self, event):
+        if event.widget is self.root:
+            self.scheduler.suspend()
+    
+    def on_window_map(self, event):
+        if event.widget is self.root:
+            self.scheduler.resume()
+    
+    def measure_wakeups(self):
+        """Count scheduler wakeups over a fixed window"""
+        start = self.scheduler.wakeups
+        self.wakeups_label.config(text="Измерение...")
+        
+        def report():
+            count = self.scheduler.wakeups - start
+            per_second = count * 1000 / WAKEUP_MEASURE_MS
+            self.wakeups_label.config(text=f"За {WAKEUP_MEASURE_MS // 1000} с: {count} ({per_second:.1f} в секунду)")
+        
+        self.root.after(WAKEUP_MEASURE_MS, report)
+    
+    def update_display_resolution(self):
+        self.settings["display_resolution"] = self.resolution_var.get()
+        self.set_display_resolution(DISPLAY_RESOLUTIONS.get(self.settings["display_resolution"], 1000))
+        self.persist_settings()
     
     def toggle_auto_save(self):
         self.settings["auto_save_on_exit"] = self.auto_save_var.get()
     
-    def save_settings(self):
+    def persist_settings(self, force=False):
+        """Queue the settings for the write-behind thread"""
+        # Live changes are kept only when they would be saved on exit anyway
+        if force or self.settings["auto_save_on_exit"]:
+            self.state.save_settings(self.settings)
+    
+    def collect_settings(self):
+        """Read the settings widgets into self.settings"""
         self.settings["game_tick_duration"] = self.speed_var.get()
+        self.clock.set_speed(self.settings["game_tick_duration"])
         self.settings["background_color"] = self.bg_color_var.get()
         self.settings["text_color"] = self.text_color_var.get()
         self.settings["accent_color"] = self.accent_color_var.get()
@@ -443,39 +1038,31 @@ class StayOutTimerApp:
         self.settings["theme"] = self.theme_var.get()
         self.settings["show_real_time"] = self.show_real_time_var.get()
         self.settings["auto_save_on_exit"] = self.auto_save_var.get()
-        
-        try:
-            with open("settings.json", "w", encoding="utf-8") as f:
-                json.dump(self.settings, f, ensure_ascii=False, indent=4)
-            messagebox.showinfo("Настройки", "Настройки успешно сохранены!")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось сохранить настройки: {str(e)}")
+        self.settings["display_resolution"] = self.resolution_var.get()
+        self.set_display_resolution(DISPLAY_RESOLUTIONS.get(self.settings["display_resolution"], 1000))
+    
+    def save_settings(self):
+        self.collect_settings()
+        self.persist_settings(force=True)
+        self.notifier.post("Настройки", "Настройки успешно сохранены!")
     
     def reset_settings(self):
         # Reset to default settings
-        self.settings = {
-            "game_tick_duration": 6870,
-            "real_time_tick": 1000,
-            "background_color": "#2c2c2c",
-            "text_color": "#ffffff",
-            "accent_color": "#ff6b35",
-            "alarm_sound_enabled": True,
-            "volume_level": 100,
-            "theme": "stalker",
-            "auto_save_on_exit": True,
-            "show_real_time": True
-        }
+        self.settings = schema.defaults(schema.APP_SETTINGS)
         
         # Update UI elements
         self.speed_var.set(6870)
+        self.clock.set_speed(6870)
         self.bg_color_var.set("#2c2c2c")
         self.text_color_var.set("#ffffff")
         self.accent_color_var.set("#ff6b35")
         self.sound_var.set(True)
         self.volume_var.set(100)
+        self.audio.prepare(100)
         self.theme_var.set("stalker")
         self.show_real_time_var.set(True)
         self.auto_save_var.set(True)
+        self.resolution_var.set("seconds")
         
         # Apply changes
         self.root.configure(bg="#2c2c2c")
@@ -483,100 +1070,467 @@ class StayOutTimerApp:
         self.status_label.configure(foreground="#ffffff")
         self.info_label.configure(foreground="#cccccc")
         
-        messagebox.showinfo("Настройки", "Все настройки сброшены до стандартных значений!")
-        self.save_settings()
+        self.set_display_resolution(DISPLAY_RESOLUTIONS["seconds"])
+        self.persist_settings(force=True)
+        self.notifier.post("Настройки", "Все настройки сброшены до стандартных значений!")
     
     def load_settings(self):
-        try:
-            if os.path.exists("settings.json"):
-                with open("settings.json", "r", encoding="utf-8") as f:
-                    loaded_settings = json.load(f)
-                    self.settings.update(loaded_settings)
-                    
-                # Apply loaded settings
-                self.root.configure(bg=self.settings["background_color"])
-        except Exception as e:
-            print(f"Не удалось загрузить настройки: {str(e)}")
+        # Already read from the store together with the clock anchor and the alarms
+        if self.state.settings:
+            loaded, errors = schema.validate(schema.APP_SETTINGS, self.state.settings)
+            for key, message in errors:
+                print(f"Настройка {key} пропущена: {message}")
+            self.settings.update(loaded)
+            
+            # Apply loaded settings
+            self.root.configure(bg=self.settings["background_color"])
+    
+    def on_store_changed(self):
+        """Watcher thread: read and validate external settings changes, hand them to the Tk thread"""
+        changed, errors = schema.validate(schema.APP_SETTINGS, self.state.external_settings())
+        for key, message in errors:
+            print(f"Настройка {key} пропущена: {message}")
+        if changed:
+            self.tk_calls.post(self.apply_external_settings, changed)
+    
+    def apply_external_settings(self, changed):
+        """Apply only the changed keys to the live clock, widgets and theme"""
+        changed = {key: value for key, value in changed.items() if self.settings.get(key) != value}
+        if not changed:
+            return
+        self.settings.update(changed)
+        
+        if "game_tick_duration" in changed or "real_time_tick" in changed:
+            self.clock.set_speed(self.settings["game_tick_duration"], self.settings["real_time_tick"])
+            self.speed_var.set(self.settings["game_tick_duration"])
+            self.speed_label.config(text=f"{self.settings['game_tick_duration']} мс")
+        if "background_color" in changed:
+            self.bg_color_var.set(changed["background_color"])
+            self.root.configure(bg=changed["background_color"])
+        if "text_color" in changed:
+            self.text_color_var.set(changed["text_color"])
+            for label in (self.game_timer_label, self.status_label, getattr(self, "real_time_label", None)):
+                if label is not None:
+                    label.configure(foreground=changed["text_color"])
+        if "accent_color" in changed:
+            self.accent_color_var.set(changed["accent_color"])
+        if "alarm_sound_enabled" in changed:
+            self.sound_var.set(changed["alarm_sound_enabled"])
+        if "volume_level" in changed:
+            self.volume_var.set(changed["volume_level"])
+            self.volume_label.config(text=f"Уровень: {changed['volume_level']}%")
+            self.audio.prepare(changed["volume_level"])
+        if "theme" in changed:
+            self.theme_var.set(changed["theme"])
+        if "auto_save_on_exit" in changed:
+            self.auto_save_var.set(changed["auto_save_on_exit"])
+        if "display_resolution" in changed:
+            self.resolution_var.set(changed["display_resolution"])
+            self.set_display_resolution(DISPLAY_RESOLUTIONS.get(changed["display_resolution"], 1000))
+        if "show_real_time" in changed:
+            self.show_real_time_var.set(changed["show_real_time"])
+            self.toggle_real_time()
+        
+        self.clock_changed()
+        self.notifier.post("Настройки", "Настройки изменены извне: " + ", ".join(sorted(changed)))
     
     def format_time(self, elapsed_time_ms):
         """Format time in milliseconds to HH:MM:SS format"""
-        total_seconds = int(elapsed_time_ms // 1000)
-        hours = (total_seconds // 3600) % 24
-        minutes = (total_seconds % 3600) // 60
-        seconds = total_seconds % 60
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        return format_time(elapsed_time_ms)
+    
+    def format_display_time(self, game_ms):
+        """Format game time at the selected display resolution"""
+        text = self.format_time(game_ms)
+        return text[:5] if self.settings["display_resolution"] == "minutes" else text
+    
+    def next_real_time_change(self):
+        """Real instant of the next real-time label change (None when the label is hidden)"""
+        if self.settings["show_real_time"]:
+            return self._next_wall_second()
+        return None
     
     def update_timer(self):
+        # Called by the scheduler whenever a displayed value changes
         # Update real time display if enabled
+        # Only texts that differ from the last rendered ones reach Tk, in one pass per frame
+        render = self.render
         if hasattr(self, 'real_time_label') and self.settings["show_real_time"]:
-            current_real_time = datetime.now().strftime("%H:%M:%S")
-            self.real_time_label.config(text=f"Реальное время: {current_real_time}")
+            now = time.localtime()
+            current_real_time = day_strings()[now.tm_hour * 3600 + now.tm_min * 60 + now.tm_sec]
+            render.set(self.real_time_label, f"Реальное время: {current_real_time}")
+        
+        total_game_time = self.clock.now_ms()
+        render.set(self.game_timer_label, f"Время игры: {self.format_display_time(total_game_time)}")
+        render.set(self.render_stats_label, f"Сэкономлено вызовов Tk: {render.saved_per_minute()} в минуту")
+        
+        self.check_countdowns()
+        if self.countdowns_visible():
+            for countdown in self.timers:
+                render.set_cell(self.countdown_tree, str(countdown.id), "remaining", 
+                                self.format_remaining(self.timers.remaining_ms(countdown)))
+        if self.board_visible():
+            for clock_id in self.board.due():
+                render.set_cell(self.board_tree, str(clock_id), "time", 
+                                self.format_display_time(self.board.now_ms(clock_id)))
+        render.flush()
+        
+        self.check_alarms()
+        self.refresh_plan()
+        self.record_clock()
+    
+    def check_due(self):
+        """Alarms and timers while the window is hidden (no redraw)"""
+        self.check_alarms()
+        self.check_countdowns()
+        self.record_clock()
+    
+    def record_clock(self):
+        """Checkpoint and session segment of the clock; both are written only when the clock actually changed"""
+        self.journal.record()
+        self.session_log.record()
+    
+    def clock_changed(self):
+        """After a start, pause, set or speed change: record it now, even while minimized
+        (the scheduler does not render then), and redraw"""
+        self.record_clock()
+        self.scheduler.poke()
+    
+    def check_alarms(self):
+        """Fire every alarm whose game deadline was crossed since the last check"""
+        fired = self.alarm_engine.poll()
+        for alarm_id in fired:
+            alarm = self.alarms.get(alarm_id)
+            if alarm is not None:
+                self.alarms.mark_fired(alarm_id)
+                self.state.save_alarm(alarm)
+                self.state.add_history("alarm", self.clock.now_ms(), alarm.description)
+                self.trigger_alarm(alarm)
+        if fired:
+            self.alarm_list.update_status()
+    
+    def board_visible(self):
+        return len(self.board) > 0 and self.notebook.select() == str(self.board_frame)
+    
+    def next_board_change(self):
+        """Real instant of the next dashboard redraw: one deadline for all clocks (None unless shown)"""
+        if self.board_visible():
+            return self.board.next_change()
+        return None
+    
+    def board_row(self, clock_id):
+        tick, _, running, paused = self.board.state(clock_id)
+        return (self.board.name(clock_id), self.format_display_time(self.board.now_ms(clock_id)), tick, 
+                BOARD_STATES[running, paused])
+    
+    def selected_board_clocks(self):
+        return [int(iid) for iid in self.board_tree.selection()]
+    
+    def board_changed(self, clock_ids):
+        """Redraw the changed rows' speed and state; their times follow on the next redraw"""
+        for clock_id in clock_ids:
+            tick, _, running, paused = self.board.state(clock_id)
+            self.board_tree.set(str(clock_id), "speed", tick)
+            self.board_tree.set(str(clock_id), "state", BOARD_STATES[running, paused])
+        self.scheduler.poke()
+    
+    def add_board_clock(self):
+        name = self.board_name_entry.get().strip() or f"Часы {len(self.board) + 1}"
+        try:
+            game_ms = parse_time(self.board_time_entry.get())
+            tick = int(self.board_speed_var.get())
+        except (ValueError, tk.TclError):
+            messagebox.showerror("Ошибка", "Некорректное время или скорость. Время - ЧЧ:ММ:СС, скорость - мс.")
+            return
+        if not 100 <= tick <= 10000:
+            messagebox.showerror("Ошибка", "Скорость должна быть от 100 до 10000 мс")
+            return
         
-        if self.is_running and not self.is_paused:
-            # Calculate current game time
-            real_elapsed = (time.time() * 1000 - self.start_time)  # in ms
-            game_time_ms = real_elapsed * self.settings["game_tick_duration"] / self.settings["real_time_tick"]
-            
-            # Add any time that was accumulated while paused
-            total_game_time = game_time_ms + self.elapsed_at_pause
-            
-            self.game_timer_label.config(text=f"Время игры: {self.format_time(total_game_time)}")
+        clock_id = self.board.add(name, game_ms, tick, self.settings["real_time_tick"])
+        self.board_tree.insert("", "end", iid=str(clock_id), values=self.board_row(clock_id))
+        self.board_name_entry.delete(0, tk.END)
+        self.scheduler.poke()
+    
+    def start_board_clocks(self):
+        self.board_changed([clock_id for clock_id in self.selected_board_clocks() if self.board.start(clock_id)])
+    
+    def pause_board_clocks(self):
+        self.board_changed([clock_id for clock_id in self.selected_board_clocks() if self.board.pause(clock_id)])
+    
+    def stop_board_clocks(self):
+        self.board_changed([clock_id for clock_id in self.selected_board_clocks() if self.board.stop(clock_id)])
+    
+    def start_all_board_clocks(self):
+        self.board_changed(self.board.start_all())
+    
+    def pause_all_board_clocks(self):
+        self.board_changed(self.board.pause_all())
+    
+    def edit_board_time(self):
+        clock_ids = self.selected_board_clocks()
+        if not clock_ids:
+            return
+        time_str = simpledialog.askstring("Изменить время", "Введите время в формате ЧЧ:ММ:СС:")
+        if not time_str:
+            return
+        try:
+            game_ms = parse_time(time_str)
+        except ValueError:
+            messagebox.showerror("Ошибка", "Некорректный формат времени. Используйте ЧЧ:ММ:СС в 24-часовом формате.")
+            return
+        for clock_id in clock_ids:
+            self.board.set_ms(clock_id, game_ms)
+        self.board_changed(clock_ids)
+    
+    def edit_board_speed(self):
+        clock_ids = self.selected_board_clocks()
+        if not clock_ids:
+            return
+        tick = simpledialog.askinteger("Скорость", "Мс игрового времени за секунду (100-10000):", 
+                                       initialvalue=self.board.state(clock_ids[0])[0], 
+                                       minvalue=100, maxvalue=10000)
+        if tick is None:
+            return
+        for clock_id in clock_ids:
+            self.board.set_speed(clock_id, tick)
+        self.board_changed(clock_ids)
+    
+    def delete_board_clocks(self):
+        for clock_id in self.selected_board_clocks():
+            self.board.remove(clock_id)
+            self.board_tree.delete(str(clock_id))
+            self.render.invalidate((self.board_tree, str(clock_id), "time"))
+        self.scheduler.poke()
+    
+    def set_display_resolution(self, resolution_ms):
+        """Display resolution of the main clock and of the dashboard clocks"""
+        self.board.resolution_ms = resolution_ms
+        self.scheduler.resolution_ms = resolution_ms
+    
+    def countdowns_visible(self):
+        return len(self.timers) > 0 and self.notebook.select() == str(self.timers_frame)
+    
+    def next_countdown_change(self):
+        """Real instant the displayed remaining times change (None unless the timers tab is shown)"""
+        if self.countdowns_visible():
+            return self.timers.next_change()
+        return None
+    
+    def format_remaining(self, remaining_ms):
+        # Whole seconds rounded up: a timer shows 00:00:01 until it expires
+        return self.format_time(-(-remaining_ms // 1000) * 1000)
+    
+    def check_countdowns(self):
+        """Fire the countdown timers that expired since the last check"""
+        for countdown in self.timers.poll():
+            self._remove_countdown_row(countdown.id)
+            self.state.add_history("countdown", self.clock.now_ms(), countdown.label)
+            self.trigger_countdown(countdown)
+    
+    def _remove_countdown_row(self, countdown_id):
+        iid = str(countdown_id)
+        if self.countdown_tree.exists(iid):
+            self.countdown_tree.delete(iid)
+        self.render.invalidate((self.countdown_tree, iid, "remaining"))
+    
+    def add_countdown(self):
+        try:
+            duration_ms = parse_time(self.countdown_duration_entry.get())
+        except ValueError:
+            messagebox.showerror("Ошибка", "Некорректная длительность. Используйте ЧЧ:ММ:СС.")
+            return
+        if duration_ms <= 0:
+            messagebox.showerror("Ошибка", "Длительность должна быть больше нуля")
+            return
+        
+        kind = self.countdown_kind_var.get()
+        countdown = self.timers.add(kind, duration_ms, self.countdown_desc_entry.get() or "Таймер")
+        self.countdown_tree.insert("", "end", iid=str(countdown.id), 
+                                   values=(countdown.label, COUNTDOWN_KINDS[kind], 
+                                           self.format_remaining(self.timers.remaining_ms(countdown))))
+        self.countdown_desc_entry.delete(0, tk.END)
+        self.scheduler.poke()
+    
+    def cancel_countdown(self):
+        for iid in self.countdown_tree.selection():
+            self.timers.cancel(int(iid))
+            self._remove_countdown_row(int(iid))
+        self.scheduler.poke()
+    
+    def clear_countdowns(self):
+        for countdown in list(self.timers):
+            self._remove_countdown_row(countdown.id)
+        self.timers.clear()
+        self.scheduler.poke()
+    
+    def trigger_countdown(self, countdown):
+        if self.settings["alarm_sound_enabled"]:
+            if not self.audio.play("alarm", self.settings["volume_level"]):
+                self.root.bell()
+        self.notifier.post("Таймер", f"{countdown.label} ({self.format_time(countdown.duration_ms)}, "
+                                     f"{COUNTDOWN_KINDS[countdown.kind].lower()})")
+    
+    def refresh_plan(self):
+        """Update the planning rows whose next occurrences changed"""
+        try:
+            count = max(1, min(10, int(self.plan_count_var.get())))
+        except (tk.TclError, ValueError):
+            count = 3
+        
+        for target_ms in self.planner:
+            reals = self.planner.next_occurrences(target_ms, count)
+            cached = self._plan_rows.get(target_ms)
+            if cached is not None and cached is reals:
+                continue
+            self._plan_rows[target_ms] = reals
             
-            # Check for alarms
-            current_game_time_str = self.format_time(total_game_time)
-            for alarm in self.alarms:
-                if alarm["time"] == current_game_time_str and not alarm["fired"]:
-                    self.trigger_alarm(alarm)
-                    alarm["fired"] = True
+            if reals:
+                text = ", ".join(
+                    datetime.fromtimestamp(self.planner.to_wall(real) / 1e9).strftime("%d.%m %H:%M:%S")
+                    for real in reals)
+            else:
+                text = "Таймер не идет"
+            self.plan_tree.item(str(target_ms), values=(self.format_time(target_ms), text))
+    
+    def add_plan_target(self):
+        time_str = self.plan_time_entry.get()
+        try:
+            target_ms = parse_time(time_str)
+        except ValueError:
+            messagebox.showerror("Ошибка", "Некорректный формат времени. Используйте ЧЧ:ММ:СС в 24-часовом формате.")
+            return
+        
+        if not self.plan_tree.exists(str(target_ms)):
+            self.planner.add(target_ms)
+            self.plan_tree.insert("", "end", iid=str(target_ms), values=(self.format_time(target_ms), ""))
+            self.refresh_plan()
+        self.plan_time_entry.delete(0, tk.END)
+    
+    def delete_plan_target(self):
+        for iid in self.plan_tree.selection():
+            self.planner.remove(int(iid))
+            self._plan_rows.pop(int(iid), None)
+            self.plan_tree.delete(iid)
+    
+    def on_tab_changed(self, event):
+        selected = self.notebook.select()
+        if selected == str(self.history_frame):
+            self.refresh_history()
+        elif selected == str(self.board_frame):
+            # Times were not redrawn while the tab was hidden
+            self.board.invalidate()
+            self.scheduler.poke()
+    
+    def run_in_background(self, work, done):
+        """Run work() on a worker thread and hand its result to done() on the Tk thread"""
+        def run():
+            try:
+                result = work()
+            except Exception as e:
+                result = e
+            self.tk_calls.post(done, result)
+        threading.Thread(target=run, name="worker", daemon=True).start()
+    
+    def refresh_history(self):
+        """Aggregate the session log on a worker thread; the copy is taken here, on the Tk thread"""
+        if self._history_busy:
+            return
+        self._history_busy = True
+        columns = self.session_log.snapshot()
+        self.run_in_background(lambda: sessions.summary(columns, HISTORY_DAYS), self.show_history)
+    
+    def show_history(self, result):
+        self._history_busy = False
+        if isinstance(result, Exception):
+            self.history_total_label.config(text=f"Не удалось посчитать историю: {result}")
+            return
+        
+        self.history_week_label.config(text=f"На этой неделе: {result['week_real_ns'] / 3600e9:.1f} ч, "
+                                            f"игровых суток: {result['week_game_days']:.2f}")
+        longest = result["longest"]
+        if longest:
+            start_ns, end_ns, game_ns = longest
+            started = datetime.fromtimestamp(start_ns / 1e9).strftime("%d.%m.%Y %H:%M")
+            self.history_longest_label.config(text=f"Самый длинный сеанс: {started}, "
+                                                   f"{(end_ns - start_ns) / 3600e9:.1f} ч, "
+                                                   f"игровых суток: {game_ns / (DAY_MS * 1e6):.2f}")
+        else:
+            self.history_longest_label.config(text="Самый длинный сеанс: нет")
+        self.history_total_label.config(text=f"Всего: {result['total_real_ns'] / 3600e9:.1f} ч "
+                                             f"({result['segments']} отрезков)")
+        
+        # Newest day first
+        self.history_tree.delete(*self.history_tree.get_children())
+        for day, real_ns, game_ns in reversed(result["daily"]):
+            self.history_tree.insert("", "end", values=(day, f"{real_ns / 3600e9:.2f}", 
+                                                        f"{game_ns / (DAY_MS * 1e6):.3f}"))
+    
+    def export_daily_history(self):
+        path = filedialog.asksaveasfilename(title="Экспорт истории по дням", defaultextension=".csv", 
+                                            filetypes=[("CSV", "*.csv")])
+        if not path:
+            return
+        columns = self.session_log.snapshot()
+        self.run_in_background(
+            lambda: sessions.write_daily_csv(path, sessions.daily(columns, HISTORY_DAYS)),
+            lambda result: self.history_exported(result, "дней"))
+    
+    def export_sessions(self):
+        path = filedialog.asksaveasfilename(title="Экспорт сеансов", defaultextension=".csv", 
+                                            filetypes=[("CSV", "*.csv")])
+        if not path:
+            return
+        columns = self.session_log.snapshot()
+        self.run_in_background(lambda: sessions.write_sessions_csv(path, columns),
+                               lambda result: self.history_exported(result, "отрезков"))
+    
+    def history_exported(self, result, unit):
+        if isinstance(result, Exception):
+            messagebox.showerror("Ошибка", f"Не удалось сохранить историю: {str(result)}")
+        else:
+            self.notifier.post("История", f"История сохранена: {result} {unit}")
+    
+    def export_forecast(self):
+        path = filedialog.asksaveasfilename(title="Экспорт прогноза", defaultextension=".csv", 
+                                            filetypes=[("CSV", "*.csv"), ("JSON", "*.json")])
+        if not path:
+            return
         
-        # Schedule next update
-        self.root.after(1000, self.update_timer)  # Update every second
+        hours = 168 if self.forecast_hours_var.get().startswith("168") else 24
+        step_s = 1 if self.forecast_step_var.get() == "секунда" else 60
+        # A per-second week is ~600k rows: built and written on a worker from a copy of the clock
+        clock = self.clock.copy()
+        self.run_in_background(lambda: batch.write_forecast(path, clock, hours, step_s), self.forecast_exported)
+    
+    def forecast_exported(self, result):
+        if isinstance(result, Exception):
+            messagebox.showerror("Ошибка", f"Не удалось сохранить прогноз: {str(result)}")
+        else:
+            messagebox.showinfo("Прогноз", f"Прогноз сохранен: {result} строк")
+    
+    def status_text(self):
+        if self.clock.active:
+            return "Состояние: Работает"
+        return "Состояние: На паузе" if self.clock.paused else "Состояние: Остановлен"
     
     def start_timer(self):
-        if not self.is_running or self.is_paused:
-            if self.is_paused:
-                # Resume from pause: adjust start_time to account for pause duration
-                pause_duration = time.time() * 1000 - self.paused_time
-                self.start_time += pause_duration * self.settings["game_tick_duration"] / self.settings["real_time_tick"]
-                self.is_paused = False
-            else:
-                # First start or after stop/reset
-                self.start_time = time.time() * 1000 - self.elapsed_at_pause * self.settings["real_time_tick"] / self.settings["game_tick_duration"]
-            
-            self.is_running = True
+        if self.clock.start():
             self.status_label.config(text="Состояние: Работает")
+            self.clock_changed()
     
     def pause_timer(self):
-        if self.is_running and not self.is_paused:
-            self.is_paused = True
-            self.paused_time = time.time() * 1000
-            
-            # Calculate the elapsed game time at the moment of pause
-            real_elapsed = (time.time() * 1000 - self.start_time)
-            game_time_ms = real_elapsed * self.settings["game_tick_duration"] / self.settings["real_time_tick"]
-            self.elapsed_at_pause += game_time_ms
-            
+        if self.clock.pause():
             self.status_label.config(text="Состояние: На паузе")
+            self.clock_changed()
     
     def stop_timer(self):
-        if self.is_running:
-            if not self.is_paused:
-                # Calculate accumulated time before stopping
-                real_elapsed = (time.time() * 1000 - self.start_time)
-                game_time_ms = real_elapsed * self.settings["game_tick_duration"] / self.settings["real_time_tick"]
-                self.elapsed_at_pause += game_time_ms
-            
-            self.is_running = False
-            self.is_paused = False
+        if self.clock.stop():
             self.status_label.config(text="Состояние: Остановлен")
+            self.clock_changed()
     
     def reset_timer(self):
-        self.is_running = False
-        self.is_paused = False
-        self.elapsed_at_pause = 0
-        self.start_time = time.time() * 1000
-        self.game_timer_label.config(text="Время игры: 00:00:00")
+        self.clock.reset()
         self.status_label.config(text="Состояние: Сброшен")
+        self.clock_changed()
     
     def edit_time(self):
         time_str = simpledialog.askstring("Изменить время", 
@@ -585,24 +1539,11 @@ class StayOutTimerApp:
         if time_str:
             try:
                 # Parse the input time
-                parts = time_str.split(':')
-                if len(parts) != 3:
-                    raise ValueError("Неверный формат")
+                total_ms = parse_time(time_str)
                 
-                hours, minutes, seconds = map(int, parts)
-                
-                if not (0 <= hours <= 23 and 0 <= minutes <= 59 and 0 <= seconds <= 59):
-                    raise ValueError("Недопустимые значения")
-                
-                # Convert to total milliseconds
-                total_ms = hours * 3600000 + minutes * 60000 + seconds * 1000
-                
-                # Set the timer to this time
-                self.elapsed_at_pause = total_ms
-                self.start_time = time.time() * 1000
-                
-                # Update display
-                self.game_timer_label.config(text=f"Время игры: {self.format_time(total_ms)}")
+                # Set the timer to this time and redraw right away
+                self.clock.set_ms(total_ms)
+                self.clock_changed()
                 
             except ValueError:
                 messagebox.showerror("Ошибка", "Некорректный формат времени. Используйте ЧЧ:ММ:СС в 24-часовом формате.")
@@ -616,96 +1557,215 @@ class StayOutTimerApp:
             return
         
         try:
-            # Validate time format
-            parts = time_str.split(':')
-            if len(parts) != 3:
-                raise ValueError("Неверный формат")
-            
-            hours, minutes, seconds = map(int, parts)
-            
-            if not (0 <= hours <= 23 and 0 <= minutes <= 59 and 0 <= seconds <= 59):
-                raise ValueError("Недопустимые значения")
-            
-            # Add alarm to list
-            alarm = {
-                "time": time_str,
-                "description": desc or "Будильник",
-                "fired": False
-            }
-            self.alarms.append(alarm)
+            # Validate time format and the repeat rule
+            target_ms = parse_time(time_str)
+            rule = self.selected_recurrence(target_ms)
             
-            # Add to treeview
-            status = "Ожидает" if not alarm["fired"] else "Сработал"
-            self.alarms_tree.insert("", "end", values=(alarm["time"], alarm["description"], status))
-            
-            # Clear input fields
-            self.alarm_time_entry.delete(0, tk.END)
-            self.alarm_desc_entry.delete(0, tk.END)
-            
-        except ValueError:
-            messagebox.showerror("Ошибка", "Некорректный формат времени. Используйте ЧЧ:ММ:СС в 24-часовом формате.")
+        except ValueError as e:
+            messagebox.showerror("Ошибка", f"Некорректный будильник: {str(e)}\n"
+                                 "Время указывается как ЧЧ:ММ:СС в 24-часовом формате.")
+            return
+        
+        # Add alarm to the store and arm it (only its next occurrence enters the heap)
+        alarm = self.alarms.add(target_ms, desc or "Будильник", rule)
+        self.alarm_engine.add(alarm.id, alarm.rule)
+        self.state.save_alarm(alarm)
+        self.scheduler.poke()
+        
+        # Show it in the list
+        self.alarm_list.show(alarm.id)
+        
+        # Clear input fields
+        self.alarm_time_entry.delete(0, tk.END)
+        self.alarm_desc_entry.delete(0, tk.END)
+    
+    def selected_recurrence(self, target_ms):
+        """Repeat rule chosen in the alarms tab (ValueError if incomplete)"""
+        mode = self.repeat_var.get()
+        if mode == REPEAT_MODES[1]:
+            return Recurrence.daily(target_ms)
+        if mode == REPEAT_MODES[2]:
+            return Recurrence.every_minutes(int(self.repeat_minutes_var.get()), target_ms)
+        if mode == REPEAT_MODES[3]:
+            return Recurrence.on_weekdays([day for day, var in enumerate(self.weekday_vars) if var.get()], target_ms)
+        return Recurrence.once(target_ms)
     
     def delete_alarm(self):
-        selected = self.alarms_tree.selection()
-        if selected:
-            # Get the selected item
-            item = self.alarms_tree.item(selected[0])
-            time_val = item['values'][0]
-            
-            # Remove from alarms list
-            for i, alarm in enumerate(self.alarms):
-                if alarm["time"] == time_val:
-                    del self.alarms[i]
-                    break
-            
-            # Remove from treeview
-            self.alarms_tree.delete(selected)
+        # The selected row maps to an alarm id, so alarms sharing a time are told apart
+        alarm_id = self.alarm_list.selected_id()
+        if alarm_id is not None:
+            self.alarms.remove(alarm_id)
+            self.alarm_engine.remove(alarm_id)
+            self.state.delete_alarm(alarm_id)
+            self.alarm_list.refresh()
+            self.scheduler.poke()
     
     def clear_alarms(self):
         if messagebox.askyesno("Подтверждение", "Вы уверены, что хотите удалить все будильники?"):
-            self.alarms = []
-            for item in self.alarms_tree.get_children():
-                self.alarms_tree.delete(item)
+            self.alarms.clear()
+            self.alarm_engine.clear()
+            self.state.clear_alarms()
+            self.alarm_list.refresh()
+            self.scheduler.poke()
+    
+    def import_alarms(self):
+        path = filedialog.askopenfilename(title="Импорт будильников", 
+                                          filetypes=[("CSV", "*.csv"), ("JSON", "*.json"), ("Все файлы", "*.*")])
+        if not path:
+            return
+        
+        try:
+            rows, errors = alarm_io.read_alarms(path)
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось прочитать файл: {str(e)}")
+            return
+        
+        # One batch for the store, the alarm heap and the list instead of one insert per row
+        added = self.alarms.extend(rows)
+        self.alarm_engine.add_many((alarm.id, alarm.rule) for alarm in added)
+        self.state.save_alarms(added)
+        self.alarm_list.refresh()
+        self.scheduler.poke()
+        
+        message = f"Загружено будильников: {len(added)}"
+        if errors:
+            shown = "\n".join(str(error) for error in errors[:10])
+            more = f"\n...и еще {len(errors) - 10}" if len(errors) > 10 else ""
+            message += f"\nПропущено строк с ошибками: {len(errors)}\n\n{shown}{more}"
+            messagebox.showwarning("Импорт", message)
+        else:
+            messagebox.showinfo("Импорт", message)
+    
+    def export_alarms(self):
+        path = filedialog.asksaveasfilename(title="Экспорт будильников", defaultextension=".csv", 
+                                            filetypes=[("CSV", "*.csv"), ("JSON", "*.json")])
+        if not path:
+            return
+        
+        try:
+            count = alarm_io.write_alarms(path, self.alarms)
+            messagebox.showinfo("Экспорт", f"Сохранено будильников: {count}")
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить будильники: {str(e)}")
     
     def trigger_alarm(self, alarm):
         if self.settings["alarm_sound_enabled"]:
-            # Play system beep or sound
-            try:
-                # Try to play a system sound
-                for _ in range(3):  # Play 3 times
-                    winsound.Beep(1000, 500)  # Frequency, duration
-                    time.sleep(0.1)
-            except:
-                # If winsound fails, use tkinter bell
+            # Queued for the audio thread: the tick loop never waits for the sound
+            if not self.audio.play("alarm", self.settings["volume_level"]):
+                # No audio backend on this system, use tkinter bell
                 self.root.bell()
         
-        # Show notification
-        messagebox.showinfo("Будильник", f"Сработал будильник!\nВремя: {alarm['time']}\nОписание: {alarm['description']}")
+        # Non-modal notification: the tick loop keeps running while it is shown
+        self.notifier.post("Будильник", f"{self.format_time(alarm.time_ms)} - {alarm.description}")
+    
+    def show_toast(self, notification):
+        """Show a notification in a borderless window over the bottom-right corner"""
+        if self.toast is None:
+            self.toast = tk.Toplevel(self.root)
+            self.toast.overrideredirect(True)
+            self.toast.attributes("-topmost", True)
+            frame = tk.Frame(self.toast, bg=self.settings["background_color"],
+                             highlightbackground=self.settings["accent_color"], highlightthickness=2)
+            frame.pack(fill=tk.BOTH, expand=True)
+            self.toast_title = tk.Label(frame, font=("Arial", 12, "bold"), bg=self.settings["background_color"],
+                                        fg=self.settings["accent_color"], anchor=tk.W)
+            self.toast_title.pack(fill=tk.X, padx=10, pady=(8, 2))
+            self.toast_text = tk.Label(frame, font=("Arial", 11), justify=tk.LEFT, anchor=tk.W,
+                                       bg=self.settings["background_color"], fg=self.settings["text_color"])
+            self.toast_text.pack(fill=tk.X, padx=10, pady=(0, 8))
+            # Click anywhere on the toast to dismiss it
+            for widget in (frame, self.toast_title, self.toast_text):
+                widget.bind("<Button-1>", lambda event: self.notifier.dismiss())
+        
+        one, several = TOAST_TITLES.get(notification.title, (notification.title, notification.title + ": {}"))
+        title = one if notification.count == 1 else several.format(notification.count)
+        self.toast_title.config(text=title)
+        self.toast_text.config(text=notification.text())
+        self.toast.update_idletasks()
+        x = self.root.winfo_rootx() + self.root.winfo_width() - self.toast.winfo_reqwidth() - 20
+        y = self.root.winfo_rooty() + self.root.winfo_height() - self.toast.winfo_reqheight() - 20
+        self.toast.geometry(f"+{max(x, 0)}+{max(y, 0)}")
+        self.toast.deiconify()
+    
+    def hide_toast(self):
+        if self.toast is not None:
+            self.toast.withdraw()
     
     def test_sound(self):
-        try:
-            # Test the alarm sound
-            winsound.Beep(800, 300)  # Frequency, duration
-            time.sleep(0.1)
-            winsound.Beep(1000, 300)
-            time.sleep(0.1)
-            winsound.Beep(1200, 300)
-        except:
-            # If winsound fails, use tkinter bell
+        # Test the alarm sound at the current volume
+        if not self.audio.play("test", self.settings["volume_level"]):
+            # No audio backend on this system, use tkinter bell
             self.root.bell()
             messagebox.showinfo("Тест", "Звук протестирован (использован системный звонок)")
     
+    def listen(self, listener):
+        """Serve the control socket claimed in main(); commands run on the Tk thread"""
+        self.control = control.ControlServer(listener, self.handle_control,
+                                             dispatch=self.tk_calls.post).start()
+    
+    def handle_control(self, name, value):
+        """A command forwarded by a second launch or sent by a script; returns the clock status"""
+        if name == "show":
+            self.show_window()
+        elif name == "start":
+            self.start_timer()
+        elif name == "pause":
+            self.pause_timer()
+        elif name == "stop":
+            self.stop_timer()
+        elif name == "reset":
+            self.reset_timer()
+        elif name == "set":
+            self.clock.set_ms(value)
+            self.clock_changed()
+        elif name == "speed":
+            self.set_game_speed(value)
+        return control.clock_status(self.clock)
+    
+    def show_window(self):
+        # A second launch brings the running window to the front instead of opening another one
+        self.root.deiconify()
+        self.root.lift()
+        self.root.focus_force()
+    
     def on_closing(self):
-        # Save settings if auto-save is enabled
+        # Save settings if auto-save is enabled: one final write, no dialogs while closing
         if self.settings["auto_save_on_exit"]:
-            self.save_settings()
+            self.collect_settings()
+            self.persist_settings()
+        if self.control is not None:
+            self.control.close()
+        self.journal.record()
+        self.session_log.cut()
+        self.settings_watcher.close()
+        self.persist.close()
+        self.store.close()
+        
+        # Stop the audio thread and remove its temporary files
+        self.audio.close()
+        self.notifier.cancel()
+        self.tk_calls.stop()
         
         # Destroy the window
         self.root.destroy()
 
-def main():
+def main(argv=None):
+    # One instance per user: a second launch forwards its command (start, pause, set 12:00:00, show) and exits
+    try:
+        instance = control.single_instance(sys.argv[1:] if argv is None else argv)
+    except ValueError as e:
+        print(e)
+        return
+    if instance is None:
+        return
+    listener, command = instance
+    
     root = tk.Tk()
     app = StayOutTimerApp(root)
+    if listener is not None:
+        app.listen(listener)
+    if command[0] != "show":
+        app.handle_control(*command)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -1,8 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-import json
 import os
-from datetime import datetime
+import sys
+
+# Общее ядро лежит в корне репозитория (нужно для копии в final_package)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stay_out_core import ClockJournal, GameClock, StateStore, TickScheduler, format_time, parse_time, persist
 
 class StayOutTimer:
     def __init__(self, root):
@@ -11,29 +14,36 @@ class StayOutTimer:
         self.root.geometry("600x500")
         self.root.resizable(True, True)
 
+        # Настройки и якорь часов - в общей базе SQLite, прочитанные при запуске одним запросом;
+        # запись идет в фоновом потоке, интерфейс не ждет диска
+        self.persist = persist.WriteBehind()
+        self.store = StateStore()
+        self.state = self.store.scope("timer", writer=self.persist)
+
         # Загрузка настроек
         self.load_settings()
 
-        # Переменные таймера
-        self.start_time = 0
-        self.timer_running = False
-        self.game_time = 0  # В миллисекундах
-        self.timer_interval = None
-        self.real_time_tick = 1000  # 1 секунда реального времени
-        self.game_tick_duration = self.settings.get('game_speed', 6870)  # Скорость игрового времени в мс
+        # Игровые часы (скорость игрового времени в мс на 1 секунду реального времени)
+        self.clock = GameClock(self.settings.get('game_speed', 6870), 1000)
 
         # Создание интерфейса с вкладками
         self.create_widgets()
 
-        # Загрузка последнего сохраненного времени (если есть)
+        # Обновление отображения точно в момент смены игровой секунды
+        self.scheduler = TickScheduler(self.clock, self.root.after, self.root.after_cancel, self.update_timer)
+
+        # Контрольная точка часов: после сбоя идущий таймер продолжается с нужного времени
+        self.journal = ClockJournal(self.clock, store=self.state)
         self.load_last_time()
 
+        # При закрытии дописать отложенные изменения
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+
     def load_settings(self):
-        """Загрузка настроек из файла"""
-        try:
-            with open('timer_settings.json', 'r', encoding='utf-8') as f:
-                self.settings = json.load(f)
-        except FileNotFoundError:
+        """Загрузка настроек из базы"""
+        if self.state.settings:
+            self.settings = dict(self.state.settings)
+        else:
             self.settings = {
                 'game_speed': 6870,  # Стандартная скорость - 6870 мс
                 'background_color': '#f0f0f0',
@@ -43,24 +53,25 @@ class StayOutTimer:
             self.save_settings()
     
     def save_settings(self):
-        """Сохранение настроек в файл"""
-        with open('timer_settings.json', 'w', encoding='utf-8') as f:
-            json.dump(self.settings, f, ensure_ascii=False, indent=2)
+        """Сохранение настроек (в фоновом потоке)"""
+        self.state.save_settings(self.settings)
 
     def load_last_time(self):
-        """Загрузка последнего сохраненного времени"""
-        try:
-            with open('last_time.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.game_time = data.get('game_time', 0)
-                self.update_display()
-        except FileNotFoundError:
-            pass
+        """Загрузка последнего сохраненного состояния часов"""
+        if self.journal.restore():
+            self.update_buttons()
+            self.scheduler.poke()
 
     def save_last_time(self):
-        """Сохранение текущего времени"""
-        with open('last_time.json', 'w', encoding='utf-8') as f:
-            json.dump({'game_time': self.game_time}, f, ensure_ascii=False, indent=2)
+        """Сохранение текущего состояния часов (в фоновом потоке)"""
+        self.journal.record()
+
+    def on_closing(self):
+        """Закрытие окна: одна последняя запись отложенных файлов"""
+        self.journal.record()
+        self.persist.close()
+        self.store.close()
+        self.root.destroy()
 
     def create_widgets(self):
         """Создание элементов интерфейса с вкладками"""
@@ -163,7 +174,8 @@ class StayOutTimer:
             new_speed = int(self.speed_var.get())
             if 100 <= new_speed <= 10000:  # Разумные пределы
                 self.settings['game_speed'] = new_speed
-                self.game_tick_duration = new_speed
+                self.clock.set_speed(new_speed)
+                self.scheduler.poke()
                 self.save_settings()
                 messagebox.showinfo("Настройки", "Настройки скорости применены успешно!")
             else:
@@ -219,50 +231,44 @@ class StayOutTimer:
 
     def format_time(self, milliseconds):
         """Форматирование времени в ЧЧ:ММ:СС"""
-        total_seconds = milliseconds // 1000
-        hours = (total_seconds // 3600) % 24
-        minutes = (total_seconds % 3600) // 60
-        seconds = total_seconds % 60
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        return format_time(milliseconds)
 
     def update_display(self):
         """Обновление отображения времени"""
-        self.time_label.config(text=self.format_time(self.game_time))
+        self.time_label.config(text=self.format_time(self.clock.now_ms()))
 
     def update_timer(self):
-        """Обновление таймера"""
-        if self.timer_running:
-            current_time = datetime.now().timestamp() * 1000  # Текущее время в мс
-            elapsed_real_time = current_time - self.start_time
-            # Вычисляем игровое время: прошедшее реальное время * соотношение игрового времени
-            self.game_time = int(elapsed_real_time * self.game_tick_duration / self.real_time_tick)
-            self.update_display()
-            self.timer_interval = self.root.after(1000, self.update_timer)  # Обновляем каждую секунду
+        """Обновление таймера (вызывается планировщиком при смене игровой секунды)"""
+        self.update_display()
+        # Планировщик вызывается и после каждого старта, паузы и установки: пишется только изменение
+        self.journal.record()
+
+    def update_buttons(self):
+        """Кнопки управления по состоянию часов"""
+        active = self.clock.active
+        self.start_button.config(state='disabled' if active else 'normal')
+        self.pause_button.config(state='normal' if active else 'disabled')
+        self.stop_button.config(state='normal' if self.clock.running else 'disabled')
 
     def start_timer(self):
         """Запуск таймера"""
-        if not self.timer_running:
-            self.start_time = datetime.now().timestamp() * 1000 - (self.game_time * self.real_time_tick / self.game_tick_duration)
-            self.timer_running = True
-            self.update_timer()
+        if self.clock.start():
+            self.scheduler.poke()
             self.start_button.config(state='disabled')
             self.pause_button.config(state='normal')
             self.stop_button.config(state='normal')
 
     def pause_timer(self):
         """Пауза таймера"""
-        if self.timer_running:
-            self.timer_running = False
-            if self.timer_interval:
-                self.root.after_cancel(self.timer_interval)
+        if self.clock.pause():
+            self.scheduler.poke()
             self.start_button.config(state='normal')
             self.pause_button.config(state='disabled')
 
     def stop_timer(self):
         """Остановка таймера"""
-        self.timer_running = False
-        if self.timer_interval:
-            self.root.after_cancel(self.timer_interval)
+        self.clock.stop()
+        self.scheduler.poke()
         self.start_button.config(state='normal')
         self.pause_button.config(state='disabled')
         self.stop_button.config(state='disabled')
@@ -270,21 +276,17 @@ class StayOutTimer:
 
     def reset_timer(self):
         """Сброс таймера"""
-        self.timer_running = False
-        if self.timer_interval:
-            self.root.after_cancel(self.timer_interval)
-        self.game_time = 0
-        self.update_display()
+        self.clock.reset()
+        self.scheduler.poke()
         self.start_button.config(state='normal')
         self.pause_button.config(state='disabled')
         self.stop_button.config(state='disabled')
-        # Удаляем сохраненное время при сбросе
-        if os.path.exists('last_time.json'):
-            os.remove('last_time.json')
+        # Сброс - тоже новое состояние часов
+        self.save_last_time()
 
     def edit_time(self):
         """Редактирование времени"""
-        current_time_str = self.format_time(self.game_time)
+        current_time_str = self.format_time(self.clock.now_ms())
         new_time_str = simpledialog.askstring(
             "Редактировать время",
             f"Введите новое время в формате ЧЧ:ММ:СС\n(текущее: {current_time_str}):"
@@ -292,22 +294,8 @@ class StayOutTimer:
         
         if new_time_str:
             try:
-                time_parts = new_time_str.split(':')
-                if len(time_parts) != 3:
-                    raise ValueError("Неверный формат")
-                
-                hours, minutes, seconds = map(int, time_parts)
-                
-                if not (0 <= hours < 24 and 0 <= minutes < 60 and 0 <= seconds < 60):
-                    raise ValueError("Неверные значения времени")
-                
-                self.game_time = hours * 3600000 + minutes * 60000 + seconds * 1000
-                self.update_display()
-                
-                # Если таймер запущен, пересчитываем start_time
-                if self.timer_running:
-                    current_time = datetime.now().timestamp() * 1000
-                    self.start_time = current_time - (self.game_time * self.real_time_tick / self.game_tick_duration)
+                self.clock.set_ms(parse_time(new_time_str))
+                self.scheduler.poke()
                 
                 self.save_last_time()
                 
@@ -0,0 +1,94 @@
+"""
+Тесты импорта и экспорта расписаний будильников
+"""
+import json
+
+from stay_out_core import AlarmStore, Recurrence, alarm_io, parse_time
+
+
+def test_csv_import_reports_bad_lines_and_keeps_going(tmp_path):
+    path = tmp_path / "events.csv"
+    path.write_text("﻿Время;Описание\n"
+                    "06:00:00;Выброс\n"
+                    "25:00:00;Неверный час\n"
+                    "\n"
+                    "7:30;Без секунд\n"
+                    "12:00:00;\n"
+                    "18:15:30;Торговец;daily\n", encoding="utf-8")
+    rows, errors = alarm_io.read_alarms(str(path))
+    assert [row[:2] for row in rows] == [(parse_time("06:00:00"), "Выброс"),
+                                         (parse_time("12:00:00"), alarm_io.DEFAULT_DESCRIPTION),
+                                         (parse_time("18:15:30"), "Торговец")]
+    assert rows[-1][2] == Recurrence.daily(parse_time("18:15:30")) and not rows[0][2].repeats
+    assert [(error.line, error.message) for error in errors] == [(3, "Недопустимые значения"),
+                                                                 (5, "Неверный формат")]
+
+
+def test_json_streaming_across_chunk_boundaries(tmp_path, monkeypatch):
+    monkeypatch.setattr(alarm_io, "_CHUNK", 7)
+    items = [{"time": f"{i % 24:02d}:{i % 60:02d}:00", "description": f"Событие {i}"} for i in range(200)]
+    items[50] = {"time": "99:00:00", "description": "плохое"}
+    items[51] = ["01:02:03", "списком"]
+    path = tmp_path / "events.json"
+    path.write_text(json.dumps(items, ensure_ascii=False, indent=1), encoding="utf-8")
+    rows, errors = alarm_io.read_alarms(str(path))
+    assert len(rows) == 199
+    assert rows[50][:2] == (parse_time("01:02:03"), "списком")
+    assert [error.line for error in errors] == [51]
+
+
+def test_broken_json_keeps_loaded_rows(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text('[{"time": "01:00:00", "description": "a"}, {"time": ', encoding="utf-8")
+    rows, errors = alarm_io.read_alarms(str(path))
+    assert [row[:2] for row in rows] == [(parse_time("01:00:00"), "a")]
+    assert len(errors) == 1
+
+
+def test_export_roundtrip(tmp_path):
+    store = AlarmStore()
+    store.extend([(parse_time("00:00:01"), "Выброс, сильный"), (parse_time("23:59:59"), 'с "кавычками"'),
+                  (parse_time("06:00:00"), "Торговец", Recurrence.daily(parse_time("06:00:00"))),
+                  (parse_time("00:05:00"), "Мутанты", Recurrence.every_minutes(45, parse_time("00:05:00"))),
+                  (parse_time("20:00:00"), "Босс", Recurrence.on_weekdays([4, 5], parse_time("20:00:00")))])
+    for name in ("alarms.csv", "alarms.json"):
+        path = str(tmp_path / name)
+        assert alarm_io.write_alarms(path, store) == 5
+        rows, errors = alarm_io.read_alarms(path)
+        assert not errors
+        assert rows == [(alarm.time_ms, alarm.description, alarm.rule) for alarm in store]
+
+
+def test_bad_repeat_spec_is_reported(tmp_path):
+    path = tmp_path / "repeat.csv"
+    path.write_text("01:00:00,a,every:0\n02:00:00,b,days:\n03:00:00,c,weekly\n04:00:00,d,days:1,3\n",
+                    encoding="utf-8")
+    rows, errors = alarm_io.read_alarms(str(path))
+    assert [error.line for error in errors] == [1, 2, 3]
+    assert rows == [(parse_time("04:00:00"), "d", Recurrence.on_weekdays([1], parse_time("04:00:00")))]
+
+
+def test_csv_header_after_blank_and_comment_lines(tmp_path):
+    path = tmp_path / "events.csv"
+    path.write_text("\n# Расписание сервера, время игровое\ntime;description\n06:00:00;Выброс\n", encoding="utf-8")
+    rows, errors = alarm_io.read_alarms(str(path))
+    assert not errors
+    assert [row[:2] for row in rows] == [(parse_time("06:00:00"), "Выброс")]
+
+
+def test_malformed_json_elements_are_reported_and_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(alarm_io, "_CHUNK", 5)
+    path = tmp_path / "events.json"
+    path.write_text('[{"time": "01:00:00", "description": "a, [b]"},\n'
+                    ' {"time": "02:00:00" "description": "нет запятой"},\n'
+                    ' {"time": "03:00:00", "description": "кавычка \\\\\\" и }"},\n'
+                    ' {"time": }},\n'
+                    ' nonsense,\n'
+                    ' ["04:00:00", "списком"]]', encoding="utf-8")
+    rows, errors = alarm_io.read_alarms(str(path))
+    assert [row[:2] for row in rows] == [(parse_time("01:00:00"), "a, [b]"),
+                                         (parse_time("03:00:00"), 'кавычка \\" и }'),
+                                         (parse_time("04:00:00"), "списком")]
+    assert [(error.line, error.message) for error in errors] == [(2, "Поврежденный элемент JSON"),
+                                                                 (4, "Поврежденный элемент JSON"),
+                                                                 (5, "Поврежденный элемент JSON")]
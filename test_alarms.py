@@ -0,0 +1,179 @@
+"""
+Тесты кучи будильников: пересечение сроков, переход через сутки, скачки времени
+"""
+from stay_out_core import AlarmEngine, AlarmStore, GameClock, ManualClock, Recurrence, TickScheduler, parse_time
+
+from test_scheduler import FakeLoop
+
+
+def make(game_ms=0):
+    source = ManualClock()
+    clock = GameClock(6870, 1000, game_ms=game_ms, source=source)
+    return clock, source, AlarmEngine(clock)
+
+
+def test_alarm_between_ticks_is_not_missed():
+    clock, source, engine = make()
+    # Каждый тик - 6.87 игровой секунды: 00:00:10 не совпадает ни с одним тиком
+    engine.add("a", parse_time("00:00:10"))
+    clock.start()
+    fired = []
+    for _ in range(5):
+        source.advance(seconds=1)
+        fired += engine.poll()
+    assert fired == ["a"]
+    assert "a" not in engine
+
+
+def test_several_alarms_crossed_in_one_tick_fire_in_order():
+    clock, source, engine = make()
+    for key, time_str in (("c", "00:00:06"), ("a", "00:00:02"), ("b", "00:00:04")):
+        engine.add(key, parse_time(time_str))
+    engine.add("later", parse_time("01:00:00"))
+    clock.start()
+    source.advance(seconds=1)
+    assert engine.poll() == ["a", "b", "c"]
+    assert engine.poll() == []
+    assert len(engine) == 1
+
+
+def test_wraps_past_midnight():
+    clock, source, engine = make(game_ms=parse_time("23:59:00"))
+    engine.add("x", parse_time("00:00:30"))
+    assert engine.due_ms("x") == 86_400_000 + 30_000
+    clock.start()
+    source.advance(seconds=10)
+    assert engine.poll() == []
+    source.advance(seconds=5)
+    assert engine.poll() == ["x"]
+
+
+def test_edit_time_jump_rearms_without_firing():
+    clock, source, engine = make()
+    engine.add("noon", parse_time("12:00:00"))
+    engine.add("one", parse_time("00:00:01"))
+    clock.start()
+    # Скачок вперед через оба будильника - не срабатывание
+    clock.set_ms(parse_time("13:00:00"))
+    assert engine.poll() == []
+    assert engine.due_ms("noon") == 86_400_000 + parse_time("12:00:00")
+    # Скачок назад: будильник снова впереди в текущих сутках
+    clock.set_ms(parse_time("11:59:58"))
+    assert engine.due_ms("noon") == parse_time("12:00:00")
+    source.advance(seconds=1)
+    assert engine.poll() == ["noon"]
+
+
+def test_removed_alarm_does_not_fire():
+    clock, source, engine = make()
+    engine.add("a", 1000)
+    engine.add("b", 2000)
+    engine.remove("a")
+    clock.start()
+    source.advance(seconds=1)
+    assert engine.poll() == ["b"]
+
+
+def test_scheduler_wakes_exactly_at_deadline_while_suspended():
+    source = ManualClock()
+    clock = GameClock(6870, 1000, source=source)
+    loop = FakeLoop(source)
+    engine = AlarmEngine(clock)
+    fired = []
+    scheduler = TickScheduler(clock, loop.after, loop.after_cancel, lambda: None, 60000,
+                              background=lambda: fired.extend((key, clock.now_ms()) for key in engine.poll()))
+    scheduler.add_source(engine.next_real, essential=True)
+    engine.add("a", parse_time("00:10:00"))
+    clock.start()
+    scheduler.suspend()
+    loop.run_until(3600 * 1_000_000_000)
+    [(key, fired_ms)] = fired
+    # after() считает в целых мс: опоздание не больше одной реальной миллисекунды
+    assert key == "a" and 0 <= fired_ms - parse_time("00:10:00") < 7
+    assert scheduler.wakeups == 1
+
+
+def test_store_deletes_by_id_when_times_collide():
+    store = AlarmStore()
+    first = store.add(parse_time("12:00:00"), "первый")
+    second = store.add(parse_time("12:00:00"), "второй")
+    store.remove(second.id)
+    assert [alarm.description for alarm in store] == ["первый"]
+    assert store.get(first.id) is first
+
+
+def test_store_window_and_dirty_rows():
+    store = AlarmStore()
+    alarms = store.extend((i * 1000, f"#{i}") for i in range(5000))
+    version = store.version
+    assert [alarm.description for alarm in store.window(4998, 10)] == ["#4998", "#4999"]
+    store.mark_fired(alarms[10].id)
+    store.mark_fired(alarms[10].id)
+    store.mark_fired(alarms[4000].id)
+    assert store.take_dirty() == {alarms[10].id, alarms[4000].id}
+    assert store.take_dirty() == set()
+    # Смена статуса не требует перестройки списка, удаление - требует
+    assert store.version == version
+    store.remove(alarms[0].id)
+    assert store.version != version and store.index(alarms[1].id) == 0
+
+
+def test_batch_loading_five_thousand_alarms():
+    clock, source, engine = make()
+    store = AlarmStore()
+    alarms = store.extend((i * 17_000 % 86_400_000, "событие") for i in range(5000))
+    engine.add_many((alarm.id, alarm.time_ms) for alarm in alarms)
+    assert len(engine) == 5000
+    clock.start()
+    source.advance(seconds=3600)
+    fired = engine.poll()
+    # За час реального времени проходит 6.87 игровых часов
+    assert len(fired) == len([a for a in alarms if a.time_ms <= 3600 * 6870])
+    assert [store.get(key).time_ms for key in fired] == sorted(store.get(key).time_ms for key in fired)
+
+
+def test_daily_alarm_keeps_one_heap_entry():
+    clock, source, engine = make()
+    engine.add("daily", Recurrence.daily(parse_time("06:00:00")))
+    clock.start()
+    fired = []
+    # ~10 игровых суток тиками по одной реальной секунде
+    for _ in range(10 * 86400 * 1000 // 6870):
+        source.advance(seconds=1)
+        fired += [clock.now_ms() for _ in engine.poll()]
+    assert [ms // 86_400_000 for ms in fired] == list(range(10))
+    assert len(engine._heap) == 1
+
+
+def test_interval_and_weekday_rules():
+    every = Recurrence.every_minutes(45, parse_time("00:05:00"))
+    assert every.next_due(0) == parse_time("00:05:00")
+    assert every.next_due(parse_time("00:05:01")) == parse_time("00:50:00")
+    # Игровой день 0 - понедельник; пятница и суббота
+    boss = Recurrence.on_weekdays([4, 5], parse_time("20:00:00"))
+    assert boss.next_due(0) == 4 * 86_400_000 + parse_time("20:00:00")
+    assert boss.next_due(4 * 86_400_000 + parse_time("20:00:01")) == 5 * 86_400_000 + parse_time("20:00:00")
+    assert boss.next_due(5 * 86_400_000 + parse_time("21:00:00")) == 11 * 86_400_000 + parse_time("20:00:00")
+    assert Recurrence.from_spec(boss.spec(), boss.time_ms) == boss
+    assert boss.describe() == "Пт, Сб"
+
+
+def test_crossed_occurrences_coalesce_into_one_firing():
+    clock, source, engine = make()
+    engine.add("often", Recurrence.every_minutes(1))
+    engine.add("once", parse_time("00:00:30"))
+    clock.start()
+    source.advance(seconds=60)  # 6.87 игровых минуты за один тик
+    assert sorted(engine.poll()) == ["often", "once"]
+    assert engine.due_ms("often") == 7 * 60000 and "once" not in engine
+    # Скачок времени назад пересчитывает повтор от нового времени
+    clock.set_ms(parse_time("10:00:30"))
+    assert engine.due_ms("often") == parse_time("10:01:00")
+
+
+def test_store_counts_repeated_firings():
+    store = AlarmStore()
+    alarm = store.add(0, "повтор", Recurrence.daily(0))
+    store.mark_fired(alarm.id)
+    store.mark_fired(alarm.id)
+    assert alarm.fire_count == 2 and store.take_dirty() == {alarm.id}
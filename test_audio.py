@@ -0,0 +1,84 @@
+"""
+Тесты звукового потока: синтез, кэш, громкость, неблокирующая очередь
+"""
+import io
+import threading
+import time
+import wave
+from array import array
+
+from stay_out_core import audio
+from stay_out_core.audio import PATTERNS, SAMPLE_RATE, AudioEngine, synthesize
+
+
+def peak(wav):
+    with wave.open(io.BytesIO(wav)) as w:
+        assert (w.getnchannels(), w.getsampwidth(), w.getframerate()) == (1, 2, SAMPLE_RATE)
+        samples = array('h', w.readframes(w.getnframes()))
+    return max(abs(sample) for sample in samples), len(samples)
+
+
+def test_synthesized_length_and_volume():
+    full, frames = peak(synthesize("alarm", 100))
+    half, _ = peak(synthesize("alarm", 50))
+    silent, _ = peak(synthesize("alarm", 0))
+    assert frames == sum(SAMPLE_RATE * ms // 1000 for _, ms in PATTERNS["alarm"])
+    assert full > 32000 and 16000 < half < 16500 and silent == 0
+
+
+def test_play_never_blocks_and_caches_waveforms():
+    release = threading.Event()
+    played = []
+
+    def slow_backend(wav, path):
+        release.wait(5)
+        played.append(wav)
+
+    engine = AudioEngine(backend=slow_backend, maxsize=2)
+    started = time.perf_counter()
+    for _ in range(5):
+        assert engine.play("alarm", 40)
+    # Проигрывание ждет в фоне, а вызовы play() возвращаются сразу
+    assert time.perf_counter() - started < 0.1
+    release.set()
+    engine.wait()
+    assert engine.played + engine.dropped == 5 and engine.dropped >= 2
+    assert all(wav is played[0] for wav in played)
+    engine.close()
+
+
+def test_without_backend_play_reports_fallback(monkeypatch):
+    monkeypatch.setattr(audio, "default_backend", lambda: None)
+    engine = AudioEngine()
+    assert not engine.available
+    assert engine.play("alarm", 100) is False
+
+
+def test_prepare_synthesizes_ahead_and_keeps_only_latest_volume():
+    played = []
+    engine = AudioEngine(backend=lambda wav, path: played.append(wav))
+    engine.prepare(30)
+    engine.wait()
+    wav = engine.waveform("alarm", 30)
+    assert set(engine._cache) == {(pattern, 30) for pattern in PATTERNS}
+    # Движение ползунка: синтез идет только для последней громкости
+    for volume in (40, 50, 60):
+        engine.prepare(volume)
+    engine.wait()
+    assert {volume for _, volume in engine._cache} <= {40, 50, 60} and ("alarm", 60) in engine._cache
+    engine.play("alarm", 60)
+    engine.wait()
+    assert played == [engine.waveform("alarm", 60)] and played[0] is not wav
+    engine.close()
+
+
+def test_playback_errors_go_to_on_error():
+    messages = []
+
+    def broken(wav, path):
+        raise OSError("нет устройства")
+    engine = AudioEngine(backend=broken, on_error=messages.append)
+    engine.play("test", 50)
+    engine.wait()
+    assert engine.errors == 1 and messages == ["Не удалось воспроизвести звук: нет устройства"]
+    engine.close()
@@ -0,0 +1,161 @@
+"""
+Тесты панели именованных часов на ручном источнике времени
+"""
+import pytest
+
+from stay_out_core import ClockBoard, ManualClock, NS_PER_MS, NS_PER_SECOND, StateStore, persist, board as board_module
+
+
+def make(**kwargs):
+    source = ManualClock(NS_PER_SECOND)
+    return source, ClockBoard(source, **kwargs)
+
+
+def test_clocks_run_independently():
+    source, board = make()
+    a = board.add("Сервер 1", 3_600_000, 5000)
+    b = board.add("Сервер 2", 0, 10000)
+    c = board.add("Стоят", 1000)
+    board.start(a)
+    board.start(b)
+    source.advance(seconds=10)
+    assert board.now_ms(a) == 3_600_000 + 50_000
+    assert board.now_ms(b) == 100_000
+    assert board.now_ms(c) == 1000
+    board.pause(a)
+    board.set_speed(b, 1000)
+    source.advance(seconds=10)
+    assert board.now_ms(a) == 3_650_000
+    assert board.now_ms(b) == 110_000
+    assert board.state(a) == (5000, 1000, True, True)
+    assert board.start(a) and not board.start(a)
+    board.stop(b)
+    board.set_ms(c, 7000)
+    assert board.state(b)[2:] == (False, False) and board.now_ms(c) == 7000
+
+
+def test_remove_keeps_other_rows():
+    source, board = make()
+    ids = [board.add(f"Часы {i}", i * 1000) for i in range(5)]
+    board.start(ids[4])
+    board.remove(ids[1])
+    assert ids[1] not in board and len(board) == 4
+    assert board.order() == [ids[0], ids[2], ids[3], ids[4]]
+    source.advance(seconds=1)
+    assert [board.now_ms(i) for i in board.order()] == [0, 2000, 3000, 4000 + 6870]
+    assert board.name(ids[4]) == "Часы 4"
+    assert board.add("Новые") == ids[4] + 1
+    with pytest.raises(ValueError):
+        board.add("Дубль", clock_id=ids[0])
+
+
+def test_one_deadline_for_all_clocks():
+    source, board = make(frame_ms=0)
+    a = board.add("a", 0, 2000)
+    b = board.add("b", 0, 5000)
+    # Новые часы показываются при ближайшей перерисовке, потом - только по смене значения
+    assert sorted(board.due()) == [a, b]
+    assert board.next_change() is None
+    board.start(a)
+    board.start(b)
+    assert board.due() == [a, b]
+    # b меняет секунду каждые 200 мс, a - каждые 500 мс
+    assert board.next_change() == NS_PER_SECOND + 200 * NS_PER_MS
+    source.advance(ms=200)
+    assert board.due() == [b]
+    source.advance(ms=300)
+    assert sorted(board.due()) == [a, b]
+    source.advance(ms=50)
+    assert board.due() == []
+
+
+def test_many_clocks_are_coalesced_into_frames(numpy_branch, monkeypatch):
+    monkeypatch.setattr(board_module, "np", numpy_branch)
+    source, board = make(frame_ms=50)
+    for i in range(60):
+        clock_id = board.add(f"Персонаж {i}", i * 137, 1000 + i * 97)
+        board.start(clock_id)
+    wakeups = 0
+    rendered = 0
+    end = source() + 10 * NS_PER_SECOND
+    while True:
+        deadline = board.next_change()
+        if deadline > end:
+            break
+        source.advance(ns=max(0, deadline - source()))
+        wakeups += 1
+        rendered += len(board.due())
+    # Не больше одного пробуждения на кадр, и ни одна смена секунды не пропущена
+    assert wakeups <= 10 * 1000 // 50 + 1
+    assert rendered >= sum((1000 + i * 97) * 10 // 1000 for i in range(60)) - 60
+
+
+def test_due_rows_match_the_row_loop(numpy_branch, monkeypatch):
+    def frames():
+        source, board = make(frame_ms=0)
+        for i in range(board_module.NUMPY_MIN_ROWS + 8):
+            board.start(board.add(f"Сервер {i}", i * 311, 1000 + i * 53))
+        result = []
+        for _ in range(200):
+            source.advance(ms=37)
+            result.append(board.due())
+        # Столбцы после due() по-прежнему можно менять
+        board.remove(board.add("Еще", 0))
+        return result
+
+    monkeypatch.setattr(board_module, "np", None)
+    expected = frames()
+    monkeypatch.setattr(board_module, "np", numpy_branch)
+    assert frames() == expected and any(expected)
+
+
+def test_resolution_change_redraws_everything():
+    source, board = make(frame_ms=0)
+    a = board.add("a")
+    board.start(a)
+    board.due()
+    board.resolution_ms = 60_000
+    assert board.due() == [a]
+    # Следующая смена минуты: 60 игровых секунд при 6870 мс за секунду, с округлением вверх
+    assert board.next_change() == NS_PER_SECOND - (-60_000 * NS_PER_MS * 1000 // 6870)
+
+
+def test_clocks_persist_and_resume(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = StateStore(path)
+    writer = persist.WriteBehind(interval_ms=60_000)
+    source = ManualClock(NS_PER_SECOND)
+    wall = ManualClock(1_700_000_000 * NS_PER_SECOND)
+    board = ClockBoard(source, store=store.scope("app", writer=writer), wall=wall)
+    a = board.add("Идут", 1000, 5000)
+    b = board.add("Пауза", 2000)
+    c = board.add("Удалены")
+    board.start(a)
+    board.start(b)
+    board.pause(b)
+    board.rename(b, "На паузе")
+    board.remove(c)
+    writer.close()
+    store.close()
+
+    wall.advance(seconds=100)
+    again = StateStore(path)
+    restored = ClockBoard(ManualClock(5 * NS_PER_SECOND), store=again.scope("app"), wall=wall)
+    restored.restore(again.scope("app").load_named_clocks())
+    assert restored.order() == [a, b]
+    assert restored.now_ms(a) == 1000 + 500_000
+    assert restored.name(b) == "На паузе" and restored.now_ms(b) == 2000
+    assert restored.state(b)[2:] == (True, True)
+    # Id удаленных часов можно занять снова: их строки из базы удалены
+    assert restored.add("Новые") == b + 1
+    again.close()
+
+
+def test_never_deadline_for_stopped_board():
+    _, board = make()
+    assert board.next_change() is None
+    clock_id = board.add("a")
+    board.due()
+    assert board._due[0] == board_module.NEVER
+    board.remove(clock_id)
+    assert board.next_change() is None
@@ -0,0 +1,120 @@
+"""
+Тесты командной строки: запросы по якорю из базы, изменения часов, передача запущенному интерфейсу
+"""
+import subprocess
+import sys
+import time
+
+import pytest
+
+from stay_out_core import GameClock, ManualClock, NS_PER_SECOND, StateStore, control
+from stay_out_core import store as store_module
+from stay_out_core.store import DATA_DIR_ENV
+import stay_out_cli
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(DATA_DIR_ENV, str(tmp_path))
+    # JSON-файлы прежних версий в каталогах проекта не должны попасть в базу теста
+    monkeypatch.setattr(store_module, "legacy_dirs", lambda: [])
+    return tmp_path
+
+
+def run(capsys, *args):
+    code = stay_out_cli.main(list(args))
+    out, err = capsys.readouterr()
+    return code, out.strip(), err.strip()
+
+
+def test_changes_are_written_to_the_store(data_dir, capsys):
+    assert run(capsys, "now") == (0, "00:00:00", "")
+    assert run(capsys, "set", "10:00") == (0, "10:00:00 (остановлено, 6870 мс)", "")
+    assert run(capsys, "start")[1].startswith("10:00:00 (идет")
+    code, out, _ = run(capsys, "pause")
+    assert out.endswith("(на паузе, 6870 мс)")
+    assert run(capsys, "now") == (0, out.split()[0], "")
+    store = StateStore()
+    try:
+        clock = store.scope("app").clock
+        assert clock["running"] and clock["paused"]
+    finally:
+        store.close()
+    # Пауза: время не идет, и "когда" ответить нечего
+    assert run(capsys, "when", "12:00")[0] == 1
+    assert run(capsys, "set", "25:00")[0] == 2
+
+
+def test_timer_scope_uses_its_own_speed_key(data_dir, capsys):
+    store = StateStore()
+    store.scope("timer").save_settings({"game_speed": 2000})
+    store.close()
+    assert run(capsys, "--scope", "timer", "now", "-v") == (0, "00:00:00 (остановлено, 2000 мс)", "")
+
+
+def test_at_and_when():
+    source = ManualClock(5 * NS_PER_SECOND)
+    clock = GameClock(1000, 1000, source=source)
+    clock.start()
+    source.advance(seconds=30)
+    assert stay_out_cli.when(clock, "00:01:00").endswith("(через 0 мин 30 с)")
+    # Реальное "сейчас" с точностью до секунды - игровые 00:00:30 (или секундой раньше)
+    now = time.strftime("%H:%M:%S")
+    assert stay_out_cli.game_at(clock, now) in ("00:00:29", "00:00:30")
+    assert stay_out_cli.hms(25 * 3600 * 1000 + 61_000) == "01:01:01"
+
+
+def test_changes_go_to_the_running_instance(data_dir, capsys):
+    calls = []
+    clock = GameClock(1000)
+
+    def handle(name, value):
+        calls.append((name, value))
+        return control.clock_status(clock)
+    server = control.ControlServer(control.claim(), handle).start()
+    try:
+        assert run(capsys, "set", "12:00")[0] == 0
+        assert run(capsys, "start")[0] == 0
+    finally:
+        server.close()
+    assert calls == [("set", 12 * 3600 * 1000), ("start", None)]
+    # В базу мимо интерфейса ничего не записано
+    store = StateStore()
+    try:
+        assert store.scope("app").clock is None
+    finally:
+        store.close()
+
+
+def test_cli_does_not_import_gui_modules(data_dir):
+    # Ни интерфейса, ни NumPy (панель часов), ни модулей, которые разовому запросу не нужны
+    unwanted = ("tkinter", "webbrowser", "multiprocessing", "numpy", "stay_out_core.board", "stay_out_core.alarms",
+                "stay_out_core.notify", "stay_out_core.scheduler", "stay_out_core.countdown")
+    code = ("import sys, stay_out_cli; stay_out_cli.main(['now']); "
+            f"print(sorted(set({unwanted!r}) & set(sys.modules)))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
+def test_queries_open_the_store_read_only(data_dir, capsys, monkeypatch):
+    assert run(capsys, "set", "10:00")[0] == 0
+    opened = []
+
+    class Recording(StateStore):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            opened.append(self.readonly)
+
+    monkeypatch.setattr(stay_out_cli, "StateStore", Recording)
+    for command in (["now"], ["at", "12:00"], ["when", "12:00:00"]):
+        run(capsys, *command)
+    assert opened == [True, True, True]
+
+
+def test_skip_import_is_recorded(data_dir, capsys):
+    assert run(capsys, "skip-import") == (0, "Перенос прежних JSON-файлов отключен", "")
+    store = StateStore()
+    try:
+        assert set(store.legacy_imports()) == {"app", "timer"}
+    finally:
+        store.close()
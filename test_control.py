@@ -0,0 +1,105 @@
+"""
+Тесты управляющего сокета: один экземпляр, передача команд, сокет после аварийного выхода
+"""
+import os
+import threading
+
+import pytest
+
+from stay_out_core import GameClock, ManualClock, NS_PER_SECOND, control
+
+
+def serve(tmp_path, clock=None, dispatch=None):
+    address = control.control_address(str(tmp_path))
+    clock = clock or GameClock(1000, source=ManualClock(NS_PER_SECOND))
+    calls = []
+
+    def handle(name, value):
+        calls.append((name, value))
+        if name == "start":
+            clock.start()
+        elif name == "set":
+            clock.set_ms(value)
+        return control.clock_status(clock)
+    listener = control.claim(address)
+    return address, control.ControlServer(listener, handle, dispatch).start(), calls
+
+
+def test_parse_command():
+    assert control.parse_command([]) == ("show", None)
+    assert control.parse_command(["set", "12:00:00"]) == ("set", 12 * 3600 * 1000)
+    assert control.parse_command(["--pause"]) == ("pause", None)
+    assert control.parse_command(["speed", "2000"]) == ("speed", 2000)
+    for args in (["jump"], ["set"], ["set", "25:00:00"], ["speed", "50"], ["speed", "fast"], ["start", "now"]):
+        with pytest.raises(ValueError):
+            control.parse_command(args)
+
+
+def test_second_launch_forwards_its_command(tmp_path, capsys):
+    address, server, calls = serve(tmp_path)
+    try:
+        assert control.claim(address) is None
+        assert control.single_instance(["set", "12:00:00"], address) is None
+        assert calls == [("set", 12 * 3600 * 1000)]
+        assert capsys.readouterr().out.strip() == "12:00:00 (остановлено, 1000 мс)"
+
+        reply = control.send(["start"], address)
+        assert reply["running"] and not reply["paused"] and reply["game_time"] == "12:00:00"
+        # Ошибки разбора не доходят до интерфейса
+        assert "error" in control.send(["set", "99"], address)
+        assert "error" in server.reply(b'{"not": "a list"}')
+        assert server.commands == 2
+    finally:
+        server.close()
+    # Слушатель закрыт: следующий запуск становится первым
+    assert control.send(["show"], address) is None
+    instance = control.single_instance(["start"], address)
+    assert instance is not None and instance[1] == ("start", None)
+    instance[0].close()
+
+
+def test_stale_socket_is_reclaimed(tmp_path):
+    address, family = control.control_address(str(tmp_path))
+    if family != "AF_UNIX":
+        pytest.skip("файл сокета есть только у AF_UNIX")
+    # Сокет, который никто не слушает: как после аварийного выхода
+    import socket
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(address)
+    stale.close()
+    assert os.path.exists(address)
+    listener = control.claim((address, family))
+    assert listener is not None
+    listener.close()
+
+
+def test_commands_run_on_dispatch_thread_and_connection_stays_open(tmp_path):
+    from multiprocessing.connection import Client
+    import json
+    threads = []
+
+    def dispatch(command):
+        # Как root.after(0, ...): команда выполняется в другом потоке
+        thread = threading.Thread(target=command)
+        threads.append(thread)
+        thread.start()
+    address, server, calls = serve(tmp_path, dispatch=dispatch)
+    try:
+        with Client(*address) as conn:
+            for args in (["start"], ["set", "01:00:00"], ["status"]):
+                conn.send_bytes(json.dumps(args).encode())
+                reply = json.loads(conn.recv_bytes())
+        assert reply["game_time"] == "01:00:00" and reply["running"]
+        assert [name for name, _ in calls] == ["start", "set", "status"]
+        assert len(threads) == 3
+    finally:
+        server.close()
+
+
+def test_unanswered_command_times_out(tmp_path):
+    address, server, _ = serve(tmp_path, dispatch=lambda command: None)
+    server.timeout = 0.05
+    try:
+        assert "error" in control.send(["start"], address)
+    finally:
+        server.close()
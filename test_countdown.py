@@ -0,0 +1,110 @@
+"""
+Тесты колеса таймеров и таймеров обратного отсчета
+"""
+import random
+
+from stay_out_core import CountdownTimers, GameClock, ManualClock, TickScheduler, TimingWheel
+
+from test_scheduler import FakeLoop
+
+
+def test_wheel_matches_reference_model():
+    rng = random.Random(7)
+    wheel = TimingWheel(rng.randrange(10 ** 6))
+    now = wheel.now
+    reference = {}
+    for _ in range(5000):
+        op = rng.random()
+        if op < 0.4:
+            key = rng.randrange(300)
+            expires = now + rng.choice([rng.randrange(-3, 70), rng.randrange(5000), rng.randrange(10 ** 6),
+                                        rng.randrange(10 ** 12)])
+            wheel.add(key, expires)
+            reference[key] = expires
+        elif op < 0.5:
+            key = rng.randrange(300)
+            assert wheel.cancel(key) == (key in reference)
+            reference.pop(key, None)
+        else:
+            assert wheel.next_expiry() == (min(reference.values()) if reference else None)
+            now += rng.choice([0, 1, 7, 70, 5000, rng.randrange(10 ** 6)])
+            fired = wheel.advance(now)
+            assert sorted(fired) == sorted(key for key, expires in reference.items() if expires <= now)
+            assert [reference[key] for key in fired] == sorted(reference[key] for key in fired)
+            for key in fired:
+                del reference[key]
+            assert len(wheel) == len(reference)
+
+
+def make():
+    source = ManualClock()
+    clock = GameClock(6870, 1000, source=source)
+    return clock, source, CountdownTimers(clock)
+
+
+def test_game_countdown_runs_only_with_game_clock():
+    clock, source, timers = make()
+    respawn = timers.add("game", 3 * 3600 * 1000, "Артефакт")
+    source.advance(seconds=3600)
+    assert timers.poll() == [] and timers.remaining_ms(respawn) == 3 * 3600 * 1000
+    clock.start()
+    source.advance(seconds=1000)  # 6870 игровых секунд
+    assert timers.remaining_ms(respawn) == 3 * 3600 * 1000 - 6_870_000
+    # Установка времени - не ход времени: остаток не меняется
+    clock.set_ms(0)
+    assert timers.remaining_ms(respawn) == 3 * 3600 * 1000 - 6_870_000
+    source.advance(seconds=573)
+    assert timers.poll() == [respawn] and len(timers) == 0
+
+
+def test_game_time_before_set_counts():
+    for polled in (False, True):
+        clock, source, timers = make()
+        clock.start()
+        artifact = timers.add("game", 3 * 3600 * 1000, "Артефакт")
+        source.advance(seconds=500)
+        if polled:
+            timers.poll()
+        source.advance(seconds=500)  # всего 6870 игровых секунд до установки
+        clock.set_ms(12 * 3600 * 1000)
+        source.advance(seconds=100)
+        clock.pause()
+        clock.reset()
+        assert timers.remaining_ms(artifact) == 3 * 3600 * 1000 - 6_870_000 - 687_000
+        clock.start()
+        wake = timers.next_expiry()
+        source.advance(ns=wake - source() - 1)
+        assert timers.poll() == []
+        source.advance(ns=1)
+        assert timers.poll() == [artifact]
+
+
+def test_real_countdown_ignores_pause():
+    clock, source, timers = make()
+    tea = timers.add("real", 5 * 60 * 1000, "Чай")
+    source.advance(seconds=299)
+    assert timers.poll() == [] and timers.remaining_ms(tea) == 1000
+    source.advance(seconds=1)
+    assert timers.poll() == [tea]
+
+
+def test_scheduler_wakes_only_for_earliest_expiry():
+    source = ManualClock()
+    clock = GameClock(6870, 1000, source=source)
+    loop = FakeLoop(source)
+    timers = CountdownTimers(clock)
+    expired = []
+    scheduler = TickScheduler(clock, loop.after, loop.after_cancel, lambda: None,
+                              background=lambda: expired.extend((c.label, source() // 1_000_000_000)
+                                                                for c in timers.poll()))
+    scheduler.add_source(timers.next_expiry, essential=True)
+    for i in range(1000):
+        timers.add("real", (i + 1) * 60_000, f"#{i}")
+    timers.add("game", 6_870_000, "игровой")
+    clock.start()
+    scheduler.suspend()
+    loop.run_until(3600 * 1_000_000_000)
+    assert expired[:2] == [("#0", 60), ("#1", 120)]
+    assert ("игровой", 1000) in expired
+    # Одно пробуждение на срок, а не опрос каждую секунду
+    assert scheduler.wakeups == 61 and len(expired) == 61
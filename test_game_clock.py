@@ -0,0 +1,238 @@
+"""
+Тесты игровых часов на ручном источнике времени (без sleep)
+"""
+import time
+
+import pytest
+
+from stay_out_core import (DAY_MS, NS_PER_SECOND, GameClock, ManualClock, OccurrencePlanner, StateStore, batch, format_time,
+                           parse_time)
+from console_timer_test import ConsoleStayOutTimer
+
+
+def make_clock(speed=6870):
+    source = ManualClock()
+    return GameClock(speed, 1000, source=source), source
+
+
+def test_full_scenario_over_several_game_days():
+    clock, source = make_clock()
+    clock.set_ms(parse_time("23:59:00"))
+    clock.start()
+
+    source.advance(seconds=10)  # 68.7 игровых секунд -> переход через полночь
+    assert format_time(clock.now_ms()) == "00:00:08"
+
+    clock.pause()
+    source.advance(seconds=3600)  # на паузе игровое время стоит
+    assert format_time(clock.now_ms()) == "00:00:08"
+
+    clock.start()
+    source.advance(seconds=10 * 3600)  # 10 реальных часов = ~68.7 игровых часов
+    assert clock.now_ms() == parse_time("23:59:00") + 10 * 6870 + 10 * 3600 * 6870
+
+    clock.set_speed(1000)
+    before = clock.now_ms()
+    source.advance(seconds=60)
+    assert clock.now_ms() == before + 60000
+
+    clock.stop()
+    stopped = clock.now_ms()
+    source.advance(seconds=100)
+    assert clock.now_ms() == stopped
+    assert clock.now_ms() > 2 * DAY_MS
+
+    clock.reset()
+    assert clock.now_ms() == 0
+    assert not clock.running
+
+
+def test_set_keeps_running_state():
+    clock, source = make_clock()
+    clock.start()
+    source.advance(seconds=5)
+    clock.set_ms(parse_time("12:00:00"))
+    source.advance(seconds=1)
+    assert clock.now_ms() == parse_time("12:00:00") + 6870
+
+
+def test_speed_change_does_not_rescale_past_time():
+    clock, source = make_clock()
+    clock.start()
+    source.advance(seconds=100)
+    clock.set_speed(100)
+    assert clock.now_ms() == 687000
+
+
+@pytest.mark.parametrize("speed", range(100, 10001, 10))
+def test_conversion_matches_ratio(speed):
+    clock, source = make_clock(speed)
+    clock.start()
+    source.advance(ms=12345)
+    assert clock.now_ms() == 12345 * speed // 1000
+
+
+def test_console_timer_uses_injected_source(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = ManualClock()
+    timer = ConsoleStayOutTimer(source=source, store=StateStore(":memory:"))
+    timer.edit_time("10:00:00")
+    timer.start_timer()
+    source.advance(seconds=2)
+    timer.pause_timer()
+    assert timer.format_time(timer.game_time) == "10:00:13"
+    timer.change_game_speed(5000)
+    timer.start_timer()
+    source.advance(seconds=2)
+    timer.stop_timer()
+    assert timer.game_time == parse_time("10:00:00") + 13740 + 10000
+
+
+def test_timeline_lookup_in_both_directions():
+    clock, source = make_clock()
+    clock.start()
+    source.advance(seconds=10)
+    clock.set_speed(1000)
+    source.advance(seconds=10)
+    clock.pause()
+    source.advance(seconds=5)
+    clock.start()
+    source.advance(seconds=1)
+
+    second = 1_000_000_000
+    assert clock.game_at(15 * second) == (68700 + 5000) * 1_000_000
+    assert clock.game_at(22 * second) == 78700 * 1_000_000  # на паузе
+    assert clock.now() == clock.game_at(source())
+
+    for game_ms in (1, 68700, 70000, 78700, 78701, 79700, 10 ** 8):
+        real = clock.real_at(game_ms * 1_000_000)
+        assert clock.game_at(real) >= game_ms * 1_000_000 > clock.game_at(real - 1)
+
+
+def test_reverse_lookup_is_limited_to_current_epoch():
+    clock, source = make_clock()
+    clock.start()
+    source.advance(seconds=100)
+    clock.set_ms(parse_time("12:00:00"))
+    assert clock.real_at(parse_time("00:01:00") * 1_000_000) is None
+    clock.pause()
+    assert clock.real_at(parse_time("13:00:00") * 1_000_000) is None
+
+
+def test_repeated_speed_changes_at_one_instant_share_a_segment():
+    clock, source = make_clock()
+    clock.start()
+    source.advance(seconds=1)
+    segments = clock.segment_count
+    for speed in range(100, 10000, 37):
+        clock.set_speed(speed)
+    assert clock.segment_count == segments + 1
+    clock.set_speed(clock.game_tick_duration)
+    assert clock.segment_count == segments + 1
+
+
+def test_planner_next_occurrences_wrap_and_pause():
+    clock, source = make_clock()
+    planner = OccurrencePlanner(clock)
+    clock.set_ms(parse_time("23:00:00"))
+    assert planner.next_occurrences(parse_time("01:00:00"), 2) == []  # не запущен
+
+    clock.start()
+    reals = planner.next_occurrences(parse_time("01:00:00"), 3)
+    assert len(reals) == 3
+    for i, real in enumerate(reals):
+        target = (parse_time("01:00:00") + (i + 1) * DAY_MS) * 1_000_000
+        assert clock.game_at(real) >= target > clock.game_at(real - 1)
+    assert planner.next_occurrences(parse_time("01:00:00"), 3) is reals  # из кэша
+
+    source.set(reals[0] + 1)  # первое наступление прошло
+    assert planner.next_occurrences(parse_time("01:00:00"), 1)[0] == reals[1]
+
+    clock.pause()
+    assert planner.next_occurrences(parse_time("01:00:00"), 3) == []
+    clock.start()
+    assert planner.next_occurrences(parse_time("01:00:00"), 1)[0] > source()
+
+
+def test_batch_conversion_matches_scalar_lookup(numpy_branch, monkeypatch):
+    monkeypatch.setattr(batch, "np", numpy_branch)
+    clock, source = make_clock()
+    clock.set_ms(parse_time("12:00:00"))
+    clock.start()
+    source.advance(seconds=30)
+    clock.set_speed(1000)
+    source.advance(seconds=30)
+    clock.pause()
+    source.advance(seconds=10)
+    clock.start()
+    source.advance(seconds=5)
+
+    reals = [0, 15 * 10 ** 9, 45 * 10 ** 9, 65 * 10 ** 9, 10 ** 15]
+    assert list(batch.game_at_many(clock, reals)) == [clock.game_at(real) for real in reals]
+
+    games = [0, parse_time("12:00:00") * 10 ** 6, parse_time("12:05:00") * 10 ** 6]
+    expected = [clock.real_at(game) for game in games]
+    assert list(batch.real_at_many(clock, games)) == [
+        batch.NEVER if real is None else real for real in expected]
+
+
+def test_forecast_export(tmp_path, numpy_branch, monkeypatch):
+    monkeypatch.setattr(batch, "np", numpy_branch)
+    clock, source = make_clock()
+    clock.set_ms(parse_time("23:00:00"))
+    clock.start()
+    rows = batch.write_forecast(str(tmp_path / "forecast.csv"), clock, hours=24, step_s=60)
+    lines = (tmp_path / "forecast.csv").read_text(encoding="utf-8").splitlines()
+    assert rows == 1440 and len(lines) == 1441
+    assert lines[0] == ",".join(batch.FORECAST_HEADER)
+    assert batch.write_forecast(str(tmp_path / "forecast.json"), clock, hours=1, step_s=1) == 3600
+
+
+def test_forecast_local_times_follow_dst_change(numpy_branch, monkeypatch):
+    if not hasattr(time, "tzset"):
+        pytest.skip("time.tzset есть только на Unix")
+    monkeypatch.setattr(batch, "np", numpy_branch)
+    monkeypatch.setenv("TZ", "Europe/Berlin")
+    time.tzset()
+    try:
+        # 2024-10-27 03:00 CEST -> 02:00 CET (01:00 UTC); ряд с 00:00 UTC по часу
+        start = 1729987200
+        walls, games = [start + i * 3600 for i in range(4)], [0] * 4
+        if numpy_branch is not None:
+            walls, games = numpy_branch.array(walls), numpy_branch.array(games)
+        _, real_times, _, _ = batch._forecast_columns(walls, games)
+        assert real_times == ["02:00:00", "02:00:00", "03:00:00", "04:00:00"]
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_forecast_branches_agree_over_weeks(numpy_branch, monkeypatch):
+    # Ряд на три недели по 7 минут: длинные промежутки в нс, смена скорости и пауза посередине
+    monkeypatch.setattr(batch.time, "time_ns", lambda: 1_729_987_200 * NS_PER_SECOND)
+    clock, source = make_clock()
+    clock.set_ms(parse_time("23:00:00"))
+    clock.start()
+    source.advance(seconds=3600)
+    clock.set_speed(10000)
+
+    def columns():
+        walls, games = batch.forecast(clock, hours=21 * 24, step_s=420)
+        return [list(column) for column in batch._forecast_columns(walls, games)]
+
+    monkeypatch.setattr(batch, "np", None)
+    expected = columns()
+    monkeypatch.setattr(batch, "np", numpy_branch)
+    assert columns() == expected
+    assert int(expected[3][-1]) >= 200  # игровые сутки: три недели на скорости 10000
+
+
+def test_copy_is_independent():
+    clock, source = make_clock()
+    clock.start()
+    source.advance(seconds=10)
+    copy = clock.copy()
+    clock.set_ms(0)
+    assert copy.now_ms() == 68_700 and copy.segment_count == 1
+    source.advance(seconds=1)
+    assert copy.now_ms() == 75_570 and clock.now_ms() == 6_870
@@ -0,0 +1,114 @@
+"""
+Тесты журнала контрольных точек часов на ручных часах
+"""
+from stay_out_core import ClockJournal, GameClock, ManualClock, NS_PER_SECOND, persist
+
+
+def make(tmp_path, wall_ns=1_700_000_000 * NS_PER_SECOND, source_ns=5 * NS_PER_SECOND):
+    # Часы идут по монотонному источнику, журнал - по настенным: у них разные нули
+    source = ManualClock(source_ns)
+    wall = ManualClock(wall_ns)
+    clock = GameClock(5000, 1000, source=source)
+    journal = ClockJournal(clock, path=str(tmp_path / "clock.jsonl"), wall=wall)
+    return source, wall, clock, journal
+
+
+def advance(seconds, *clocks):
+    for clock in clocks:
+        clock.advance(seconds=seconds)
+
+
+def test_running_clock_resumes_after_crash(tmp_path):
+    source, wall, clock, journal = make(tmp_path)
+    clock.set_ms(3_600_000)
+    clock.start()
+    assert journal.record()
+    advance(10, source, wall)
+    # Процесс убит; новый запуск через 50 реальных секунд с другим нулем монотонных часов
+    advance(40, wall)
+    source2, wall2, clock2, journal2 = make(tmp_path, wall_ns=wall(), source_ns=999 * NS_PER_SECOND)
+    assert journal2.restore()
+    assert clock2.active
+    assert clock2.now_ms() == 3_600_000 + 50 * 5000
+    assert clock2.game_tick_duration == 5000
+
+
+def test_paused_and_stopped_state_is_kept(tmp_path):
+    source, wall, clock, journal = make(tmp_path)
+    clock.start()
+    advance(2, source, wall)
+    clock.pause()
+    journal.record()
+    advance(100, wall)
+    _, _, clock2, journal2 = make(tmp_path, wall_ns=wall())
+    journal2.restore()
+    assert clock2.running and clock2.paused and clock2.now_ms() == 10_000
+
+
+def test_only_state_changes_are_written(tmp_path):
+    source, wall, clock, journal = make(tmp_path)
+    clock.start()
+    assert journal.record()
+    for _ in range(3600):
+        advance(1, source, wall)
+        assert not journal.record()
+    clock.set_speed(6870)
+    assert journal.record()
+    assert journal.written == 2
+    # Смена скорости не пересчитывает прошлое
+    advance(1, wall)
+    _, _, clock2, journal2 = make(tmp_path, wall_ns=wall())
+    journal2.restore()
+    assert clock2.now_ms() == 3600 * 5000 + 6870
+    assert clock2.game_tick_duration == 6870
+
+
+def test_torn_last_line_is_skipped_and_compacted(tmp_path):
+    source, wall, clock, journal = make(tmp_path)
+    clock.set_ms(1000)
+    journal.record()
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"wall_ns": 12')
+    _, _, clock2, journal2 = make(tmp_path, wall_ns=wall())
+    assert journal2.restore()
+    assert clock2.now_ms() == 1000
+    clock2.set_ms(2000)
+    journal2.record()
+    with open(journal.path, encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 1
+    _, _, clock3, journal3 = make(tmp_path, wall_ns=wall())
+    journal3.restore()
+    assert clock3.now_ms() == 2000
+
+
+def test_journal_is_compacted(tmp_path):
+    source, wall, clock, journal = make(tmp_path)
+    journal.max_records = 8
+    for i in range(20):
+        clock.set_ms(i * 1000)
+        journal.record()
+    with open(journal.path, encoding="utf-8") as f:
+        assert len(f.read().splitlines()) <= 8
+    _, _, clock2, journal2 = make(tmp_path, wall_ns=wall())
+    journal2.restore()
+    assert clock2.now_ms() == 19_000
+
+
+def test_missing_journal(tmp_path):
+    _, _, clock, journal = make(tmp_path)
+    assert not journal.restore()
+    assert clock.now_ms() == 0 and not clock.running
+
+
+def test_write_behind_merges_checkpoints(tmp_path):
+    source, wall, clock, _ = make(tmp_path)
+    writer = persist.WriteBehind(interval_ms=60_000)
+    journal = ClockJournal(clock, path=str(tmp_path / "clock.jsonl"), writer=writer, wall=wall)
+    for i in range(10):
+        clock.set_ms(i * 1000)
+        journal.record()
+    writer.close()
+    assert journal.written == 1
+    _, _, clock2, journal2 = make(tmp_path, wall_ns=wall())
+    journal2.restore()
+    assert clock2.now_ms() == 9000
@@ -0,0 +1,56 @@
+"""
+Тесты очереди уведомлений на фейковом root.after
+"""
+from stay_out_core import ManualClock, Notifier
+
+from test_scheduler import FakeLoop
+
+
+def make(maxlen=4):
+    source = ManualClock()
+    loop = FakeLoop(source)
+    shown = []
+    hidden = []
+    notifier = Notifier(loop.after, loop.after_cancel,
+                        lambda n: shown.append((source() // 1_000_000, n.title, n.text(), n.count)),
+                        lambda: hidden.append(source() // 1_000_000),
+                        display_ms=6000, min_interval_ms=1500, maxlen=maxlen,
+                        now=lambda: source() / 1e9)
+    return source, loop, notifier, shown, hidden
+
+
+def test_alarms_of_one_tick_merge_into_one_notification():
+    source, loop, notifier, shown, hidden = make()
+    for i in range(10):
+        notifier.post("Будильник", f"a{i}")
+    loop.run_until(1_000_000)
+    assert len(shown) == 1
+    at, title, text, count = shown[0]
+    assert count == 10 and text.splitlines()[0] == "a0" and text.endswith("...и еще 4")
+    # Автоскрытие
+    loop.run_until(10 * 1_000_000_000)
+    assert hidden == [6000]
+
+
+def test_rate_limit_and_merge_while_waiting():
+    source, loop, notifier, shown, hidden = make()
+    notifier.post("Будильник", "first")
+    loop.run_until(100 * 1_000_000)
+    notifier.dismiss()
+    # Следующие тики в пределах интервала копятся в одно ожидающее уведомление
+    notifier.post("Будильник", "second")
+    loop.run_until(500 * 1_000_000)
+    notifier.post("Будильник", "third")
+    loop.run_until(20 * 1_000_000_000)
+    assert [(at, text) for at, _, text, _ in shown] == [(0, "first"), (1500, "second\nthird")]
+
+
+def test_bounded_queue_drops_oldest():
+    source, loop, notifier, shown, hidden = make(maxlen=2)
+    notifier.post("Будильник", "shown")
+    loop.run_until(1_000_000)
+    for title in ("A", "B", "C"):
+        notifier.post(title, title)
+    loop.run_until(60 * 1_000_000_000)
+    assert [title for _, title, _, _ in shown] == ["Будильник", "B", "C"]
+    assert notifier.dropped == 1
@@ -0,0 +1,100 @@
+"""
+Тесты атомарной и отложенной записи файлов состояния
+"""
+import json
+import os
+import threading
+
+import pytest
+
+from stay_out_core import persist
+
+
+def test_atomic_write_replaces_whole_file(tmp_path):
+    path = tmp_path / "settings.json"
+    persist.atomic_write_json(str(path), {"game_speed": 6870, "тема": "stalker"})
+    assert json.loads(path.read_text(encoding="utf-8")) == {"game_speed": 6870, "тема": "stalker"}
+    persist.atomic_write_json(str(path), {"game_speed": 5000})
+    assert json.loads(path.read_text(encoding="utf-8")) == {"game_speed": 5000}
+    # Временных файлов не остается
+    assert os.listdir(tmp_path) == ["settings.json"]
+
+
+def test_failed_write_keeps_old_file(tmp_path):
+    path = tmp_path / "settings.json"
+    persist.atomic_write_json(str(path), {"game_speed": 6870})
+    with pytest.raises(TypeError):
+        persist.atomic_write_json(str(path), {"bad": object()})
+    assert json.loads(path.read_text(encoding="utf-8")) == {"game_speed": 6870}
+    assert os.listdir(tmp_path) == ["settings.json"]
+
+
+def test_rapid_changes_merge_into_one_write(tmp_path):
+    path = str(tmp_path / "settings.json")
+    writes = []
+
+    def write(target, data):
+        writes.append((target, data))
+        persist.atomic_write_json(target, data)
+
+    writer = persist.WriteBehind(interval_ms=60_000, write=write)
+    for speed in range(100, 1100):
+        writer.submit(path, {"game_speed": speed})
+    # Интервал еще не прошел: на диске ничего
+    assert writes == [] and not os.path.exists(path)
+    assert writer.flush(timeout=5)
+    assert writes == [(path, {"game_speed": 1099})]
+    assert writer.submitted == 1000 and writer.writes == 1
+    writer.close()
+
+
+def test_interval_write_without_flush(tmp_path):
+    path = str(tmp_path / "last_time.json")
+    done = threading.Event()
+
+    def write(target, data):
+        persist.atomic_write_json(target, data)
+        done.set()
+
+    writer = persist.WriteBehind(interval_ms=10, write=write)
+    writer.submit(path, {"game_time": 1})
+    assert done.wait(5)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"game_time": 1}
+    writer.close()
+
+
+def test_remove_wins_over_earlier_write(tmp_path):
+    path = tmp_path / "last_time.json"
+    path.write_text("{}", encoding="utf-8")
+    writer = persist.WriteBehind(interval_ms=60_000)
+    writer.submit(str(path), {"game_time": 5})
+    writer.remove(str(path))
+    writer.close()
+    assert not path.exists()
+
+
+def test_close_flushes_and_rejects_new_writes(tmp_path):
+    paths = [str(tmp_path / name) for name in ("a.json", "b.json")]
+    writer = persist.WriteBehind(interval_ms=60_000)
+    for i, path in enumerate(paths):
+        writer.submit(path, {"value": i})
+    writer.close()
+    for i, path in enumerate(paths):
+        with open(path, encoding="utf-8") as f:
+            assert json.load(f) == {"value": i}
+    with pytest.raises(RuntimeError):
+        writer.submit(paths[0], {})
+
+
+def test_write_error_does_not_stop_worker(tmp_path):
+    path = str(tmp_path / "ok.json")
+    writer = persist.WriteBehind(interval_ms=60_000)
+    writer.submit(str(tmp_path / "missing" / "x.json"), {"value": 1})
+    writer.submit(path, {"value": 2})
+    assert writer.flush(timeout=5)
+    assert writer.last_error is not None
+    writer.submit(path, {"value": 3})
+    writer.close()
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"value": 3}
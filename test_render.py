@@ -0,0 +1,70 @@
+"""
+Тесты слоя отрисовки и таблицы строк суток
+"""
+from stay_out_core import GameClock, ManualClock, RenderLayer, TickScheduler, day_strings, format_time
+
+from test_scheduler import FakeLoop
+
+
+class FakeLabel:
+    def __init__(self):
+        self.calls = []
+
+    def config(self, **options):
+        self.calls.append(options["text"])
+
+
+def reference_format(milliseconds):
+    total_seconds = int(milliseconds // 1000)
+    return f"{(total_seconds // 3600) % 24:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
+
+
+def test_format_time_table_matches_formula():
+    table = day_strings()
+    assert len(table) == 86400 and table[0] == "00:00:00" and table[-1] == "23:59:59"
+    for ms in (0, 999, 1000, 59_999, 3_600_000, 86_399_999, 86_400_000, 90_061_500, -1, -86_401_000, 1234.5):
+        assert format_time(ms) == reference_format(ms)
+
+
+def test_unchanged_text_is_not_sent_to_tk():
+    source = ManualClock()
+    render = RenderLayer(now=source)
+    label = FakeLabel()
+    render.set(label, "a")
+    render.set(label, "b")
+    assert render.flush() == 1 and label.calls == ["b"]
+    render.set(label, "b")
+    assert render.flush() == 0 and label.calls == ["b"]
+    # Возврат к уже отрисованному тексту в пределах кадра не порождает вызов
+    render.set(label, "c")
+    render.set(label, "b")
+    assert render.flush() == 0
+    render.invalidate(label)
+    render.set(label, "b")
+    assert render.flush() == 1 and label.calls == ["b", "b"]
+
+
+def test_saved_calls_per_minute():
+    # Как в окне таймера: игровая метка и метка реального времени в одном кадре
+    source = ManualClock()
+    clock = GameClock(6870, 1000, source=source)
+    loop = FakeLoop(source)
+    render = RenderLayer(now=source)
+    game_label, real_label = FakeLabel(), FakeLabel()
+
+    def frame():
+        render.set(game_label, format_time(clock.now_ms()))
+        render.set(real_label, format_time(source() // 1_000_000))
+        render.flush()
+
+    scheduler = TickScheduler(clock, loop.after, loop.after_cancel, frame)
+    scheduler.add_source(lambda: source() + 1_000_000_000 - source() % 1_000_000_000)
+    clock.start()
+    scheduler.poke()
+    loop.run_until(60 * 1_000_000_000)
+
+    assert render.requested == 2 * scheduler.renders
+    assert len(game_label.calls) == 60 * 6870 // 1000 + 1
+    assert len(real_label.calls) == 61
+    assert render.saved == render.requested - len(game_label.calls) - len(real_label.calls)
+    assert render.saved_per_minute() == render.saved
@@ -0,0 +1,189 @@
+"""
+Тесты планировщика обновлений на ручных часах и фейковом root.after
+"""
+import threading
+
+from stay_out_core import CallQueue, GameClock, ManualClock, TickScheduler, format_time
+
+
+class FakeLoop:
+    """Минимальная замена root.after/after_cancel поверх ManualClock"""
+
+    def __init__(self, source, lateness_ms=0):
+        self.source = source
+        self.lateness_ms = lateness_ms
+        self.pending = {}
+        self.next_id = 0
+        self.scheduled = 0
+
+    def after(self, delay_ms, callback):
+        self.next_id += 1
+        self.scheduled += 1
+        self.pending[self.next_id] = (self.source() + (delay_ms + self.lateness_ms) * 1_000_000, callback)
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def run_until(self, ns):
+        while self.pending:
+            after_id = min(self.pending, key=lambda key: self.pending[key][0])
+            due, callback = self.pending[after_id]
+            if due > ns:
+                break
+            del self.pending[after_id]
+            self.source.set(due)
+            callback()
+        self.source.set(ns)
+
+
+def make(resolution_ms=1000, lateness_ms=0):
+    source = ManualClock()
+    clock = GameClock(6870, 1000, source=source)
+    loop = FakeLoop(source, lateness_ms)
+    shown = []
+    scheduler = TickScheduler(clock, loop.after, loop.after_cancel,
+                              lambda: shown.append(clock.now_ms()), resolution_ms)
+    return clock, source, loop, scheduler, shown
+
+
+def test_every_displayed_second_is_rendered_once():
+    clock, source, loop, scheduler, shown = make()
+    clock.start()
+    scheduler.poke()
+    loop.run_until(60 * 1_000_000_000)
+    texts = [format_time(ms) for ms in shown]
+    # 60 реальных секунд = 412.2 игровых: каждая игровая секунда ровно один раз
+    assert texts == [format_time(second * 1000) for second in range(413)]
+    assert scheduler.wakeups == 412
+
+
+def test_lateness_does_not_accumulate():
+    clock, source, loop, scheduler, shown = make(lateness_ms=40)
+    clock.start()
+    scheduler.poke()
+    loop.run_until(3600 * 1_000_000_000)
+    seconds = [ms // 1000 for ms in shown]
+    assert seconds == sorted(set(seconds))
+    # Запаздывающий обратный вызов не копит дрейф: отставание не больше одного шага
+    assert 3600 * 6870 // 1000 - seconds[-1] <= 1
+    assert scheduler.last_lateness_ns < 50 * 1_000_000
+
+
+def test_minute_resolution_wakes_rarely():
+    clock, source, loop, scheduler, shown = make(resolution_ms=60000)
+    clock.start()
+    scheduler.poke()
+    loop.run_until(3600 * 1_000_000_000)
+    assert scheduler.wakeups == 3600 * 6870 // 60000
+
+
+def test_stopped_clock_schedules_nothing():
+    clock, source, loop, scheduler, shown = make()
+    scheduler.poke()
+    clock.start()
+    scheduler.poke()
+    loop.run_until(10 * 1_000_000_000)
+    clock.pause()
+    scheduler.poke()
+    scheduled = loop.scheduled
+    loop.run_until(3600 * 1_000_000_000)
+    assert loop.scheduled == scheduled
+    assert not scheduler.armed
+
+
+def test_idle_states_have_zero_wakeups():
+    clock, source, loop, scheduler, shown = make()
+    label_visible = [True]
+
+    def next_wall_second():
+        if label_visible[0]:
+            return source() + 1_000_000_000 - source() % 1_000_000_000
+        return None
+
+    scheduler.add_source(next_wall_second)
+    clock.start()
+    scheduler.poke()
+    loop.run_until(10 * 1_000_000_000)
+
+    # Пауза с видимой меткой реального времени: одно пробуждение в секунду
+    clock.pause()
+    scheduler.poke()
+    wakeups = scheduler.wakeups
+    loop.run_until(20 * 1_000_000_000)
+    assert scheduler.wakeups - wakeups == 10
+
+    # Метка скрыта: ничего не меняется - пробуждений нет
+    label_visible[0] = False
+    scheduler.poke()
+    wakeups = scheduler.wakeups
+    loop.run_until(3600 * 1_000_000_000)
+    assert scheduler.wakeups == wakeups and not scheduler.armed
+
+    # Окно свернуто при идущем таймере: тоже ноль, после Map - отрисовка
+    label_visible[0] = True
+    clock.start()
+    scheduler.suspend()
+    renders = scheduler.renders
+    loop.run_until(7200 * 1_000_000_000)
+    assert scheduler.wakeups == wakeups and scheduler.renders == renders
+    scheduler.resume()
+    assert shown[-1] == clock.now_ms()
+    assert scheduler.armed
+
+
+def test_essential_sources_run_in_background_while_suspended():
+    source = ManualClock()
+    clock = GameClock(6870, 1000, source=source)
+    loop = FakeLoop(source)
+    background = []
+    due = [5 * 1_000_000_000]
+
+    def on_background():
+        background.append(source())
+        due[0] = None  # срок обработан
+
+    scheduler = TickScheduler(clock, loop.after, loop.after_cancel, lambda: None,
+                              background=on_background)
+    scheduler.add_source(lambda: due[0], essential=True)
+    clock.start()
+    scheduler.suspend()
+    loop.run_until(60 * 1_000_000_000)
+    assert background == [5 * 1_000_000_000]
+    assert scheduler.wakeups == 1
+
+
+def test_call_queue_runs_posted_calls_on_the_polling_thread():
+    source = ManualClock()
+    loop = FakeLoop(source)
+    calls = CallQueue(loop.after, loop.after_cancel, min_ms=10, max_ms=250).start()
+    done = []
+    worker = threading.Thread(target=lambda: calls.post(lambda name: done.append((name, threading.get_ident())),
+                                                        "worker"))
+    worker.start()
+    worker.join()
+    assert done == []
+    loop.run_until(250 * 1_000_000)
+    assert done == [("worker", threading.get_ident())]
+    # После вызова опрос частый, без вызовов интервал растет до max_ms
+    polls = calls.polls
+    loop.run_until(260 * 1_000_000)
+    assert calls.polls == polls + 1
+    loop.run_until(10 * 1_000_000_000)
+    assert calls.polls < polls + 1 + 10 * 4 + 5
+    calls.stop()
+    assert loop.pending == {}
+
+
+def test_call_queue_keeps_polling_after_a_failing_call():
+    loop = FakeLoop(ManualClock())
+    calls = CallQueue(loop.after, loop.after_cancel).start()
+    done = []
+    calls.post(lambda: 1 / 0)
+    calls.post(done.append, "next")
+    try:
+        loop.run_until(250 * 1_000_000)
+    except ZeroDivisionError:
+        pass
+    loop.run_until(300 * 1_000_000)
+    assert done == ["next"] and calls.calls == 2
@@ -0,0 +1,200 @@
+"""
+Тесты HTTP/JSON API игрового времени: кэш ответа, команды, keep-alive
+"""
+import asyncio
+import json
+
+from stay_out_core import AlarmStore, ManualClock, NS_PER_SECOND, Recurrence, StateStore, control
+from stay_out_core.server import ApiServer
+from stay_out_core.store import DATA_DIR_ENV
+import stay_out_daemon
+from stay_out_daemon import build_service, handle_control
+
+
+def make(seconds=1):
+    source = ManualClock(seconds * NS_PER_SECOND)
+    store = StateStore(":memory:")
+    return source, store, build_service(store, "app", source=source)
+
+
+# Заголовки, с которыми команды принимаются (не "простой" запрос браузера)
+COMMAND = {"x-stay-out": "1"}
+JSON = {"content-type": "application/json"}
+
+
+def body(response):
+    head, _, payload = response.partition(b"\r\n\r\n")
+    status = int(head.split()[1])
+    return status, json.loads(payload)
+
+
+def test_response_is_rendered_once_per_game_second():
+    source, _, service = make()
+    service.start_timer()
+    server = ApiServer(service)
+    first = server.handle("GET", "/time")
+    renders = service.renders
+    for _ in range(500):
+        assert server.handle("GET", "/time") is first
+    assert service.renders == renders
+    # 6870 мс игры за секунду: следующая игровая секунда через 146 мс реальных
+    source.advance(ms=140)
+    assert server.handle("GET", "/time") is first
+    source.advance(ms=10)
+    second = server.handle("GET", "/time")
+    assert second is not first and service.renders == renders + 1
+    assert body(second)[1]["game_ms"] == 150 * 6870 // 1000
+
+
+def test_controls_map_onto_clock_operations():
+    source, store, service = make()
+    server = ApiServer(service)
+    status, data = body(server.handle("POST", "/set?time=12:30:00", headers=COMMAND))
+    assert status == 200 and data["game_time"] == "12:30:00" and not data["running"]
+    status, data = body(server.handle("POST", "/speed", b'{"speed": 2000}', JSON))
+    assert data["speed"] == 2000 and store.scope("app").settings["game_tick_duration"] == 2000
+    body(server.handle("POST", "/start", headers=COMMAND))
+    source.advance(seconds=3)
+    status, data = body(server.handle("POST", "/pause", headers=COMMAND))
+    assert data["game_time"] == "12:30:06" and data["paused"]
+    status, data = body(server.handle("POST", "/reset", headers=COMMAND))
+    assert data["game_ms"] == 0 and not data["running"]
+    # Состояние часов записано в журнал (базу)
+    assert store.scope("app").clock["game_ns"] == 0
+
+
+def test_errors():
+    _, _, service = make()
+    server = ApiServer(service)
+    assert body(server.handle("POST", "/set", headers=COMMAND))[0] == 400
+    assert body(server.handle("POST", "/set?time=25:00:00", headers=COMMAND))[0] == 400
+    assert body(server.handle("POST", "/speed?speed=50", headers=COMMAND))[0] == 400
+    assert body(server.handle("POST", "/speed", b"{not json", JSON))[0] == 400
+    assert body(server.handle("GET", "/start"))[0] == 405
+    assert body(server.handle("POST", "/time", headers=COMMAND))[0] == 405
+    assert body(server.handle("GET", "/nope"))[0] == 404
+
+
+def test_only_reads_are_open_to_other_origins():
+    _, _, service = make()
+    server = ApiServer(service)
+    assert b"Access-Control-Allow-Origin: *" in server.handle("GET", "/time")
+    # Форма или fetch без preflight с чужой страницы не управляют часами
+    for headers in (None, {"content-type": "text/plain"},
+                    {"content-type": "application/x-www-form-urlencoded"}):
+        response = server.handle("POST", "/start", b'{"x": 1}', headers)
+        assert body(response)[0] == 403 and b"Access-Control" not in response
+    assert not service.clock.running
+    for headers in (COMMAND, {"content-type": "application/json; charset=utf-8"}):
+        response = server.handle("POST", "/start", headers=headers)
+        assert body(response)[0] == 200 and b"Access-Control" not in response
+
+
+def test_upcoming_alarms_and_firing():
+    source = ManualClock(NS_PER_SECOND)
+    store = StateStore(":memory:")
+    state = store.scope("app")
+    alarms = AlarmStore()
+    state.save_alarms([alarms.add(60_000, "Выброс"), alarms.add(30_000, "Торговец", Recurrence.daily(30_000)),
+                       alarms.add(10_000, "Было")])
+    state.save_settings({"game_tick_duration": 1000})
+    alarms.mark_fired(3)
+    state.save_alarm(alarms.get(3))
+    service = build_service(store, "app", source=source)
+    service.start_timer()
+    data = json.loads(service.response().partition(b"\r\n\r\n")[2])
+    assert [(alarm["description"], alarm["due_game_ms"]) for alarm in data["alarms"]] == [
+        ("Торговец", 30_000), ("Выброс", 60_000)]
+    assert data["alarms"][0]["repeat"] == "Каждый день"
+    assert data["alarms"][0]["due_wall_ms"] is not None
+
+    source.advance(seconds=40)
+    service.tick()
+    data = json.loads(service.response().partition(b"\r\n\r\n")[2])
+    assert [alarm["due_game_ms"] for alarm in data["alarms"]] == [60_000, 30_000 + 86_400_000]
+    assert [row[1:] for row in store.history("app")] == [("alarm", 40_000, "Торговец")]
+
+
+def test_http_keep_alive_over_socket():
+    async def scenario():
+        _, _, service = make()
+        server = await ApiServer(service, port=0).start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            responses = []
+            for request in (b"GET /time HTTP/1.1\r\nHost: x\r\n\r\n",
+                            b"POST /set HTTP/1.1\r\nContent-Type: application/json\r\nContent-Length: 20\r\n\r\n"
+                            b"{\"time\": \"01:02:03\"}",
+                            b"GET / HTTP/1.1\r\nConnection: close\r\n\r\n"):
+                writer.write(request)
+                await writer.drain()
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+                responses.append(json.loads(await reader.readexactly(length)))
+            # После Connection: close сервер закрывает соединение
+            assert await reader.read() == b""
+            writer.close()
+            return responses
+        finally:
+            await server.close()
+
+    first, second, third = asyncio.run(scenario())
+    assert first["game_time"] == "00:00:00"
+    assert second["game_time"] == third["game_time"] == "01:02:03"
+
+
+def test_alarms_are_notified_like_the_interface():
+    source = ManualClock(NS_PER_SECOND)
+    store = StateStore(":memory:")
+    state = store.scope("app")
+    alarms = AlarmStore()
+    state.save_alarms([alarms.add(30_000, "Торговец"), alarms.add(30_000, "Выброс")])
+    state.save_settings({"game_tick_duration": 1000})
+    shown = []
+    service = build_service(store, "app", source=source, notify=shown.append)
+
+    async def main():
+        service.attach(asyncio.get_running_loop())
+        service.start_timer()
+        source.advance(seconds=40)
+        service.tick()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        service.detach()
+
+    asyncio.run(main())
+    # Будильники одного тика - одно уведомление, как всплывающее окно интерфейса
+    assert [(notification.title, notification.text()) for notification in shown] == [
+        ("Будильник", "00:00:30 - Торговец\n00:00:30 - Выброс")]
+
+
+def test_control_socket_commands_run_on_the_event_loop(tmp_path):
+    source, _, service = make()
+    address = control.control_address(str(tmp_path))
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        server = control.ControlServer(control.claim(address), lambda name, value: handle_control(service, name, value),
+                                       dispatch=loop.call_soon_threadsafe).start()
+        try:
+            reply = await loop.run_in_executor(None, control.send, ["set", "12:30:00"], address)
+            assert reply["game_time"] == "12:30:00" and not reply["running"]
+            reply = await loop.run_in_executor(None, control.send, ["start"], address)
+            assert reply["running"]
+            reply = await loop.run_in_executor(None, control.send, ["speed", "50"], address)
+            assert "error" in reply
+        finally:
+            server.close()
+
+    asyncio.run(main())
+    assert service.clock.running
+
+
+def test_daemon_refuses_to_start_while_the_control_socket_is_held(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv(DATA_DIR_ENV, str(tmp_path))
+    listener = control.claim()
+    try:
+        assert stay_out_daemon.main([]) == 1
+    finally:
+        listener.close()
+    assert "уже запущен" in capsys.readouterr().err
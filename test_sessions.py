@@ -0,0 +1,199 @@
+"""
+Тесты журнала отрезков хода часов и сводок по дням на ручных часах
+"""
+from datetime import date, datetime, timedelta
+
+from stay_out_core import DAY_MS, GameClock, ManualClock, NS_PER_SECOND, StateStore, persist, sessions
+
+HOUR_NS = 3600 * NS_PER_SECOND
+
+
+def local_ns(*args):
+    return int(datetime(*args).timestamp()) * NS_PER_SECOND
+
+
+def make(wall_ns, store=None, source_ns=7 * NS_PER_SECOND):
+    # Источник часов монотонный (свой ноль), журнал живет по настенным часам
+    source = ManualClock(source_ns)
+    wall = ManualClock(wall_ns)
+    clock = GameClock(5000, 1000, source=source)
+    log = sessions.SessionLog(clock, store=store, wall=wall)
+    return source, wall, clock, log
+
+
+def advance(seconds, *clocks):
+    for clock in clocks:
+        clock.advance(seconds=seconds)
+
+
+def rows(log):
+    return list(zip(*log.columns))
+
+
+def test_segments_from_start_to_pause_and_stop():
+    start = local_ns(2024, 10, 26, 10, 0, 0)
+    source, wall, clock, log = make(start)
+    clock.start()
+    advance(600, source, wall)
+    clock.pause()
+    # Изменения между вызовами record() не теряются
+    advance(60, source, wall)
+    clock.start()
+    advance(60, source, wall)
+    clock.stop()
+    assert log.record()
+    assert not log.record()
+    assert rows(log) == [
+        (start, start + 600 * NS_PER_SECOND, 0, 3000 * NS_PER_SECOND, 5000, 1000),
+        (start + 660 * NS_PER_SECOND, start + 720 * NS_PER_SECOND,
+         3000 * NS_PER_SECOND, 3300 * NS_PER_SECOND, 5000, 1000),
+    ]
+
+
+def test_speed_change_and_set_split_a_session():
+    start = local_ns(2024, 10, 26, 10, 0, 0)
+    source, wall, clock, log = make(start)
+    clock.start()
+    advance(100, source, wall)
+    clock.set_speed(10000)
+    advance(100, source, wall)
+    clock.set_ms(0)
+    advance(100, source, wall)
+    clock.pause()
+    log.record()
+    assert [row[2:5] for row in rows(log)] == [
+        (0, 500 * NS_PER_SECOND, 5000),
+        (500 * NS_PER_SECOND, 1500 * NS_PER_SECOND, 10000),
+        (0, 1000 * NS_PER_SECOND, 10000),
+    ]
+    # Отрезки стыкуются: это один сеанс на 300 секунд и 2500 игровых секунд
+    assert sessions.longest_session(log.columns) == (start, start + 300 * NS_PER_SECOND, 2500 * NS_PER_SECOND)
+
+
+def test_snapshot_includes_running_segment_and_cut_continues_it():
+    start = local_ns(2024, 10, 26, 10, 0, 0)
+    source, wall, clock, log = make(start)
+    clock.start()
+    advance(30, source, wall)
+    assert len(log) == 0
+    snapshot = log.snapshot()
+    assert list(zip(*snapshot)) == [(start, start + 30 * NS_PER_SECOND, 0, 150 * NS_PER_SECOND, 5000, 1000)]
+    log.cut()
+    advance(30, source, wall)
+    clock.pause()
+    log.record()
+    assert [row[:4] for row in rows(log)] == [
+        (start, start + 30 * NS_PER_SECOND, 0, 150 * NS_PER_SECOND),
+        (start + 30 * NS_PER_SECOND, start + 60 * NS_PER_SECOND, 150 * NS_PER_SECOND, 300 * NS_PER_SECOND),
+    ]
+
+
+def test_daily_hours_split_at_local_midnight(numpy_branch, monkeypatch):
+    monkeypatch.setattr(sessions, "np", numpy_branch)
+    start = local_ns(2024, 10, 25, 23, 0, 0)
+    source, wall, clock, log = make(start)
+    clock.start()
+    advance(2 * 3600, source, wall)
+    clock.pause()
+    advance(3600, source, wall)
+    clock.start()
+    advance(1800, source, wall)
+    clock.pause()
+    log.record()
+    days = sessions.daily(log.columns, days=3, today=date(2024, 10, 26))
+    assert [(day, real) for day, real, _ in days] == [
+        ("2024-10-24", 0), ("2024-10-25", HOUR_NS), ("2024-10-26", HOUR_NS + HOUR_NS // 2)]
+    # 5 игровых секунд за реальную: 2.5 часа игры - 12.5 игровых часов
+    assert sum(game for _, _, game in days) == 9000 * 5 * NS_PER_SECOND
+    assert sessions.longest_session(log.columns) == (start, start + 2 * HOUR_NS, 10 * HOUR_NS)
+
+
+def test_week_summary_counts_only_this_week(numpy_branch, monkeypatch):
+    monkeypatch.setattr(sessions, "np", numpy_branch)
+    monday = date(2024, 10, 21)
+    wall_start = local_ns(2024, 10, 20, 22, 0, 0)
+    source, wall, clock, log = make(wall_start)
+    clock.set_speed(DAY_MS // 1000, 3600)  # игровые сутки за реальный час
+    clock.start()
+    advance(4 * 3600, source, wall)
+    clock.pause()
+    log.record()
+    assert sessions.week_start(monday + timedelta(days=3)) == local_ns(2024, 10, 21, 0, 0, 0)
+    result = sessions.summary(log.columns, days=7, now_ns=local_ns(2024, 10, 24, 12, 0, 0))
+    assert result["week_real_ns"] == 2 * HOUR_NS
+    assert abs(result["week_game_days"] - 2) < 1e-9
+    assert result["total_real_ns"] == 4 * HOUR_NS
+    assert result["segments"] == 1
+
+
+def test_empty_log(numpy_branch, monkeypatch):
+    monkeypatch.setattr(sessions, "np", numpy_branch)
+    _, _, _, log = make(local_ns(2024, 10, 26, 10, 0, 0))
+    assert sessions.longest_session(log.columns) is None
+    result = sessions.summary(log.columns, days=2, now_ns=local_ns(2024, 10, 26, 12, 0, 0))
+    assert result["total_real_ns"] == 0 and [row[1] for row in result["daily"]] == [0, 0]
+
+
+def test_months_of_history_are_aggregated(numpy_branch, monkeypatch):
+    monkeypatch.setattr(sessions, "np", numpy_branch)
+    # Полгода по три отрезка в день
+    start = local_ns(2024, 4, 1, 0, 0, 0)
+    log = sessions.SessionLog(GameClock(source=ManualClock()))
+    for day in range(183):
+        for k in range(3):
+            begin = start + day * 24 * HOUR_NS + (8 + 4 * k) * HOUR_NS
+            log._append((begin, begin + HOUR_NS, 0, 5 * HOUR_NS, 5000, 1000))
+    days = sessions.daily(log.columns, days=30, today=date(2024, 9, 30))
+    assert all(real == 3 * HOUR_NS for _, real, _ in days)
+    assert sessions.longest_session(log.columns)[1] - sessions.longest_session(log.columns)[0] == HOUR_NS
+
+
+def test_long_segment_does_not_overflow(numpy_branch, monkeypatch):
+    monkeypatch.setattr(sessions, "np", numpy_branch)
+    # Один отрезок в 40 суток на самой быстрой скорости: part * tick больше int64
+    start = local_ns(2024, 4, 1, 0, 0, 0)
+    length = 40 * 24 * HOUR_NS
+    log = sessions.SessionLog(GameClock(source=ManualClock()))
+    log._append((start, start + length, 0, length * 10000 // 1000, 10000, 1000))
+    instants = [start - 1, start + length // 3, start + length, start + 2 * length]
+    reals, games = sessions.played_until(log.columns, instants)
+    assert [int(real) for real in reals] == [0, length // 3, length, length]
+    assert [int(game) for game in games] == [0, length // 3 * 10, length * 10, length * 10]
+
+
+def test_segments_persist_through_the_store(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = StateStore(path)
+    writer = persist.WriteBehind(interval_ms=60_000)
+    start = local_ns(2024, 10, 26, 10, 0, 0)
+    source, wall, clock, log = make(start, store=store.scope("app", writer=writer))
+    clock.start()
+    advance(60, source, wall)
+    clock.pause()
+    log.record()
+    writer.close()
+    store.close()
+
+    again = StateStore(path)
+    _, _, _, log2 = make(start, store=again.scope("app"))
+    assert rows(log2) == rows(log)
+    assert len(again.sessions("timer")) == 0
+    again.close()
+
+
+def test_csv_export(tmp_path):
+    start = local_ns(2024, 10, 26, 10, 0, 0)
+    source, wall, clock, log = make(start)
+    clock.set_ms(DAY_MS - 60_000)
+    clock.start()
+    advance(60, source, wall)
+    clock.stop()
+    log.record()
+    assert sessions.write_sessions_csv(str(tmp_path / "s.csv"), log.columns) == 1
+    lines = (tmp_path / "s.csv").read_text(encoding="utf-8").splitlines()
+    assert lines[0] == ",".join(sessions.SESSIONS_HEADER)
+    assert lines[1] == "2024-10-26 10:00:00,2024-10-26 10:01:00,1.00,5000,0/23:59:00,1/00:04:00"
+    daily = sessions.daily(log.columns, days=2, today=date(2024, 10, 26))
+    assert sessions.write_daily_csv(str(tmp_path / "d.csv"), daily) == 2
+    assert (tmp_path / "d.csv").read_text(encoding="utf-8").splitlines()[1:] == [
+        "2024-10-25,0.00,0.000", "2024-10-26,0.02,0.003"]
@@ -0,0 +1,202 @@
+"""
+Тесты хранилища состояния SQLite: миграции, области, будильники, отложенная запись
+"""
+import json
+import sqlite3
+
+from stay_out_core import AlarmStore, ClockJournal, GameClock, ManualClock, NS_PER_SECOND, Recurrence, StateStore
+from stay_out_core import persist, store as store_module
+
+
+def test_wal_and_schema_version(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    assert store.version == len(store_module.MIGRATIONS)
+    assert store._db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    store.close()
+    # Повторное открытие миграции не повторяет
+    again = StateStore(str(tmp_path / "state.db"))
+    assert again.version == len(store_module.MIGRATIONS)
+    again.close()
+
+
+def test_default_path_uses_data_dir_override(tmp_path, monkeypatch):
+    monkeypatch.setenv(store_module.DATA_DIR_ENV, str(tmp_path / "data"))
+    monkeypatch.chdir(tmp_path)
+    store = StateStore()
+    assert store.path == str(tmp_path / "data" / store_module.DB_FILE)
+    store.close()
+
+
+def test_legacy_json_files_are_migrated(tmp_path):
+    legacy = tmp_path / "old"
+    legacy.mkdir()
+    (legacy / "settings.json").write_text(json.dumps({"game_tick_duration": 5000, "theme": "stalker"}),
+                                          encoding="utf-8")
+    (legacy / "game_time.json").write_text(json.dumps({"game_time": 3_600_000}), encoding="utf-8")
+    (legacy / "timer_settings.json").write_text(json.dumps({"game_speed": 7000}), encoding="utf-8")
+    (legacy / "last_time.json").write_text("{broken", encoding="utf-8")
+    store = StateStore(str(tmp_path / "state.db"), legacy_dir=str(legacy))
+
+    app = store.scope("app")
+    assert app.settings == {"game_tick_duration": 5000, "theme": "stalker"}
+    assert app.clock["game_ns"] == 3_600_000 * 1_000_000 and app.clock["tick"] == 5000
+    assert not app.clock["running"]
+    timer = store.scope("timer")
+    assert timer.settings == {"game_speed": 7000}
+    # Поврежденный файл пропускается, а не срывает миграцию
+    assert timer.clock is None
+
+
+def test_journal_checkpoint_wins_over_saved_time(tmp_path):
+    legacy = tmp_path / "old"
+    legacy.mkdir()
+    (legacy / "last_time.json").write_text(json.dumps({"game_time": 1000}), encoding="utf-8")
+    clock = GameClock(5000, 1000, source=ManualClock())
+    clock.set_ms(2000)
+    clock.start()
+    ClockJournal(clock, path=str(legacy / "clock_journal.jsonl")).record()
+    store = StateStore(str(tmp_path / "state.db"), legacy_dir=str(legacy))
+    for name in ("app", "timer"):
+        record = store.scope(name).clock
+        assert record["game_ns"] == 2000 * 1_000_000 and record["running"]
+
+
+def test_legacy_import_is_recorded_only_when_found(tmp_path):
+    path = str(tmp_path / "state.db")
+    first, second = tmp_path / "first", tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    (second / "timer_settings.json").write_text(json.dumps({"game_speed": 7000}), encoding="utf-8")
+    store = StateStore(path, legacy_dir=str(first))
+    assert store.legacy_imports() == {}
+    store.close()
+    # Другой запуск (другой каталог) находит файлы: переносятся и записываются
+    store = StateStore(path, legacy_dir=[str(first), str(second)])
+    assert store.legacy_imports() == {"timer": str(second)}
+    assert store.scope("timer").settings == {"game_speed": 7000}
+    # Область с уже сохраненными данными старые файлы не перезаписывают
+    store.scope("app").save_settings({"theme": "stalker"})
+    store.close()
+    (second / "settings.json").write_text(json.dumps({"theme": "light"}), encoding="utf-8")
+    store = StateStore(path, legacy_dir=str(second))
+    assert store.scope("app").settings == {"theme": "stalker"}
+    store.skip_legacy_import()
+    assert store.legacy_imports() == {"timer": str(second), "app": store_module.SKIPPED}
+    store.close()
+
+
+def test_default_legacy_dirs_include_launcher_and_cwd(tmp_path, monkeypatch):
+    launcher = tmp_path / "app"
+    launcher.mkdir()
+    monkeypatch.setattr("sys.argv", [str(launcher / "stay_out_timer_full.py")])
+    monkeypatch.chdir(tmp_path)
+    dirs = store_module.legacy_dirs()
+    assert dirs[0] == str(launcher) and dirs[-1] == str(tmp_path)
+    assert len(dirs) == len(set(dirs))
+
+
+def test_readonly_open_skips_migrations_and_refuses_writes(tmp_path):
+    path = str(tmp_path / "state.db")
+    # Базы еще нет: открывается обычным образом и создается
+    store = StateStore(path, readonly=True)
+    assert not store.readonly and store.version == len(store_module.MIGRATIONS)
+    store.scope("app").save_settings({"theme": "stalker"})
+    store.close()
+    reader = StateStore(path, readonly=True)
+    assert reader.readonly and reader.scope("app").settings == {"theme": "stalker"}
+    try:
+        reader.scope("app").save_settings({"theme": "light"})
+    except sqlite3.OperationalError:
+        pass
+    else:
+        raise AssertionError("запись через соединение только для чтения")
+    reader.close()
+
+
+def test_current_schema_is_opened_without_a_write_lock(tmp_path):
+    path = str(tmp_path / "state.db")
+    StateStore(path).close()
+    # Другой процесс держит блокировку записи: открытие актуальной базы ее не ждет
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        store = StateStore(path, legacy_dir=str(tmp_path))
+        store._db.execute("PRAGMA busy_timeout=0")
+        assert store.scope("app").settings == {}
+        store.close()
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+
+
+def test_scopes_are_separate_and_settings_roundtrip():
+    store = StateStore(":memory:")
+    store.scope("app").save_settings({"volume_level": 40, "theme": "тёмная"})
+    store.scope("timer").save_settings({"game_speed": 6870})
+    assert store.scope("app").settings == {"volume_level": 40, "theme": "тёмная"}
+    assert store.scope("timer").settings == {"game_speed": 6870}
+
+
+def test_clock_anchor_roundtrip_through_journal():
+    store = StateStore(":memory:")
+    source = ManualClock(NS_PER_SECOND)
+    wall = ManualClock(1_700_000_000 * NS_PER_SECOND)
+    clock = GameClock(5000, 1000, source=source)
+    journal = ClockJournal(clock, store=store.scope("timer"), wall=wall)
+    clock.set_ms(60_000)
+    clock.start()
+    assert journal.record()
+    assert not journal.record()
+    wall.advance(seconds=10)
+    clock2 = GameClock(source=ManualClock())
+    assert ClockJournal(clock2, store=store.scope("timer"), wall=wall).restore()
+    assert clock2.active and clock2.now_ms() == 60_000 + 50_000
+
+
+def test_alarms_keep_ids_and_state():
+    store = StateStore(":memory:")
+    state = store.scope("app")
+    alarms = AlarmStore()
+    first = alarms.add(3_600_000, "Выброс")
+    second = alarms.add(7_200_000, "Торговец", Recurrence.every_minutes(30, 7_200_000))
+    third = alarms.add(100_000, "Лишний")
+    state.save_alarms([first, second, third])
+    alarms.mark_fired(first.id)
+    state.save_alarm(first)
+    state.delete_alarm(third.id)
+
+    restored = AlarmStore()
+    loaded = restored.restore(store.scope("app").alarms)
+    assert [alarm.id for alarm in loaded] == [first.id, second.id]
+    assert loaded[0].fired and loaded[0].fire_count == 1
+    assert loaded[1].rule == second.rule and loaded[1].description == "Торговец"
+    # Новые id не пересекаются с восстановленными
+    assert restored.add(0, "Новый").id == second.id + 1
+
+    state.clear_alarms()
+    assert store.scope("app").alarms == []
+
+
+def test_writes_go_through_write_behind(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = StateStore(path)
+    writer = persist.WriteBehind(interval_ms=60_000)
+    state = store.scope("app", writer=writer)
+    for volume in range(50):
+        state.save_settings({"volume_level": volume})
+    alarms = AlarmStore()
+    alarm = alarms.add(1000, "a")
+    state.save_alarm(alarm)
+    state.delete_alarm(alarm.id)
+    state.add_history("alarm", 1000, "a")
+    # Пока поток не записал, в базе ничего нет
+    assert store.scope("app").settings == {}
+    writer.close()
+    assert store.scope("app").settings == {"volume_level": 49}
+    assert store.scope("app").alarms == []
+    assert [row[1:] for row in store.history("app")] == [("alarm", 1000, "a")]
+    store.close()
+    # Данные видны и из другого соединения
+    db = sqlite3.connect(path)
+    assert db.execute("SELECT count(*) FROM history").fetchone()[0] == 1
+    db.close()
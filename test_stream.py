@@ -0,0 +1,182 @@
+"""
+Тесты потока событий SSE: замена устаревших тиков, шаг минуты, будильники, много подписчиков
+"""
+import asyncio
+import json
+
+from stay_out_core import AlarmStore, ManualClock, NS_PER_SECOND, StateStore
+from stay_out_core.server import EVENT_QUEUE, ApiServer, EventStream
+from stay_out_daemon import build_service
+
+
+class SlowWriter:
+    """Писатель, чей drain() ждет разрешения: клиент, который не успевает читать"""
+
+    def __init__(self):
+        self.chunks = []
+        self.open = asyncio.Event()
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    async def drain(self):
+        await self.open.wait()
+        self.open.clear()
+
+
+class Writer(SlowWriter):
+    """Клиент, который успевает читать"""
+
+    async def drain(self):
+        pass
+
+
+async def settle():
+    # Задачам подписчиков - несколько проходов цикла на пробуждение и запись
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def events(data):
+    """[(тип, данные)] из байтов потока SSE"""
+    result = []
+    for block in data.split(b"\n\n"):
+        lines = dict(line.split(b": ", 1) for line in block.split(b"\n") if line.startswith((b"event", b"data")))
+        if lines:
+            result.append((lines[b"event"].decode(), json.loads(lines[b"data"])))
+    return result
+
+
+def make(seconds=1):
+    source = ManualClock(seconds * NS_PER_SECOND)
+    store = StateStore(":memory:")
+    return source, store, build_service(store, "app", source=source)
+
+
+def test_slow_subscriber_gets_only_latest_tick():
+    async def scenario():
+        stream = EventStream()
+        writer = SlowWriter()
+        task = asyncio.create_task(stream.serve(writer, 1000, b"event: state\ndata: {}\n\n"))
+        await settle()
+        assert len(stream) == 1
+        # Клиент стоит на первой записи, а тики идут
+        for second in range(1, 101):
+            stream.tick(second * NS_PER_SECOND, lambda game_ns: {"game_ms": game_ns // 1_000_000})
+        for i in range(EVENT_QUEUE + 5):
+            stream.publish("alarm", {"id": i})
+        writer.open.set()
+        await settle()
+        writer.open.set()
+        await settle()
+        stream.close()
+        writer.open.set()
+        subscriber = await task
+        return stream, writer, subscriber
+
+    stream, writer, subscriber = asyncio.run(scenario())
+    received = events(b"".join(writer.chunks))
+    ticks = [data["game_ms"] for kind, data in received if kind == "tick"]
+    alarms = [data["id"] for kind, data in received if kind == "alarm"]
+    assert ticks == [100_000]
+    # Очередь событий ограничена: вытеснены самые старые
+    assert alarms == list(range(5, EVENT_QUEUE + 5))
+    assert subscriber.dropped == 99 + 5
+    assert len(stream) == 0
+
+
+def test_tick_payload_built_once_per_step_and_only_with_subscribers():
+    stream = EventStream()
+    built = []
+
+    def data(game_ns):
+        built.append(game_ns)
+        return {}
+    stream.tick(NS_PER_SECOND, data)
+    assert built == [] and stream.published == 0
+
+
+def test_minute_and_second_resolutions():
+    async def scenario():
+        source, _, service = make()
+        service.start_timer()
+        seconds, minutes = Writer(), Writer()
+        tasks = [asyncio.create_task(service.stream.serve(seconds, 1000, b"")),
+                 asyncio.create_task(service.stream.serve(minutes, 60000, b""))]
+        await settle()
+        # 6870 мс игры за секунду реального: игровая минута - около 8.7 с
+        for _ in range(20):
+            source.advance(seconds=1)
+            service.tick()
+            await settle()
+        service.stream.close()
+        await asyncio.gather(*tasks)
+        return seconds, minutes
+
+    seconds, minutes = asyncio.run(scenario())
+    second_ticks = [data["game_ms"] for kind, data in events(b"".join(seconds.chunks)) if kind == "tick"]
+    minute_ticks = [data["game_ms"] for kind, data in events(b"".join(minutes.chunks)) if kind == "tick"]
+    assert len(second_ticks) == 20
+    assert [game_ms // 60_000 for game_ms in minute_ticks] == [0, 1, 2]
+
+
+def test_state_and_alarm_events():
+    async def scenario():
+        source = ManualClock(NS_PER_SECOND)
+        store = StateStore(":memory:")
+        state = store.scope("app")
+        alarms = AlarmStore()
+        state.save_alarms([alarms.add(5_000, "Выброс")])
+        state.save_settings({"game_tick_duration": 1000})
+        service = build_service(store, "app", source=source)
+        writer = Writer()
+        task = asyncio.create_task(service.stream.serve(writer, 60000, b""))
+        await settle()
+        service.start_timer()
+        await settle()
+        source.advance(seconds=6)
+        service.tick()
+        await settle()
+        service.close()
+        await task
+        return writer
+
+    received = events(b"".join(asyncio.run(scenario()).chunks))
+    kinds = [kind for kind, _ in received]
+    assert kinds[0] == "state" and received[0][1]["running"]
+    alarm = next(data for kind, data in received if kind == "alarm")
+    assert alarm["description"] == "Выброс" and alarm["game_ms"] == 6_000
+
+
+def test_many_subscribers_over_socket():
+    async def scenario():
+        source, _, service = make()
+        server = await ApiServer(service, port=0).start()
+        try:
+            clients = []
+            for _ in range(50):
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+                writer.write(b"GET /events?resolution=second HTTP/1.1\r\nHost: x\r\n\r\n")
+                clients.append((reader, writer))
+            for reader, _ in clients:
+                head = await reader.readuntil(b"\r\n\r\n")
+                assert b"text/event-stream" in head
+                # Первое событие - состояние часов
+                assert events(await reader.readuntil(b"\n\n"))[0][0] == "state"
+            assert len(service.stream) == 50
+
+            bad_reader, bad_writer = await asyncio.open_connection("127.0.0.1", server.port)
+            bad_writer.write(b"GET /events?resolution=hour HTTP/1.1\r\n\r\n")
+            assert (await bad_reader.readuntil(b"\r\n")).startswith(b"HTTP/1.1 400")
+            bad_writer.close()
+
+            service.edit_time("10:00:00")
+            for reader, _ in clients:
+                kind, data = events(await reader.readuntil(b"\n\n"))[0]
+                assert kind == "state" and data["game_time"] == "10:00:00"
+            for _, writer in clients:
+                writer.close()
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
@@ -3,15 +3,8 @@
 """
 import json
 import os
-from datetime import datetime
 
-def format_time(milliseconds):
-    """Форматирование времени в ЧЧ:ММ:СС"""
-    total_seconds = milliseconds // 1000
-    hours = (total_seconds // 3600) % 24
-    minutes = (total_seconds % 3600) // 60
-    seconds = total_seconds % 60
-    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+from stay_out_core import GameClock, ManualClock, format_time
 
 def test_timer_logic():
     print("Тестирование логики таймера Stay Out")
@@ -27,22 +20,28 @@ def test_timer_logic():
     
     # Тест 1: Проверка соотношения времени
     print("Тест 1: Соотношение реального и игрового времени")
-    test_real_time = 1000  # 1 секунда реального времени
-    calculated_game_time = int(test_real_time * game_tick_duration / real_time_tick)
+    source = ManualClock()
+    clock = GameClock(game_tick_duration, real_time_tick, source=source)
+    clock.start()
+    source.advance(ms=1000)  # 1 секунда реального времени
+    calculated_game_time = clock.now_ms()
+    assert calculated_game_time == 6870
     print(f"1 секунда реального времени = {calculated_game_time} мс игрового времени")
     print(f"Формат времени: {format_time(calculated_game_time)}")
     print()
     
     # Тест 2: Симуляция работы таймера
     print("Тест 2: Симуляция работы таймера за 5 секунд")
-    start_time = datetime.now().timestamp() * 1000  # В миллисекундах
+    source = ManualClock()
+    clock = GameClock(game_tick_duration, real_time_tick, source=source)
+    clock.start()
     
     for i in range(6):  # 0, 1, 2, 3, 4, 5 секунд
-        current_time = start_time + (i * 1000)  # Добавляем i секунд
-        elapsed_real_time = current_time - start_time
-        game_time = int(elapsed_real_time * game_tick_duration / real_time_tick)
+        game_time = clock.now_ms()
+        assert game_time == i * game_tick_duration
         
         print(f"Реальное время: {i} сек -> Игровое время: {format_time(game_time)} (мс: {game_time})")
+        source.advance(seconds=1)
     
     print()
     
@@ -0,0 +1,87 @@
+"""
+Тесты горячей перезагрузки настроек: схема, слежение за файлами, внешние изменения в базе
+"""
+import threading
+
+import pytest
+
+from stay_out_core import StateStore, schema
+from stay_out_core.watch import FileWatcher
+
+
+def test_defaults_pass_validation():
+    values = schema.defaults(schema.APP_SETTINGS)
+    assert values["game_tick_duration"] == 6870
+    assert schema.validate(schema.APP_SETTINGS, values) == (values, [])
+
+
+def test_invalid_values_are_reported_and_dropped():
+    clean, errors = schema.validate(schema.APP_SETTINGS, {
+        "game_tick_duration": 50,
+        "volume_level": 40.0,
+        "alarm_sound_enabled": 1,
+        "theme": "розовая",
+        "text_color": "#12345g",
+        "background_color": "dark slate gray",
+        "from_newer_version": 1,
+    })
+    assert clean == {"volume_level": 40, "background_color": "dark slate gray"}
+    assert type(clean["volume_level"]) is int
+    assert sorted(key for key, _ in errors) == ["alarm_sound_enabled", "game_tick_duration", "text_color", "theme"]
+
+
+def test_external_settings_ignore_own_writes(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = StateStore(path)
+    state = store.scope("app")
+    state.save_settings({"volume_level": 40, "theme": "dark"})
+    assert state.external_settings() == {}
+
+    other = StateStore(path)
+    other.scope("app").save_settings({"volume_level": 70})
+    assert state.external_settings() == {"volume_level": 70}
+    # Одно изменение сообщается один раз
+    assert state.external_settings() == {}
+    other.close()
+    store.close()
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watcher_sees_commit_from_another_connection(tmp_path, use_inotify):
+    path = str(tmp_path / "state.db")
+    store = StateStore(path)
+    state = store.scope("app")
+    state.save_settings({"volume_level": 40})
+    seen = []
+    changed = threading.Event()
+
+    def on_change():
+        seen.append(state.external_settings())
+        if seen[-1]:
+            changed.set()
+
+    watcher = FileWatcher(store.files(), on_change, poll_interval=0.05, settle=0.02, use_inotify=use_inotify).start()
+    try:
+        assert use_inotify or watcher.backend == "poll"
+        other = StateStore(path)
+        other.scope("app").save_settings({"volume_level": 10})
+        other.close()
+        assert changed.wait(5)
+        assert {"volume_level": 10} in seen
+    finally:
+        watcher.close()
+        store.close()
+
+
+def test_watcher_ignores_other_files(tmp_path):
+    target = tmp_path / "watched.txt"
+    target.write_text("a")
+    fired = threading.Event()
+    watcher = FileWatcher([str(target)], fired.set, settle=0.02).start()
+    try:
+        (tmp_path / "other.txt").write_text("b")
+        assert not fired.wait(0.3)
+        target.write_text("c")
+        assert fired.wait(5)
+    finally:
+        watcher.close()